@@ -1,5 +1,18 @@
 from .client import JupiterOneClient
+from .pool import ClientPool
+from .paging import PageSizer
+from .records import Entity, Relationship
+from .transport import (
+    Transport,
+    RequestsTransport,
+    HTTP2Transport,
+    FakeTransport
+)
 from .errors import (
     JupiterOneClientError,
-    JupiterOneApiError
+    JupiterOneApiError,
+    JupiterOneCircuitOpenError,
+    JupiterOnePartialDataError,
+    JupiterOneSyncJobError,
+    JupiterOneTimeoutError
 )
\ No newline at end of file
@@ -0,0 +1,195 @@
+""" Local filtering and aggregation over fetched query results """
+
+from typing import Callable, Dict, Iterable, Iterator, List
+
+from jupiterone.records import Entity, Relationship
+
+
+def _hashable(value):
+    """ Converts list values to tuples so they can be grouped and indexed """
+    if isinstance(value, list):
+        return tuple(_hashable(item) for item in value)
+    return value
+
+
+def field_getter(field: str) -> Callable[[object], object]:
+    """ Returns a function reading a field from a result row or record.
+
+    Underscore fields and displayName are read from the entity or
+    relationship metadata, id from the row, and any other field from
+    the properties.
+    """
+    def get(row):
+        if isinstance(row, (Entity, Relationship)):
+            if field == 'id':
+                return row.id
+            if field in row.FIELDS:
+                value = getattr(row, row.FIELDS[field])
+            elif field.startswith('_'):
+                value = row.metadata.get(field)
+            elif isinstance(row, Relationship) and field in ('fromVertexId', 'toVertexId'):
+                value = row.from_entity_id if field == 'fromVertexId' else row.to_entity_id
+            else:
+                value = row.properties.get(field)
+            return _hashable(list(value) if isinstance(value, tuple) else value)
+
+        if field in ('id', 'fromVertexId', 'toVertexId'):
+            return row.get(field)
+        if field.startswith('_') or field == 'displayName':
+            metadata = row.get('entity') or row.get('relationship') or {}
+            return _hashable(metadata.get(field))
+        return _hashable((row.get('properties') or {}).get(field))
+
+    return get
+
+
+class ResultSet:
+    """ Column oriented, in-memory view of query results.
+
+    Each field is extracted into a column the first time it is used and
+    operations run a column at a time.  Equality and membership filters are
+    answered from per-field indexes, built on first use, mapping each value
+    to the positions of the rows holding it.  Filtered and grouped sets are
+    views sharing the columns and indexes of the set they came from, so
+    follow-up questions never fetch from the API again.
+
+    args:
+        rows (iterable): Result rows or Entity/Relationship records
+    """
+
+    def __init__(self, rows: Iterable):
+        self._rows: List = list(rows)
+        self._positions: List[int] = None
+        self._columns: Dict[str, List] = {}
+        self._indexes: Dict[str, Dict[object, List[int]]] = {}
+
+    @classmethod
+    def from_result(cls, result: Dict) -> 'ResultSet':
+        """ Builds a result set from the return value of query_v1, using the
+            vertices of a tree result
+        """
+        if 'vertices' in result:
+            return cls(result['vertices'])
+        return cls(result['data'])
+
+    def _view(self, positions: List[int]) -> 'ResultSet':
+        view = ResultSet.__new__(ResultSet)
+        view._rows = self._rows
+        view._positions = positions
+        view._columns = self._columns
+        view._indexes = self._indexes
+        return view
+
+    def _all_positions(self) -> Iterable[int]:
+        return range(len(self._rows)) if self._positions is None else self._positions
+
+    def _base_column(self, field: str) -> List:
+        column = self._columns.get(field)
+        if column is None:
+            get = field_getter(field)
+            column = self._columns[field] = [get(row) for row in self._rows]
+        return column
+
+    def index(self, field: str) -> Dict[object, List[int]]:
+        """ Returns the index of a field over every row, building it on first use """
+        index = self._indexes.get(field)
+        if index is None:
+            index = {}
+            for position, value in enumerate(self._base_column(field)):
+                index.setdefault(value, []).append(position)
+            self._indexes[field] = index
+        return index
+
+    def column(self, field: str) -> List:
+        """ Values of a field for every row in the set """
+        column = self._base_column(field)
+        if self._positions is None:
+            return list(column)
+        return [column[position] for position in self._positions]
+
+    def rows(self) -> Iterator:
+        """ Yields the rows in the set """
+        if self._positions is None:
+            yield from self._rows
+        else:
+            for position in self._positions:
+                yield self._rows[position]
+
+    def __iter__(self) -> Iterator:
+        return self.rows()
+
+    def __len__(self) -> int:
+        return len(self._rows) if self._positions is None else len(self._positions)
+
+    def where(self, conditions: Dict = None, **kwargs) -> 'ResultSet':
+        """ Returns the rows matching every condition.  A condition value can be
+            a value, a set, list or tuple of accepted values, or a callable
+            called with the field value.  List fields are compared as tuples,
+            so a callable is needed to match a single element.  Fields whose
+            names are not valid keyword arguments, e.g. _type or tag.Env, are
+            passed in conditions.
+
+        args:
+            conditions (dict): Field name to condition
+        """
+        conditions = dict(conditions or {}, **kwargs)
+        positions = None
+
+        for field, condition in conditions.items():
+            if callable(condition):
+                continue
+            values = condition if isinstance(condition, (set, frozenset, list, tuple)) else (condition,)
+            index = self.index(field)
+            matched = set()
+            for value in values:
+                matched.update(index.get(_hashable(value), ()))
+            positions = matched if positions is None else positions & matched
+
+        if positions is None:
+            candidates = list(self._all_positions())
+        elif self._positions is None:
+            candidates = sorted(positions)
+        else:
+            candidates = [position for position in self._positions if position in positions]
+
+        for field, condition in conditions.items():
+            if callable(condition):
+                column = self._base_column(field)
+                candidates = [position for position in candidates if condition(column[position])]
+
+        return self._view(candidates)
+
+    def filter(self, predicate: Callable[[object], bool]) -> 'ResultSet':
+        """ Returns the rows for which predicate, called with each row, is true """
+        return self._view([position for position in self._all_positions() if predicate(self._rows[position])])
+
+    def count(self) -> int:
+        """ Number of rows in the set """
+        return len(self)
+
+    def distinct(self, field: str) -> List:
+        """ Distinct values of a field, in order of first appearance """
+        if self._positions is None:
+            return list(self.index(field))
+        return list(dict.fromkeys(self.column(field)))
+
+    def group_by(self, field: str) -> Dict[object, 'ResultSet']:
+        """ Splits the set into a set per distinct value of a field """
+        if self._positions is None:
+            return {value: self._view(positions) for value, positions in self.index(field).items()}
+
+        column = self._base_column(field)
+        groups: Dict[object, List[int]] = {}
+        for position in self._positions:
+            groups.setdefault(column[position], []).append(position)
+        return {value: self._view(positions) for value, positions in groups.items()}
+
+    def count_by(self, field: str) -> Dict[object, int]:
+        """ Number of rows per distinct value of a field, largest first """
+        if self._positions is None:
+            counts = {value: len(positions) for value, positions in self.index(field).items()}
+        else:
+            counts = {}
+            for value in self.column(field):
+                counts[value] = counts.get(value, 0) + 1
+        return dict(sorted(counts.items(), key=lambda item: item[1], reverse=True))
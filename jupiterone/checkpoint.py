@@ -0,0 +1,105 @@
+""" Checkpoints for resuming long running paginated queries """
+
+import json
+import os
+from typing import Dict, Iterator, List
+
+from jupiterone.errors import JupiterOneClientError
+
+
+class QueryCheckpoint:
+    """ Persists the progress of a cursor paginated query.
+
+    Rows are appended to an NDJSON file, by default next to the state file, and the state
+    file records the cursor of the next page along with the size of the rows
+    file once that page was written.  Rows beyond that size belong to a page
+    that was not checkpointed and are discarded when resuming.
+
+    A complete checkpoint is kept, so running the query again with it reads
+    the saved rows back without querying; clear it to fetch fresh results.
+    """
+
+    def __init__(self, path: str, rows_path: str = None):
+        self.path = path
+        self.rows_path = rows_path or path + '.ndjson'
+        self.state: Dict = None
+
+    def load(self, query: str, include_deleted: bool = False) -> Dict:
+        """ Loads the saved state for a query, starting a new checkpoint if there is none
+
+        args:
+            query (str): Query text the checkpoint must belong to
+            include_deleted (bool): Include deleted flag the checkpoint must belong to
+        """
+        if os.path.exists(self.path):
+            with open(self.path) as fileobj:
+                state = json.load(fileobj)
+            if state['query'] != query or state['includeDeleted'] != include_deleted:
+                raise JupiterOneClientError(
+                    'Checkpoint {} belongs to a different query: {}'.format(self.path, state['query'])
+                )
+            rows_path = state.get('rowsPath')
+            if rows_path is not None and os.path.abspath(rows_path) != os.path.abspath(self.rows_path):
+                raise JupiterOneClientError(
+                    'Checkpoint {} writes its rows to {}, not {}'.format(self.path, rows_path, self.rows_path)
+                )
+        else:
+            state = {
+                'query': query,
+                'includeDeleted': include_deleted,
+                'rowsPath': os.path.abspath(self.rows_path),
+                'cursor': None,
+                'rows': 0,
+                'offset': 0,
+                'complete': False
+            }
+
+        with open(self.rows_path, 'ab') as fileobj:
+            fileobj.truncate(state['offset'])
+
+        self.state = state
+        return state
+
+    def append(self, rows: List[Dict], cursor: str) -> None:
+        """ Writes a page of rows and records the cursor of the following page
+
+        args:
+            rows (list): Rows of the page just fetched
+            cursor (str): Cursor of the next page, None when the query is complete
+        """
+        with open(self.rows_path, 'ab') as fileobj:
+            for row in rows:
+                fileobj.write(json.dumps(row, separators=(',', ':')).encode('utf-8'))
+                fileobj.write(b'\n')
+            fileobj.flush()
+            os.fsync(fileobj.fileno())
+            offset = fileobj.tell()
+
+        self.state.update(
+            cursor=cursor,
+            rows=self.state['rows'] + len(rows),
+            offset=offset,
+            complete=cursor is None
+        )
+        self._save()
+
+    def _save(self) -> None:
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w') as fileobj:
+            json.dump(self.state, fileobj)
+            fileobj.flush()
+            os.fsync(fileobj.fileno())
+        os.replace(temp_path, self.path)
+
+    def rows(self) -> Iterator[Dict]:
+        """ Reads back the checkpointed rows """
+        with open(self.rows_path, 'rb') as fileobj:
+            for line in fileobj:
+                yield json.loads(line)
+
+    def clear(self) -> None:
+        """ Removes the state and rows files """
+        for path in (self.path, self.rows_path):
+            if os.path.exists(path):
+                os.remove(path)
+        self.state = None
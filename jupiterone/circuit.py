@@ -0,0 +1,83 @@
+""" Circuit breaker shedding load while the API is unhealthy """
+
+import collections
+import threading
+import time
+
+from jupiterone.errors import JupiterOneCircuitOpenError
+
+
+class CircuitBreaker:
+    """ Tracks recent request failures across every call made by a client.
+
+    Once failure_threshold failures happen within window seconds the circuit
+    opens and calls fail fast with JupiterOneCircuitOpenError.  After
+    recovery_timeout seconds it becomes half-open and lets up to
+    half_open_max_calls trial requests through: a successful trial closes the
+    circuit and a failed one opens it again.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, failure_threshold: int = 5, window: float = 60, recovery_timeout: float = 30,
+                 half_open_max_calls: int = 1):
+        self.failure_threshold = failure_threshold
+        self.window = window
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._failures = collections.deque()
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._trials = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """ Current state of the circuit """
+        with self._lock:
+            self._update()
+            return self._state
+
+    def _update(self) -> None:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+            self._state = self.HALF_OPEN
+            self._trials = 0
+
+    def _open(self) -> None:
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._failures.clear()
+
+    def before_call(self) -> None:
+        """ Raises JupiterOneCircuitOpenError unless a request may be sent now """
+        with self._lock:
+            self._update()
+            if self._state == self.OPEN:
+                raise JupiterOneCircuitOpenError('JupiterOne API circuit breaker is open')
+            if self._state == self.HALF_OPEN:
+                if self._trials >= self.half_open_max_calls:
+                    raise JupiterOneCircuitOpenError('JupiterOne API circuit breaker is half-open')
+                self._trials += 1
+
+    def record_success(self) -> None:
+        """ Records a request that reached a healthy API """
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._state = self.CLOSED
+                self._failures.clear()
+
+    def record_failure(self) -> None:
+        """ Records a request that failed because the API is unhealthy """
+        with self._lock:
+            now = time.monotonic()
+            if self._state == self.HALF_OPEN:
+                self._open()
+                return
+
+            self._failures.append(now)
+            while self._failures and now - self._failures[0] > self.window:
+                self._failures.popleft()
+            if len(self._failures) >= self.failure_threshold:
+                self._open()
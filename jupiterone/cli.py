@@ -0,0 +1,142 @@
+""" j1 command line tool """
+
+import argparse
+import json
+import os
+import sys
+from typing import Dict, Iterator, List
+
+from jupiterone.client import JupiterOneClient
+from jupiterone.constants import BULK_BATCH_SIZE
+from jupiterone.errors import JupiterOneClientError, JupiterOneApiError, JupiterOneApiRetryError
+
+
+def read_ndjson(stream) -> Iterator:
+    """ Lazily decodes one JSON value per non-empty line """
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def write_ndjson(stream, value) -> None:
+    stream.write(json.dumps(value, separators=(',', ':')))
+    stream.write('\n')
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='j1', description='JupiterOne command line tool')
+    parser.add_argument('--account', default=os.environ.get('JUPITERONE_ACCOUNT'),
+                        help='JupiterOne account ID (env: JUPITERONE_ACCOUNT)')
+    parser.add_argument('--token', default=os.environ.get('JUPITERONE_TOKEN'),
+                        help='JupiterOne API token (env: JUPITERONE_TOKEN)')
+    parser.add_argument('--url', default=os.environ.get('JUPITERONE_URL', JupiterOneClient.DEFAULT_URL),
+                        help='JupiterOne API url (env: JUPITERONE_URL)')
+    parser.add_argument('--concurrency', type=int, default=4,
+                        help='Number of requests sent concurrently')
+    parser.add_argument('--batch-size', type=int, default=BULK_BATCH_SIZE,
+                        help='Number of mutations sent per request')
+    parser.add_argument('--rate-limit', type=float, default=None,
+                        help='Maximum number of requests per second')
+
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    query = subparsers.add_parser('query', help='Stream query results to stdout as NDJSON')
+    query.add_argument('query', help='J1QL query text')
+    query.add_argument('--include-deleted', action='store_true')
+
+    subparsers.add_parser('upsert', help='Create or update entities read as NDJSON from stdin')
+    subparsers.add_parser('relate', help='Create relationships read as NDJSON from stdin')
+    subparsers.add_parser('delete', help='Delete entities whose IDs are read as NDJSON from stdin')
+
+    delete_where = subparsers.add_parser('delete-where', help='Delete every entity matched by a query')
+    delete_where.add_argument('query', help='J1QL query text')
+    delete_where.add_argument('--dry-run', action='store_true', help='Only count the matching entities')
+
+    export = subparsers.add_parser('export', help='Write query results to an NDJSON file')
+    export.add_argument('query', help='J1QL query text')
+    export.add_argument('--output', '-o', required=True, help='File the results are written to')
+    export.add_argument('--checkpoint', help='State file to resume an interrupted export from')
+    export.add_argument('--include-deleted', action='store_true')
+
+    return parser
+
+
+def run_mutations(results: Iterator[Dict], stdout, stderr) -> int:
+    """ Writes mutation results to stdout and failures to stderr, returns the exit code """
+    failures = 0
+    for result in results:
+        if 'error' in result:
+            failures += 1
+            write_ndjson(stderr, result)
+        else:
+            write_ndjson(stdout, result['response'])
+    return 1 if failures else 0
+
+
+def main(argv: List[str] = None, stdin=None, stdout=None, stderr=None) -> int:
+    """ Entry point of the j1 command """
+    stdin = stdin or sys.stdin
+    stdout = stdout or sys.stdout
+    stderr = stderr or sys.stderr
+    args = build_parser().parse_args(argv)
+
+    try:
+        client = JupiterOneClient(
+            account=args.account,
+            token=args.token,
+            url=args.url,
+            rate_limit=args.rate_limit
+        )
+
+        bulk_options = {
+            'batch_size': args.batch_size,
+            'max_workers': args.concurrency
+        }
+
+        if args.command == 'query':
+            for row in client.iter_query(args.query, include_deleted=args.include_deleted):
+                write_ndjson(stdout, row)
+            return 0
+
+        if args.command == 'export':
+            count = client.export_query(
+                args.query,
+                args.output,
+                include_deleted=args.include_deleted,
+                checkpoint=args.checkpoint
+            )
+            stderr.write('Exported {} rows to {}\n'.format(count, args.output))
+            return 0
+
+        if args.command == 'upsert':
+            return run_mutations(client.bulk_create_entities(read_ndjson(stdin), **bulk_options), stdout, stderr)
+
+        if args.command == 'relate':
+            return run_mutations(client.bulk_create_relationships(read_ndjson(stdin), **bulk_options), stdout, stderr)
+
+        if args.command == 'delete':
+            return run_mutations(client.bulk_delete_entities(read_ndjson(stdin), **bulk_options), stdout, stderr)
+
+        if args.command == 'delete-where':
+            report = client.delete_where(
+                args.query,
+                dry_run=args.dry_run,
+                progress=lambda report: stderr.write('{matched} matched, {deleted} deleted, {failed} failed\n'.format(**report)),
+                **bulk_options
+            )
+            for error in report['errors']:
+                write_ndjson(stderr, error)
+            write_ndjson(stdout, {key: value for key, value in report.items() if key != 'errors'})
+            return 1 if report['failed'] else 0
+
+    except (JupiterOneClientError, JupiterOneApiError, JupiterOneApiRetryError, ValueError) as exc:
+        stderr.write('j1: {}\n'.format(exc))
+        return 2
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,17 +2,29 @@
 # pylint: disable=W0212,no-name-in-module
 # see https://github.com/PyCQA/pylint/issues/409
 
+import hashlib
+import io
+import itertools
 import json
-from typing import Dict, List
+import mmap
+import os
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple, Union
 
-import requests
-from retrying import retry
+from retrying import Retrying
 from warnings import warn
 
 from jupiterone.errors import (
     JupiterOneClientError,
     JupiterOneApiRetryError,
-    JupiterOneApiError
+    JupiterOneApiError,
+    JupiterOneCircuitOpenError,
+    JupiterOnePartialDataError,
+    JupiterOnePersistedQueryError,
+    JupiterOneTimeoutError
 )
 
 from jupiterone.constants import (
@@ -24,14 +36,322 @@ from jupiterone.constants import (
     UPDATE_ENTITY,
     CREATE_RELATIONSHIP,
     DELETE_RELATIONSHIP,
-    CURSOR_QUERY_V1
+    CURSOR_QUERY_V1,
+    DEFERRED_QUERY_V1,
+    LIST_RULE_INSTANCES,
+    LIST_RULE_EVALUATIONS,
+    PERSISTED_QUERY_NOT_FOUND,
+    PERSISTED_QUERY_NOT_SUPPORTED,
+    MUTATION_ARGUMENTS,
+    MUTATION_SELECTIONS,
+    MUTATION_MINIMAL_SELECTIONS,
+    BULK_BATCH_SIZE
 )
+from jupiterone.checkpoint import QueryCheckpoint
+from jupiterone.circuit import CircuitBreaker
+from jupiterone.deadline import Deadline
+from jupiterone.paging import PageSizer
+from jupiterone.ratelimit import RateLimiter
+from jupiterone.records import to_records
+from jupiterone.transport import Transport, RequestsTransport
+
+FIND_CLAUSE = re.compile(
+    r'^(\s*FIND\s+(?:\([^)]*\)|\S+)(?:\s+AS\s+\w+)?)(\s+WITH\s+)?',
+    re.IGNORECASE
+)
+
+# Quoted strings, parentheses and the keywords that end the filters of a WITH clause
+WITH_CLAUSE_TOKEN = re.compile(
+    r"""'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*"|[()]|"""
+    r'(?<![.\w])(?:AS|THAT|WHERE|RETURN|ORDER|LIMIT|SKIP)(?=\s)(?!\s*[=!<>~^])',
+    re.IGNORECASE
+)
+
+# The top level cursor of a result page, found without decoding the page
+JSON_STRING = rb'"(?:[^"\\]|\\.)*"'
+PAGE_CURSOR_HEAD = re.compile(rb'\s*\{\s*"cursor"\s*:\s*(null|' + JSON_STRING + rb')')
+PAGE_CURSOR_TAIL = re.compile(rb'(?<!\\)"cursor"\s*:\s*(null|' + JSON_STRING + rb')\s*\}\s*$')
+PAGE_CURSOR_VALUE = re.compile(rb'\s*:\s*(null|' + JSON_STRING + rb')')
+JSON_TOKEN = re.compile(JSON_STRING + rb'|[{}\[\]]')
+
+
+def read_page_cursor(path: str) -> str:
+    """ Reads the top level cursor of a result page file without decoding the
+        rest of it.  The file is memory mapped and only scanned past the data
+        when the cursor is neither its first nor its last key.
+    """
+    with open(path, 'rb') as fileobj:
+        size = os.fstat(fileobj.fileno()).st_size
+        if not size:
+            return None
+        with mmap.mmap(fileobj.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            match = PAGE_CURSOR_HEAD.match(view) or PAGE_CURSOR_TAIL.search(view, max(0, size - 4096))
+            if match:
+                return json.loads(match.group(1))
+
+            depth = 0
+            for token in JSON_TOKEN.finditer(view):
+                value = token.group()
+                if value in (b'{', b'['):
+                    depth += 1
+                elif value in (b'}', b']'):
+                    depth -= 1
+                elif depth == 1 and value == b'"cursor"':
+                    match = PAGE_CURSOR_VALUE.match(view, token.end())
+                    if match:
+                        return json.loads(match.group(1))
+    return None
+
 
 def retry_on_429(exc):
     """ Used to trigger retry on rate limit """
     return isinstance(exc, JupiterOneApiRetryError)
 
 
+def j1ql_literal(value) -> str:
+    """ Formats a python value as a J1QL literal """
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (int, float)):
+        return str(value)
+    return "'{}'".format(str(value).replace("'", "\\'"))
+
+
+def with_clause_end(filters: str) -> int:
+    """ Returns where the filters following a WITH end, at the first keyword
+        outside quotes and parentheses that starts the next part of the query
+    """
+    depth = 0
+    for token in WITH_CLAUSE_TOKEN.finditer(filters):
+        value = token.group()
+        if value == '(':
+            depth += 1
+        elif value == ')':
+            if depth == 0:
+                return token.start()
+            depth -= 1
+        elif depth == 0 and value[0] not in '\'"':
+            return token.start()
+    return len(filters)
+
+
+def add_with_condition(query: str, condition: str) -> str:
+    """ Adds a condition to the WITH clause of the first FIND in a query.
+
+    The condition is ANDed ahead of any existing WITH filters, which are
+    parenthesized so that a filter using OR is still narrowed by it.
+    """
+    match = FIND_CLAUSE.match(query)
+    if not match:
+        raise JupiterOneClientError('Unable to add a condition to query: {}'.format(query))
+
+    rest = query[match.end():]
+    if match.group(2):
+        filters = rest[:with_clause_end(rest)].rstrip()
+        return '{} WITH {} AND ({}){}'.format(match.group(1), condition, filters, rest[len(filters):])
+    return '{} WITH {}{}'.format(match.group(1), condition, rest)
+
+
+def shard_condition(field: str, shard: Union[str, Tuple]) -> str:
+    """ Builds the J1QL condition selecting a single shard.
+
+    A (start, end) tuple selects the half open range start <= field < end,
+    where either bound may be None.  Any other value selects field = value.
+    """
+    if isinstance(shard, tuple):
+        start, end = shard
+        conditions = []
+        if start is not None:
+            conditions.append('{} >= {}'.format(field, j1ql_literal(start)))
+        if end is not None:
+            conditions.append('{} < {}'.format(field, j1ql_literal(end)))
+        if not conditions:
+            raise JupiterOneClientError('Shard range must have a start or end')
+        return ' AND '.join(conditions)
+    return '{} = {}'.format(field, j1ql_literal(shard))
+
+
+def result_id(item) -> str:
+    """ Returns the _id of a result row, tree vertex or edge, or of a record """
+    if isinstance(item, dict):
+        return (item.get('entity') or item.get('relationship') or {}).get('_id') or item.get('id')
+    return getattr(item, 'entity_id', None) or getattr(item, 'relationship_id', None) or item.id
+
+
+def is_tree(data) -> bool:
+    """ Whether a page of query data is a tree rather than a list of rows """
+    return isinstance(data, dict) and 'vertices' in data and 'edges' in data
+
+
+def merge_tree(tree: Dict, page: Dict, seen_vertices: set, seen_edges: set) -> int:
+    """ Appends the vertices and edges of a tree page that are not already in
+        tree, tracking their ids in the seen sets.  Returns how many were added.
+    """
+    added = 0
+    for items, seen, key in ((page['vertices'], seen_vertices, 'vertices'), (page['edges'], seen_edges, 'edges')):
+        for item in items:
+            item_id = result_id(item)
+            if item_id in seen:
+                continue
+            seen.add(item_id)
+            tree[key].append(item)
+            added += 1
+    return added
+
+
+def entity_variables(entity: Dict) -> Dict:
+    """ Maps create_entity arguments to createEntity mutation variables """
+    variables = {
+        'entityKey': entity['entity_key'],
+        'entityType': entity['entity_type'],
+        'entityClass': entity['entity_class']
+    }
+    if entity.get('timestamp'):
+        variables['timestamp'] = entity['timestamp']
+    if entity.get('properties'):
+        variables['properties'] = entity['properties']
+    return variables
+
+
+def relationship_variables(relationship: Dict) -> Dict:
+    """ Maps create_relationship arguments to createRelationship mutation variables """
+    variables = {
+        'relationshipKey': relationship['relationship_key'],
+        'relationshipType': relationship['relationship_type'],
+        'relationshipClass': relationship['relationship_class'],
+        'fromEntityId': relationship['from_entity_id'],
+        'toEntityId': relationship['to_entity_id']
+    }
+    if relationship.get('properties'):
+        variables['properties'] = relationship['properties']
+    return variables
+
+
+def delete_entity_variables(entity) -> Dict:
+    """ Maps an entity ID, or a dict with entity_id, to deleteEntity mutation variables """
+    if isinstance(entity, dict):
+        entity = entity['entity_id']
+    if not entity:
+        raise JupiterOneClientError('entity_id is required')
+    return {'entityId': entity}
+
+
+def batched(iterable: Iterable, size: int) -> Iterator[List]:
+    """ Lazily splits an iterable into lists of at most size items """
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def selection_set(fields) -> str:
+    """ Builds a GraphQL selection set from a string, a list of field names, or
+        a dict of field name to its sub-selection, e.g. {'entity': ['_id']}
+        gives 'entity { _id }'.  Lists may mix names and dicts.
+    """
+    if fields is None:
+        return None
+    if isinstance(fields, str):
+        return fields.strip()
+    if isinstance(fields, dict):
+        return ' '.join(
+            '{} {{ {} }}'.format(name, selection_set(subfields)) if subfields else name
+            for name, subfields in fields.items()
+        )
+    return ' '.join(selection_set(item) for item in fields)
+
+
+def is_item_error(exc: JupiterOneApiError) -> bool:
+    """ Whether a failed batch may have failed because of some of its items,
+        rather than credentials, an unavailable API or an open circuit
+    """
+    if isinstance(exc, (JupiterOneCircuitOpenError, JupiterOneTimeoutError)):
+        return False
+    return exc.status_code is None or (400 <= exc.status_code < 500 and exc.status_code not in (401, 403))
+
+
+PAGE_SIZE_ERROR = re.compile(r'time(?:d)? ?out|too large|payload', re.IGNORECASE)
+
+
+def is_page_size_error(exc: JupiterOneApiError) -> bool:
+    """ Whether a failed page may succeed when smaller: a server error, or
+        errors saying the query timed out or returned too much
+    """
+    if exc.status_code is not None:
+        return exc.status_code >= 500
+    return bool(PAGE_SIZE_ERROR.search(str(exc)))
+
+
+def attribute_errors(batch: List[Tuple[object, Dict]], exc: JupiterOnePartialDataError) -> List[Dict]:
+    """ Splits a partially failed batch mutation into a result per item, using
+        the alias at the start of each error path.  Items with neither data
+        nor an error of their own get the errors without a path.
+    """
+    errors: Dict[str, List[str]] = {}
+    unattributed: List[str] = []
+    for error in exc.errors:
+        path = error.get('path') if isinstance(error, dict) else None
+        message = error.get('message', str(error)) if isinstance(error, dict) else str(error)
+        if path:
+            errors.setdefault(str(path[0]), []).append(message)
+        else:
+            unattributed.append(message)
+
+    results = []
+    for index, (item, _) in enumerate(batch):
+        alias = 'm{}'.format(index)
+        response = exc.data.get(alias)
+        if alias in errors:
+            results.append({'input': item, 'error': '; '.join(errors[alias])})
+        elif response is not None:
+            results.append({'input': item, 'response': response})
+        else:
+            results.append({'input': item, 'error': '; '.join(unattributed) or 'No data returned'})
+    return results
+
+
+def build_batch_mutation(field: str, batch: List[Dict], selection: str = None) -> Tuple[str, Dict]:
+    """ Builds one mutation document running field once per set of variables,
+        each under its own alias.  Returns the document and its variables.
+    """
+    arguments = MUTATION_ARGUMENTS[field]
+    selection = selection or MUTATION_SELECTIONS[field]
+    declarations: List[str] = []
+    operations: List[str] = []
+    variables: Dict = {}
+
+    for index, item_variables in enumerate(batch):
+        alias = 'm{}'.format(index)
+        call_arguments = []
+        for name, value in item_variables.items():
+            variable = '{}_{}'.format(alias, name)
+            declarations.append('${}: {}'.format(variable, arguments[name]))
+            call_arguments.append('{}: ${}'.format(name, variable))
+            variables[variable] = value
+        operations.append('{}: {}({}) {{ {} }}'.format(alias, field, ', '.join(call_arguments), selection))
+
+    document = 'mutation Batch({}) {{\n  {}\n}}'.format(', '.join(declarations), '\n  '.join(operations))
+    return document, variables
+
+
+def time_range_shards(start: int, end: int, count: int) -> List[Tuple[int, int]]:
+    """ Splits the timestamp range [start, end) into count contiguous ranges
+
+    args:
+        start (int): Inclusive start timestamp in milliseconds
+        end (int): Exclusive end timestamp in milliseconds
+        count (int): Number of ranges to produce
+    """
+    if count < 1 or end <= start:
+        raise JupiterOneClientError('Invalid shard range')
+
+    step = -(-(end - start) // count)
+    bounds = list(range(start, end, step)) + [end]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
 class JupiterOneClient:
     """ Python client class for the JupiterOne GraphQL API """
     # pylint: disable=too-many-instance-attributes
@@ -45,12 +365,33 @@ class JupiterOneClient:
         'retry_on_exception': retry_on_429
     }
 
-    def __init__(self, account: str = None, token: str = None, url: str = DEFAULT_URL):
+    DEFERRED_POLL_OPTS = {
+        'wait_initial': 250,
+        'wait_max': 5000,
+        'stop_max_delay': 600000
+    }
+
+    DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+    # (connect, read) timeouts of a single request in seconds
+    DEFAULT_TIMEOUT = (10, 120)
+
+    def __init__(self, account: str = None, token: str = None, url: str = DEFAULT_URL,
+                 persisted_queries: bool = False, transport: Transport = None, rate_limit: float = None,
+                 circuit_breaker: CircuitBreaker = None, timeout: Union[float, Tuple[float, float]] = DEFAULT_TIMEOUT):
         self.account = account
         self.token = token
         self.url = url
+        self.transport = transport or RequestsTransport()
+        self.rate_limiter = RateLimiter(rate_limit) if rate_limit else None
+        self.circuit_breaker = circuit_breaker
+        self.timeout = timeout
+        self.persisted_queries = persisted_queries
+        self._query_hashes: Dict[str, str] = {}
+        self._local = threading.local()
         self.query_endpoint = self.url + '/graphql'
         self.rules_endpoint = self.url + '/rules/graphql'
+        self.sync_endpoint = self.url + '/persister/synchronization/jobs'
         self.headers = {
             'Authorization': 'Bearer {}'.format(self.token),
             'LifeOmic-Account': self.account
@@ -80,10 +421,47 @@ class JupiterOneClient:
             raise JupiterOneClientError('token is required')
         self._token = value
 
-    # pylint: disable=R1710
-    @retry(**RETRY_OPTS)
-    def _execute_query(self, query: str, variables: Dict = None) -> Dict:
+    def _retrying(self, deadline: Deadline = None) -> Retrying:
+        """ Retry policy of a request, with backoff sleeps cut short by the deadline """
+        if deadline is None:
+            return Retrying(**self.RETRY_OPTS)
+
+        opts = dict(self.RETRY_OPTS)
+        multiplier = opts.pop('wait_exponential_multiplier')
+        maximum = opts.pop('wait_exponential_max')
+        stop_max_delay = opts.pop('stop_max_delay')
+
+        def stop(attempt_number: int, delay_since_first_attempt_ms: int) -> bool:
+            return delay_since_first_attempt_ms >= stop_max_delay or deadline.expired()
+
+        def wait(previous_attempt_number: int, delay_since_first_attempt_ms: int) -> float:
+            return min(multiplier * 2 ** previous_attempt_number, maximum, deadline.remaining() * 1000)
+
+        return Retrying(stop_func=stop, wait_func=wait, **opts)
+
+    def _execute_query(self, query: str, variables: Dict = None, endpoint: str = None, deadline: Deadline = None) -> Dict:
+        """ Executes query against graphql endpoint, retrying when rate limited """
+        return self._retry(self._execute_once, query, variables, endpoint, deadline, deadline=deadline)
+
+    def _retry(self, func: Callable, *args, deadline: Deadline = None):
+        """ Calls func with the retry policy of the client, raising
+            JupiterOneTimeoutError when retries are cut short by the deadline
+        """
+        try:
+            return self._retrying(deadline).call(func, *args)
+        except JupiterOneApiRetryError as exc:
+            if deadline is not None and deadline.expired():
+                raise JupiterOneTimeoutError(
+                    'JupiterOne API call exceeded its {}s deadline'.format(deadline.seconds)
+                ) from exc
+            raise
+
+    def _execute_once(self, query: str, variables: Dict = None, endpoint: str = None, deadline: Deadline = None) -> Dict:
         """ Executes query against graphql endpoint """
+        timeout = self.timeout
+        if deadline is not None:
+            deadline.check()
+            timeout = deadline.cap(timeout)
 
         data = {
             'query': query
@@ -91,46 +469,154 @@ class JupiterOneClient:
         if variables:
             data.update(variables=variables)
 
-        response = requests.post(self.query_endpoint, headers=self.headers, json=data)
+        endpoint = endpoint or self.query_endpoint
 
-        # It is still unclear if all responses will have a status
-        # code of 200 or if 429 will eventually be used to 
-        # indicate rate limitting.  J1 devs are aware.
+        if self.persisted_queries:
+            return self._execute_persisted_query(data, endpoint, timeout)
+
+        return self._post(data, endpoint, timeout)
+
+    def _execute_persisted_query(self, data: Dict, endpoint: str, timeout=None) -> Dict:
+        """ Sends only the hash of the query document, falling back to the
+            full document when the server does not know the hash yet
+        """
+        query = data.pop('query')
+        query_hash = self._query_hashes.get(query)
+        if query_hash is None:
+            query_hash = hashlib.sha256(query.encode('utf-8')).hexdigest()
+            self._query_hashes[query] = query_hash
+
+        data['extensions'] = {
+            'persistedQuery': {
+                'version': 1,
+                'sha256Hash': query_hash
+            }
+        }
+
+        try:
+            return self._post(data, endpoint, timeout)
+        except JupiterOnePersistedQueryError as exc:
+            if exc.args[0] == PERSISTED_QUERY_NOT_SUPPORTED:
+                self.persisted_queries = False
+                data.pop('extensions')
+
+        data['query'] = query
+        return self._post(data, endpoint, timeout)
+
+    def _send(self, url: str, body: Dict = None, data: bytes = None, headers: Dict = None, timeout=None,
+              authorize: bool = True, fileobj=None):
+        """ Sends a request through the circuit breaker and rate limiter and
+            returns the response, a GET when there is neither body nor data.
+            With a fileobj the body of the GET is streamed into it instead.
+
+        args:
+            authorize (bool): Send the account and token headers, off for presigned result urls
+            fileobj: Binary file object a download is written to
+        """
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.before_call()
+
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+
+        if authorize:
+            headers = dict(self.headers, **headers) if headers else self.headers
+        try:
+            if fileobj is not None:
+                self.transport.download(url, fileobj, self.DOWNLOAD_CHUNK_SIZE, timeout=timeout)
+                response = None
+            elif data is not None:
+                response = self.transport.post(url, headers=headers, data=data, timeout=timeout)
+            elif body is not None:
+                response = self.transport.post(url, headers=headers, body=body, timeout=timeout)
+            else:
+                response = self.transport.get(url, headers=headers, timeout=timeout)
+        except JupiterOneApiError:
+            # The API answered, with an error that is not an outage
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.record_success()
+            raise
+        except Exception:  # pylint: disable=broad-except
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.record_failure()
+            raise
+
+        if self.circuit_breaker is not None:
+            if response is not None and (response.status_code == 429 or response.status_code >= 500):
+                self.circuit_breaker.record_failure()
+            else:
+                self.circuit_breaker.record_success()
+        return response
+
+    @staticmethod
+    def _raise_for_status(response) -> None:
+        """ Raises the error of a response whose status is not 200 """
         if response.status_code == 200:
-            if response._content:
-                content = json.loads(response._content)
-                if 'errors' in content:
-                    errors = content['errors']
-                    if len(errors) == 1:
-                        if '429' in errors[0]['message']:
-                            raise JupiterOneApiRetryError('JupiterOne API rate limit exceeded')
-                    raise JupiterOneApiError(content.get('errors'))
-                return response.json()
-
-        elif response.status_code == 401:
-            raise JupiterOneApiError('JupiterOne API query is unauthorized, check credentials.')
-
-        elif response.status_code in [429, 503]:
+            return
+
+        if response.status_code == 401:
+            raise JupiterOneApiError('JupiterOne API query is unauthorized, check credentials.', status_code=401)
+
+        if response.status_code in [429, 503]:
             raise JupiterOneApiRetryError('JupiterOne API rate limit exceeded')
 
-        else:
-            content = response._content
-            if isinstance(content, (bytes, bytearray)):
-                content = content.decode("utf-8")
-            if 'application/json' in response.headers.get('Content-Type', 'text/plain'):
-                data = json.loads(content)
-                content = data.get('error', data.get('errors', content))
-            raise JupiterOneApiError('{}:{}'.format(response.status_code, content))
-
-    def _cursor_query(self, query: str, cursor: str = None, include_deleted: bool = False) -> Dict:
-        """ Performs a V1 graph query using cursor pagination
-            args:
-                query (str): Query text
-                cursor (str): A pagination cursor for the initial query
-                include_deleted (bool): Include recently deleted entities in query/search
+        content = response.content
+        if isinstance(content, (bytes, bytearray)):
+            content = content.decode("utf-8")
+        if 'application/json' in response.headers.get('Content-Type', 'text/plain'):
+            data = json.loads(content)
+            content = data.get('error', data.get('errors', content))
+        raise JupiterOneApiError('{}:{}'.format(response.status_code, content), status_code=response.status_code)
+
+    def _rest_request(self, url: str, body: Dict = None, data: bytes = None, headers: Dict = None) -> Dict:
+        """ Sends a request to a REST endpoint, such as the synchronization API,
+            and returns its decoded JSON response.  Timeouts, 429 and 5xx
+            responses are retried with backoff, and raise JupiterOneApiError
+            once the retries are exhausted.
         """
+        try:
+            return self._retrying().call(self._rest_request_once, url, body, data, headers)
+        except JupiterOneApiRetryError as exc:
+            raise JupiterOneApiError('JupiterOne API request failed after retries: {}'.format(exc)) from exc
 
-        results: List = []
+    def _rest_request_once(self, url: str, body: Dict = None, data: bytes = None, headers: Dict = None) -> Dict:
+        response = self._send(url, body, data, headers, self.timeout)
+        if response.status_code >= 500:
+            raise JupiterOneApiRetryError('JupiterOne API unavailable ({})'.format(response.status_code))
+        self._raise_for_status(response)
+        return json.loads(response.content) if response.content else {}
+
+    # pylint: disable=R1710
+    def _post(self, data: Dict, endpoint: str, timeout=None) -> Dict:
+        """ Posts a request body to a graphql endpoint """
+        response = self._send(endpoint, body=data, timeout=timeout)
+
+        # It is still unclear if all responses will have a status
+        # code of 200 or if 429 will eventually be used to 
+        # indicate rate limitting.  J1 devs are aware.
+        self._raise_for_status(response)
+        if response.content:
+            self._local.response_bytes = len(response.content)
+            content = json.loads(response.content)
+            if 'errors' in content:
+                errors = content['errors']
+                for error in errors:
+                    code = (error.get('extensions') or {}).get('code', error.get('message'))
+                    if code in (PERSISTED_QUERY_NOT_FOUND, PERSISTED_QUERY_NOT_SUPPORTED):
+                        raise JupiterOnePersistedQueryError(code)
+                if len(errors) == 1:
+                    if '429' in errors[0]['message']:
+                        raise JupiterOneApiRetryError('JupiterOne API rate limit exceeded')
+                if content.get('data'):
+                    raise JupiterOnePartialDataError(errors, data=content['data'], errors=errors)
+                raise JupiterOneApiError(content.get('errors'))
+            return content
+
+    def _iter_cursor_pages(self, query: str, cursor: str = None, include_deleted: bool = False,
+                           deadline: Deadline = None) -> Iterator[Tuple[object, str]]:
+        """ Yields (data, cursor) for each page of a cursor paginated query,
+            where cursor is the cursor of the following page
+        """
         while True:
             variables = {
                 'query': query,
@@ -140,47 +626,330 @@ class JupiterOneClient:
             if cursor is not None:
                 variables['cursor'] = cursor
 
-            response = self._execute_query(query=CURSOR_QUERY_V1, variables=variables)
-            data = response['data']['queryV1']['data']
+            response = self._execute_query(query=CURSOR_QUERY_V1, variables=variables, deadline=deadline)
+            cursor = response['data']['queryV1'].get('cursor')
+            yield response['data']['queryV1']['data'], cursor
 
-            if 'vertices' in data and 'edges' in data:
-                return data
+            if cursor is None:
+                break
 
-            results.extend(data)
+    def _cursor_query(self, query: str, cursor: str = None, include_deleted: bool = False, records: bool = False,
+                      checkpoint: Union[str, QueryCheckpoint] = None, deadline: Deadline = None) -> Dict:
+        """ Performs a V1 graph query using cursor pagination
+            args:
+                query (str): Query text
+                cursor (str): A pagination cursor for the initial query
+                include_deleted (bool): Include recently deleted entities in query/search
+                records (bool): Return Entity/Relationship records instead of dicts
+                checkpoint (str): State file to persist progress to and resume from
+                deadline (Deadline): Time the whole query must complete by
+        """
+        if checkpoint is not None:
+            return self._checkpointed_cursor_query(query, cursor, include_deleted, records, checkpoint, deadline)
 
-            if 'cursor' in response['data']['queryV1'] and response['data']['queryV1']['cursor'] is not None:
-                cursor = response['data']['queryV1']['cursor']
-            else:
-                break
+        results: List = []
+        tree: Dict = None
+        seen_vertices: set = set()
+        seen_edges: set = set()
+        try:
+            for data, _ in self._iter_cursor_pages(query, cursor, include_deleted, deadline):
+                if records:
+                    data = to_records(data)
 
+                if is_tree(data):
+                    tree = tree or {'vertices': [], 'edges': []}
+                    merge_tree(tree, data, seen_vertices, seen_edges)
+                    continue
+
+                results.extend(data)
+        except JupiterOneTimeoutError as exc:
+            exc.partial = tree if tree is not None else {'data': results}
+            raise
+
+        if tree is not None:
+            return tree
         return {'data': results}
 
-    def _limit_and_skip_query(self, query: str, skip: int = J1QL_SKIP_COUNT, limit: int = J1QL_LIMIT_COUNT, include_deleted: bool = False) -> Dict:
+    def _checkpointed_cursor_query(self, query: str, cursor: str, include_deleted: bool, records: bool,
+                                   checkpoint: Union[str, QueryCheckpoint], deadline: Deadline = None) -> Dict:
+        """ Performs a cursor paginated query, persisting every page to a checkpoint
+            so an interrupted query resumes from the last page written
+        """
+        if not isinstance(checkpoint, QueryCheckpoint):
+            checkpoint = QueryCheckpoint(checkpoint)
+
+        try:
+            self._run_checkpoint(query, cursor, include_deleted, checkpoint, deadline)
+        except JupiterOneTimeoutError as exc:
+            results = list(checkpoint.rows())
+            exc.partial = {'data': to_records(results) if records else results}
+            raise
+
+        results = list(checkpoint.rows())
+        if records:
+            results = to_records(results)
+        return {'data': results}
+
+    def _run_checkpoint(self, query: str, cursor: str, include_deleted: bool, checkpoint: QueryCheckpoint,
+                        deadline: Deadline = None) -> Dict:
+        """ Fetches the pages of a query not yet written to a checkpoint, returning its final state """
+        state = checkpoint.load(query, include_deleted)
+        if state['rows'] or state['cursor']:
+            cursor = state['cursor']
+
+        if not state['complete']:
+            for data, next_cursor in self._iter_cursor_pages(query, cursor, include_deleted, deadline):
+                if is_tree(data):
+                    raise JupiterOneClientError('Checkpointing is not supported for tree queries')
+                checkpoint.append(data, next_cursor)
+
+        return checkpoint.state
+
+    def _limit_and_skip_query(self, query: str, skip: int = J1QL_SKIP_COUNT, limit: int = J1QL_LIMIT_COUNT, include_deleted: bool = False, records: bool = False,
+                              deadline: Deadline = None, page_sizer: PageSizer = None) -> Dict:
+        """ Performs a V1 graph query using limit and skip pagination.  With a
+            page_sizer the LIMIT of each page is chosen by the sizer from the
+            latency and size of the previous pages, and a page that times out
+            or fails with a server error is retried with a smaller LIMIT.
+        """
         results: List = []
-        page: int = 0
+        tree: Dict = None
+        seen_vertices: set = set()
+        seen_edges: set = set()
+        offset: int = 0
 
         while True:
+            if page_sizer is not None:
+                limit = skip = page_sizer.size
+
             variables = {
-                'query': f"{query} SKIP {page * skip} LIMIT {limit}",
+                'query': f"{query} SKIP {offset} LIMIT {limit}",
                 'includeDeleted': include_deleted
             }
-            response = self._execute_query(
-                query=QUERY_V1,
-                variables=variables
-            )
+            started = time.monotonic()
+            self._local.response_bytes = None
+            try:
+                response = self._execute_query(
+                    query=QUERY_V1,
+                    variables=variables,
+                    deadline=deadline
+                )
+            except JupiterOneTimeoutError as exc:
+                exc.partial = tree if tree is not None else {'data': results}
+                raise
+            except JupiterOneCircuitOpenError:
+                raise
+            except JupiterOneApiError as exc:
+                if page_sizer is not None and is_page_size_error(exc) and page_sizer.record_error():
+                    continue
+                raise
 
             data = response['data']['queryV1']['data']
+            if page_sizer is not None:
+                rows = len(data['vertices']) if is_tree(data) else len(data)
+                page_sizer.record(rows, time.monotonic() - started, self._local.response_bytes)
 
-            # If tree query then no pagination
-            if 'vertices' in data and 'edges' in data:
-                return data
+            if records:
+                data = to_records(data)
 
-            if len(data) < J1QL_SKIP_COUNT:
+            # Tree pages are merged until a page is short or adds nothing new
+            if is_tree(data):
+                tree = tree or {'vertices': [], 'edges': []}
+                added = merge_tree(tree, data, seen_vertices, seen_edges)
+                if not added or len(data['vertices']) < limit:
+                    return tree
+                offset += skip
+                continue
+
+            if len(data) < (J1QL_SKIP_COUNT if page_sizer is None else limit):
                 results.extend(data)
                 break
 
             results.extend(data)
-            page += 1
+            offset += skip
+
+        return {'data': results}
+
+    def _poll_deferred(self, status_url: str, deadline: Deadline = None) -> str:
+        """ Polls a deferred query status url with backoff until the result is
+            ready and returns the url the result can be downloaded from
+        """
+        opts = self.DEFERRED_POLL_OPTS
+        wait = opts['wait_initial'] / 1000
+        poll_deadline = time.monotonic() + opts['stop_max_delay'] / 1000
+
+        while True:
+            status = self._retry(self._fetch_deferred_status, status_url, deadline, deadline=deadline)
+            if status['status'] == 'COMPLETED':
+                return status['url']
+            if status['status'] == 'FAILED':
+                raise JupiterOneApiError(status.get('error', 'JupiterOne deferred query failed'))
+
+            if time.monotonic() + wait > poll_deadline:
+                raise JupiterOneApiError('JupiterOne deferred query did not complete in time')
+            if deadline is not None:
+                wait = min(wait, deadline.remaining())
+            time.sleep(wait)
+            wait = min(wait * 2, opts['wait_max'] / 1000)
+
+    def _fetch_deferred_status(self, status_url: str, deadline: Deadline = None) -> Dict:
+        """ Fetches the status of a deferred query once """
+        timeout = self.timeout
+        if deadline is not None:
+            deadline.check()
+            timeout = deadline.cap(timeout)
+
+        response = self._send(status_url, timeout=timeout, authorize=False)
+        if response.status_code == 429 or response.status_code >= 500:
+            raise JupiterOneApiRetryError('JupiterOne deferred query status unavailable ({})'.format(response.status_code))
+        if response.status_code != 200:
+            raise JupiterOneApiError('{}:{}'.format(response.status_code, response.text), status_code=response.status_code)
+        return response.json()
+
+    def _download(self, url: str, fileobj, deadline: Deadline = None) -> None:
+        """ Downloads a deferred result into fileobj once, replacing anything
+            written by an earlier attempt
+        """
+        timeout = self.timeout
+        if deadline is not None:
+            deadline.check()
+            timeout = deadline.cap(timeout)
+
+        fileobj.seek(0)
+        fileobj.truncate()
+        self._send(url, timeout=timeout, authorize=False, fileobj=fileobj)
+
+    def _deferred_query(self, query: str, cursor: str = None, include_deleted: bool = False, output_dir: str = None, records: bool = False,
+                        deadline: Deadline = None) -> Dict:
+        """ Performs a V1 graph query using a deferred response.  The API prepares
+            each page of results asynchronously and it is then downloaded in bulk.
+            args:
+                query (str): Query text
+                cursor (str): A pagination cursor for the initial query
+                include_deleted (bool): Include recently deleted entities in query/search
+                output_dir (str): Directory to stream result pages into instead of memory, only
+                    the cursor of each page is read back
+                records (bool): Return Entity/Relationship records instead of dicts
+                deadline (Deadline): Time the whole query must complete by
+        """
+        results: List = []
+        tree: Dict = None
+        seen_vertices: set = set()
+        seen_edges: set = set()
+        files: List = []
+        while True:
+            variables = {
+                'query': query,
+                'includeDeleted': include_deleted,
+                'flags': {
+                    'variableResultSize': True
+                }
+            }
+
+            if cursor is not None:
+                variables['cursor'] = cursor
+
+            try:
+                response = self._execute_query(query=DEFERRED_QUERY_V1, variables=variables, deadline=deadline)
+                download_url = self._poll_deferred(response['data']['queryV1']['url'], deadline)
+
+                if output_dir:
+                    path = os.path.join(output_dir, 'page-{:05d}.json'.format(len(files)))
+                    with open(path, 'wb') as fileobj:
+                        self._retry(self._download, download_url, fileobj, deadline, deadline=deadline)
+                    files.append(path)
+                    page = {'cursor': read_page_cursor(path)}
+                else:
+                    buffer = io.BytesIO()
+                    self._retry(self._download, download_url, buffer, deadline, deadline=deadline)
+                    page = json.loads(buffer.getvalue())
+            except JupiterOneTimeoutError as exc:
+                if output_dir:
+                    exc.partial = {'files': files}
+                else:
+                    exc.partial = tree if tree is not None else {'data': results}
+                raise
+
+            if not output_dir:
+                data = page['data']
+                if records:
+                    data = to_records(data)
+
+                if is_tree(data):
+                    tree = tree or {'vertices': [], 'edges': []}
+                    merge_tree(tree, data, seen_vertices, seen_edges)
+                else:
+                    results.extend(data)
+
+            if page.get('cursor') is not None:
+                cursor = page['cursor']
+            else:
+                break
+
+        if output_dir:
+            return {'files': files}
+        if tree is not None:
+            return tree
+        return {'data': results}
+
+    def _sharded_query(self, query: str, shard_by: str, shards: List, max_workers: int = 4, include_deleted: bool = False, records: bool = False,
+                       deadline: Deadline = None) -> Dict:
+        """ Splits a query into disjoint shards and runs their cursor chains in parallel
+            args:
+                query (str): Query text
+                shard_by (str): Field the shards are selected on, e.g. _type or _createdOn
+                shards (list): Values, or (start, end) ranges, of shard_by
+                max_workers (int): Number of shards queried concurrently
+                include_deleted (bool): Include recently deleted entities in query/search
+                records (bool): Return Entity/Relationship records instead of dicts
+                deadline (Deadline): Time every shard must complete by
+        """
+        queries = [add_with_condition(query, shard_condition(shard_by, shard)) for shard in shards]
+
+        def run(shard_query: str) -> Dict:
+            return self._cursor_query(query=shard_query, include_deleted=include_deleted, records=records, deadline=deadline)
+
+        shard_results: List = []
+        timed_out: JupiterOneTimeoutError = None
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for future in [executor.submit(run, shard_query) for shard_query in queries]:
+                try:
+                    shard_results.append(future.result())
+                except JupiterOneTimeoutError as exc:
+                    timed_out = timed_out or exc
+                    if exc.partial is not None:
+                        shard_results.append(exc.partial)
+
+        merged = self._merge_shards(shard_results)
+        if timed_out is not None:
+            timed_out.partial = merged
+            raise timed_out
+        return merged
+
+    @staticmethod
+    def _merge_shards(shard_results: List[Dict]) -> Dict:
+        """ Merges the results of disjoint shards, dropping rows returned by more than one """
+        seen = set()
+
+        def unseen(item) -> bool:
+            item_id = result_id(item)
+            if item_id is None:
+                return True
+            if item_id in seen:
+                return False
+            seen.add(item_id)
+            return True
+
+        if shard_results and is_tree(shard_results[0]):
+            tree = {'vertices': [], 'edges': []}
+            seen_edges: set = set()
+            for result in shard_results:
+                merge_tree(tree, result, seen, seen_edges)
+            return tree
+
+        results: List = []
+        for result in shard_results:
+            results.extend(row for row in result['data'] if unseen(row))
 
         return {'data': results}
 
@@ -192,27 +961,103 @@ class JupiterOneClient:
                 limit (int): Limit entity count
                 cursor (str): A pagination cursor for the initial query
                 include_deleted (bool): Include recently deleted entities in query/search
+                shard_by (str): Field to split the query on, e.g. _type, _class or _createdOn
+                shards (list): Values, or (start, end) ranges, of shard_by to query in parallel
+                max_workers (int): Number of shards queried concurrently
+                deferred (bool): Let the API prepare the result asynchronously and download it in bulk
+                output_dir (str): With deferred, stream result pages to files in this directory
+                records (bool): Return compact Entity/Relationship records instead of dicts
+                checkpoint (str): State file to persist cursor progress to, and resume from.  A complete
+                    checkpoint returns its saved rows without querying again until it is removed
+                deadline (float): Seconds the whole query, including retries and every page, may take
+                partial_results (bool): Return the results fetched so far instead of raising
+                    JupiterOneTimeoutError when the deadline is exceeded
+                page_sizer (PageSizer): Use limit and skip pagination with the LIMIT of each
+                    page adapted to the observed latency, response size and errors
         """
-        uses_limit_and_skip: bool = 'skip' in kwargs.keys() or 'limit' in kwargs.keys()
+        uses_limit_and_skip: bool = 'skip' in kwargs.keys() or 'limit' in kwargs.keys() or 'page_sizer' in kwargs.keys()
         skip: int = kwargs.pop('skip', J1QL_SKIP_COUNT)
         limit: int = kwargs.pop('limit', J1QL_LIMIT_COUNT)
         include_deleted: bool = kwargs.pop('include_deleted', False)
         cursor: str = kwargs.pop('cursor', None)
+        shard_by: str = kwargs.pop('shard_by', None)
+        shards: List = kwargs.pop('shards', None)
+        max_workers: int = kwargs.pop('max_workers', 4)
+        deferred: bool = kwargs.pop('deferred', False)
+        output_dir: str = kwargs.pop('output_dir', None)
+        records: bool = kwargs.pop('records', False)
+        checkpoint: str = kwargs.pop('checkpoint', None)
+        deadline: Deadline = Deadline.after(kwargs.pop('deadline', None))
+        partial_results: bool = kwargs.pop('partial_results', False)
+        page_sizer: PageSizer = kwargs.pop('page_sizer', None)
 
-        if uses_limit_and_skip:
-            warn('limit and skip pagination is no longer a recommended method for pagination. To read more about using cursors checkout the JupiterOne documentation: https://support.jupiterone.io/hc/en-us/articles/360022722094#entityandrelationshipqueries', DeprecationWarning, stacklevel=2)
-            return self._limit_and_skip_query(
-                query=query,
-                skip=skip,
-                limit=limit,
-                include_deleted=include_deleted
-            )
-        else:
-            return self._cursor_query(
-                query=query,
-                cursor=cursor,
-                include_deleted=include_deleted
-            )
+        if checkpoint is not None and (uses_limit_and_skip or shard_by or deferred):
+            raise JupiterOneClientError('Checkpoints are only supported for cursor queries')
+
+        try:
+            if deferred:
+                if uses_limit_and_skip or shard_by:
+                    raise JupiterOneClientError('Deferred queries do not support skip, limit or shards')
+                if output_dir and records:
+                    raise JupiterOneClientError('records are not supported with output_dir, pages are written as JSON')
+                return self._deferred_query(
+                    query=query,
+                    cursor=cursor,
+                    include_deleted=include_deleted,
+                    output_dir=output_dir,
+                    records=records,
+                    deadline=deadline
+                )
+
+            if shard_by:
+                if uses_limit_and_skip or cursor is not None:
+                    raise JupiterOneClientError('Sharded queries do not support skip, limit or cursor')
+                if not shards:
+                    raise JupiterOneClientError('shards are required when using shard_by')
+                return self._sharded_query(
+                    query=query,
+                    shard_by=shard_by,
+                    shards=shards,
+                    max_workers=max_workers,
+                    include_deleted=include_deleted,
+                    records=records,
+                    deadline=deadline
+                )
+
+            if uses_limit_and_skip:
+                if page_sizer is None:
+                    warn('limit and skip pagination is no longer a recommended method for pagination. To read more about using cursors checkout the JupiterOne documentation: https://support.jupiterone.io/hc/en-us/articles/360022722094#entityandrelationshipqueries', DeprecationWarning, stacklevel=2)
+                return self._limit_and_skip_query(
+                    query=query,
+                    skip=skip,
+                    limit=limit,
+                    include_deleted=include_deleted,
+                    records=records,
+                    deadline=deadline,
+                    page_sizer=page_sizer
+                )
+            else:
+                return self._cursor_query(
+                    query=query,
+                    cursor=cursor,
+                    include_deleted=include_deleted,
+                    records=records,
+                    checkpoint=checkpoint,
+                    deadline=deadline
+                )
+        except JupiterOneTimeoutError as exc:
+            if partial_results and exc.partial is not None:
+                return exc.partial
+            raise
+
+    def _execute_mutation(self, field: str, document: str, variables: Dict, fields=None) -> Dict:
+        """ Runs a single mutation, building its document from fields when a
+            selection other than the default one is requested
+        """
+        if fields is None:
+            response = self._execute_query(query=document, variables=variables)
+            return response['data'][field]
+        return self._execute_batch(field, [variables], selection=selection_set(fields))[0]
 
     def create_entity(self, **kwargs) -> Dict:
         """ Creates an entity in graph.  It will also update an existing entity.
@@ -223,53 +1068,39 @@ class JupiterOneClient:
             entity_class (str): Value for _class of entity
             timestamp (int): Specify createdOn timestamp
             properties (dict): Dictionary of key/value entity properties
+            fields: Response fields to select, see selection_set, e.g. {'entity': ['_id']}
         """
-        variables = {
-            'entityKey': kwargs.pop('entity_key'),
-            'entityType': kwargs.pop('entity_type'),
-            'entityClass': kwargs.pop('entity_class')
-        }
+        fields = kwargs.pop('fields', None)
+        variables = entity_variables(kwargs)
 
-        timestamp: int = kwargs.pop('timestamp', None)
-        properties: Dict = kwargs.pop('properties', None)
+        return self._execute_mutation('createEntity', CREATE_ENTITY, variables, fields)
 
-        if timestamp:
-            variables.update(timestamp=timestamp)
-        if properties:
-            variables.update(properties=properties)
-
-        response = self._execute_query(
-            query=CREATE_ENTITY,
-            variables=variables
-        )
-        return response['data']['createEntity']
-
-    def delete_entity(self, entity_id: str = None) -> Dict:
+    def delete_entity(self, entity_id: str = None, fields=None) -> Dict:
         """ Deletes an entity from the graph.  Note this is a hard delete.
 
         args:
             entity_id (str): Entity ID for entity to delete
+            fields: Response fields to select, see selection_set
         """
         variables = {
             'entityId': entity_id
         }
-        response = self._execute_query(DELETE_ENTITY, variables=variables)
-        return response['data']['deleteEntity']
+        return self._execute_mutation('deleteEntity', DELETE_ENTITY, variables, fields)
 
-    def update_entity(self, entity_id: str = None, properties: Dict = None) -> Dict:
+    def update_entity(self, entity_id: str = None, properties: Dict = None, fields=None) -> Dict:
         """
         Update an existing entity.
 
         args:
             entity_id (str): The _id of the entity to udate
             properties (dict): Dictionary of key/value entity properties
+            fields: Response fields to select, see selection_set
         """
         variables = {
             'entityId': entity_id,
             'properties': properties
         }
-        response = self._execute_query(UPDATE_ENTITY, variables=variables)
-        return response['data']['updateEntity']
+        return self._execute_mutation('updateEntity', UPDATE_ENTITY, variables, fields)
 
     def create_relationship(self, **kwargs) -> Dict:
         """
@@ -281,37 +1112,337 @@ class JupiterOneClient:
             relationship_class (str): Value for _class of relationship
             from_entity_id (str): Entity ID of the source vertex
             to_entity_id (str): Entity ID of the destination vertex
+            fields: Response fields to select, see selection_set, e.g. {'relationship': ['_id']}
         """
-        variables = {
-            'relationshipKey': kwargs.pop('relationship_key'),
-            'relationshipType': kwargs.pop('relationship_type'),
-            'relationshipClass': kwargs.pop('relationship_class'),
-            'fromEntityId': kwargs.pop('from_entity_id'),
-            'toEntityId': kwargs.pop('to_entity_id')
-        }
+        fields = kwargs.pop('fields', None)
+        variables = relationship_variables(kwargs)
 
-        properties = kwargs.pop('properties', None)
-        if properties:
-            variables['properties'] = properties
+        return self._execute_mutation('createRelationship', CREATE_RELATIONSHIP, variables, fields)
 
-        response = self._execute_query(
-            query=CREATE_RELATIONSHIP,
-            variables=variables
-        )
-        return response['data']['createRelationship']
-
-    def delete_relationship(self, relationship_id: str = None):
+    def delete_relationship(self, relationship_id: str = None, fields=None):
         """ Deletes a relationship between two entities.
 
         args:
             relationship_id (str): The ID of the relationship
+            fields: Response fields to select, see selection_set
         """
         variables = {
             'relationshipId': relationship_id
         }
 
-        response = self._execute_query(
-            DELETE_RELATIONSHIP,
-            variables=variables
-        )
-        return response['data']['deleteRelationship']
+        return self._execute_mutation('deleteRelationship', DELETE_RELATIONSHIP, variables, fields)
+
+    def _execute_batch(self, field: str, batch: List[Dict], deadline: Deadline = None, selection: str = None) -> List[Dict]:
+        """ Runs a mutation for each set of variables in a single request """
+        document, variables = build_batch_mutation(field, batch, selection)
+        response = self._execute_query(query=document, variables=variables, deadline=deadline)
+        return [response['data']['m{}'.format(index)] for index in range(len(batch))]
+
+    def _mutation_batch(self, field: str, batch: List, to_variables: Callable[[object], Dict],
+                        deadline: Deadline = None, selection: str = None) -> List[Dict]:
+        """ Runs a batch of mutations, returning a result per item.  When the
+            response has data, errors are attributed to items by the alias in
+            their path and the other items succeeded.  A batch failing without
+            data is retried one item at a time so that only the items that
+            actually fail are reported with an error, unless the error is not
+            caused by the items, such as a 401 or 5xx response.
+        """
+        results: List[Dict] = []
+        valid: List[Tuple[object, Dict]] = []
+        for item in batch:
+            try:
+                valid.append((item, to_variables(item)))
+            except (KeyError, TypeError, ValueError, JupiterOneClientError) as exc:
+                results.append({'input': item, 'error': 'Invalid input: {}'.format(exc)})
+
+        if not valid:
+            return results
+
+        try:
+            responses = self._execute_batch(field, [variables for _, variables in valid], deadline, selection)
+            results.extend({'input': item, 'response': response} for (item, _), response in zip(valid, responses))
+        except JupiterOneTimeoutError as exc:
+            results.extend({'input': item, 'error': str(exc)} for item, _ in valid)
+        except JupiterOnePartialDataError as exc:
+            results.extend(attribute_errors(valid, exc))
+        except JupiterOneApiError as exc:
+            if len(valid) == 1 or not is_item_error(exc):
+                results.extend({'input': item, 'error': str(exc)} for item, _ in valid)
+            else:
+                for item, _ in valid:
+                    results.extend(self._mutation_batch(field, [item], to_variables, deadline, selection))
+        return results
+
+    def _bulk_mutation(self, field: str, items: Iterable, to_variables: Callable[[object], Dict], **kwargs) -> Iterator[Dict]:
+        """ Runs a mutation for every item, batching several items per request
+            and sending batches concurrently.  Yields a result per item as its
+            batch completes, holding at most two batches per worker in memory.
+
+            Once the deadline passes no further batches are sent; the batches already
+            in flight are drained before JupiterOneTimeoutError is raised, or
+            the generator simply ends when partial_results is set.
+        """
+        batch_size: int = kwargs.pop('batch_size', BULK_BATCH_SIZE)
+        max_workers: int = kwargs.pop('max_workers', 4)
+        deadline: Deadline = Deadline.after(kwargs.pop('deadline', None))
+        partial_results: bool = kwargs.pop('partial_results', False)
+        selection: str = selection_set(kwargs.pop('fields', None))
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = set()
+            for batch in batched(items, batch_size):
+                if len(pending) >= max_workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield from future.result()
+                if deadline is not None and deadline.expired():
+                    break
+                pending.add(executor.submit(self._mutation_batch, field, batch, to_variables, deadline, selection))
+
+            for future in as_completed(pending):
+                yield from future.result()
+
+        if deadline is not None and deadline.expired() and not partial_results:
+            deadline.check()
+
+    def bulk_create_entities(self, entities: Iterable[Dict], **kwargs) -> Iterator[Dict]:
+        """ Creates or updates many entities, batching them into concurrent requests.
+
+        Returns a generator yielding {'input': entity, 'response': ...} for every
+        entity created, or {'input': entity, 'error': ...} when it failed.
+        Results are yielded in completion order.
+
+        args:
+            entities (iterable): Dicts with the arguments of create_entity
+            batch_size (int): Number of entities created per request
+            max_workers (int): Number of requests sent concurrently
+            fields: Response fields to select for each item, see selection_set
+            deadline (float): Seconds after which no further batches are sent
+            partial_results (bool): End quietly at the deadline instead of raising JupiterOneTimeoutError
+        """
+        return self._bulk_mutation('createEntity', entities, entity_variables, **kwargs)
+
+    def bulk_create_relationships(self, relationships: Iterable[Dict], **kwargs) -> Iterator[Dict]:
+        """ Creates many relationships, batching them into concurrent requests.
+            Results are yielded the same way as bulk_create_entities.
+
+        args:
+            relationships (iterable): Dicts with the arguments of create_relationship
+            batch_size (int): Number of relationships created per request
+            max_workers (int): Number of requests sent concurrently
+            fields: Response fields to select for each item, see selection_set
+            deadline (float): Seconds after which no further batches are sent
+            partial_results (bool): End quietly at the deadline instead of raising JupiterOneTimeoutError
+        """
+        return self._bulk_mutation('createRelationship', relationships, relationship_variables, **kwargs)
+
+    def bulk_delete_entities(self, entity_ids: Iterable, **kwargs) -> Iterator[Dict]:
+        """ Deletes many entities, batching them into concurrent requests.
+            Results are yielded the same way as bulk_create_entities.
+
+        args:
+            entity_ids (iterable): Entity IDs, or dicts with an entity_id
+            batch_size (int): Number of entities deleted per request
+            max_workers (int): Number of requests sent concurrently
+            fields: Response fields to select for each item, see selection_set
+            deadline (float): Seconds after which no further batches are sent
+            partial_results (bool): End quietly at the deadline instead of raising JupiterOneTimeoutError
+        """
+        return self._bulk_mutation('deleteEntity', entity_ids, delete_entity_variables, **kwargs)
+
+    def delete_where(self, query: str, **kwargs) -> Dict:
+        """ Deletes every entity matched by a query.  Entity IDs are streamed from
+            the cursor pages straight into batched, concurrent deletes, so memory
+            use does not depend on how many entities match.
+
+        Returns a report with the number of entities matched, deleted and failed,
+        the failed results, the elapsed seconds and the rate per second.
+
+        args:
+            query (str): Query text returning entities, tree queries are not supported
+            dry_run (bool): Only count the matching entities
+            batch_size (int): Number of entities deleted per request
+            max_workers (int): Number of requests sent concurrently
+            rate_limit (float): Maximum number of entities deleted per second
+            progress (callable): Called with the report every progress_interval entities
+            progress_interval (int): Number of entities between progress callbacks
+            max_errors (int): Number of failed results kept in the report
+        """
+        dry_run: bool = kwargs.pop('dry_run', False)
+        batch_size: int = kwargs.pop('batch_size', BULK_BATCH_SIZE)
+        rate_limit: float = kwargs.pop('rate_limit', None)
+        progress: Callable[[Dict], None] = kwargs.pop('progress', None)
+        progress_interval: int = kwargs.pop('progress_interval', 1000)
+        max_errors: int = kwargs.pop('max_errors', 1000)
+
+        started = time.monotonic()
+        stats = {'matched': 0, 'deleted': 0, 'failed': 0, 'errors': []}
+
+        def report() -> Dict:
+            elapsed = time.monotonic() - started
+            done = stats['matched'] if dry_run else stats['deleted'] + stats['failed']
+            return dict(stats, dry_run=dry_run, elapsed=elapsed, rate=done / elapsed if elapsed else 0.0)
+
+        def entity_ids() -> Iterator[str]:
+            limiter = RateLimiter(rate_limit, burst=batch_size) if rate_limit else None
+            for row in self.iter_query(query):
+                entity_id = result_id(row)
+                stats['matched'] += 1
+                if limiter is not None:
+                    limiter.acquire()
+                yield entity_id
+
+        if dry_run:
+            for _ in entity_ids():
+                if progress and stats['matched'] % progress_interval == 0:
+                    progress(report())
+        else:
+            results = self._bulk_mutation(
+                'deleteEntity',
+                entity_ids(),
+                delete_entity_variables,
+                batch_size=batch_size,
+                fields=MUTATION_MINIMAL_SELECTIONS['deleteEntity'],
+                **kwargs
+            )
+            for result in results:
+                if 'error' in result:
+                    stats['failed'] += 1
+                    if len(stats['errors']) < max_errors:
+                        stats['errors'].append(result)
+                else:
+                    stats['deleted'] += 1
+                if progress and (stats['deleted'] + stats['failed']) % progress_interval == 0:
+                    progress(report())
+
+        final = report()
+        if progress:
+            progress(final)
+        return final
+
+    def iter_query(self, query: str, include_deleted: bool = False, cursor: str = None) -> Iterator[Dict]:
+        """ Streams the rows of a query, fetching them one cursor page at a time
+
+        args:
+            query (str): Query text, tree queries are not supported
+            include_deleted (bool): Include recently deleted entities in query/search
+            cursor (str): A pagination cursor for the initial query
+        """
+        for data, _ in self._iter_cursor_pages(query, cursor, include_deleted):
+            if is_tree(data):
+                raise JupiterOneClientError('Streaming is not supported for tree queries')
+            yield from data
+
+    def export_query(self, query: str, path: str, include_deleted: bool = False, checkpoint: str = None) -> int:
+        """ Writes the rows of a query to an NDJSON file and returns the row count.
+            With a checkpoint, an interrupted export resumes from the last page written,
+            which requires the same path.  An export whose checkpoint is already complete
+            returns its row count without querying again.
+
+        args:
+            query (str): Query text, tree queries are not supported
+            path (str): File the rows are written to
+            include_deleted (bool): Include recently deleted entities in query/search
+            checkpoint (str): State file to persist progress to and resume from
+        """
+        if checkpoint is not None:
+            state = self._run_checkpoint(query, None, include_deleted, QueryCheckpoint(checkpoint, rows_path=path))
+            return state['rows']
+
+        count = 0
+        with open(path, 'wb') as fileobj:
+            for row in self.iter_query(query, include_deleted=include_deleted):
+                fileobj.write(json.dumps(row, separators=(',', ':')).encode('utf-8'))
+                fileobj.write(b'\n')
+                count += 1
+        return count
+
+    def iter_alert_rules(self, limit: int = 100, filters: Dict = None) -> Iterator[Dict]:
+        """ Streams alert rule definitions, fetching them a page at a time.
+
+        args:
+            limit (int): Number of rules fetched per page
+            filters (dict): ListRuleInstancesFilters to narrow the rules returned
+        """
+        cursor = None
+        while True:
+            variables = {
+                'limit': limit
+            }
+            if cursor is not None:
+                variables['cursor'] = cursor
+            if filters:
+                variables['filters'] = filters
+
+            response = self._execute_query(
+                query=LIST_RULE_INSTANCES,
+                variables=variables,
+                endpoint=self.rules_endpoint
+            )
+            page = response['data']['listRuleInstances']
+            yield from page['questionInstances']
+
+            if not page['pageInfo']['hasNextPage']:
+                break
+            cursor = page['pageInfo']['endCursor']
+
+    def list_alert_rules(self, **kwargs) -> List[Dict]:
+        """ Lists all alert rule definitions.  Accepts the same arguments as iter_alert_rules. """
+        return list(self.iter_alert_rules(**kwargs))
+
+    def iter_rule_evaluations(self, rule_id: str, begin_timestamp: int, end_timestamp: int = None, limit: int = 100) -> Iterator[Dict]:
+        """ Streams the evaluation results of an alert rule, a page at a time.
+
+        args:
+            rule_id (str): ID of the rule instance
+            begin_timestamp (int): Start of the evaluation window in milliseconds
+            end_timestamp (int): End of the evaluation window in milliseconds, defaults to now
+            limit (int): Number of evaluations fetched per page
+        """
+        end_timestamp = end_timestamp or int(time.time() * 1000)
+        cursor = None
+        while True:
+            variables = {
+                'collectionType': 'RULE_EVALUATION',
+                'collectionOwnerId': rule_id,
+                'beginTimestamp': begin_timestamp,
+                'endTimestamp': end_timestamp,
+                'limit': limit
+            }
+            if cursor is not None:
+                variables['cursor'] = cursor
+
+            response = self._execute_query(
+                query=LIST_RULE_EVALUATIONS,
+                variables=variables,
+                endpoint=self.rules_endpoint
+            )
+            page = response['data']['listCollectionResults']
+            yield from page['results']
+
+            cursor = page['pageInfo']['endCursor']
+            if not cursor:
+                break
+
+    def bulk_rule_evaluations(self, rule_ids: List[str], begin_timestamp: int, end_timestamp: int = None, **kwargs) -> Iterator[Tuple[str, List[Dict]]]:
+        """ Fetches the evaluation results of many alert rules concurrently,
+            yielding (rule_id, evaluations) tuples as each rule completes.
+
+        args:
+            rule_ids (list): IDs of the rule instances
+            begin_timestamp (int): Start of the evaluation window in milliseconds
+            end_timestamp (int): End of the evaluation window in milliseconds, defaults to now
+            limit (int): Number of evaluations fetched per page
+            max_workers (int): Number of rules fetched concurrently
+        """
+        limit: int = kwargs.pop('limit', 100)
+        max_workers: int = kwargs.pop('max_workers', 4)
+        end_timestamp = end_timestamp or int(time.time() * 1000)
+
+        def fetch(rule_id: str) -> List[Dict]:
+            return list(self.iter_rule_evaluations(rule_id, begin_timestamp, end_timestamp, limit))
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(fetch, rule_id): rule_id for rule_id in rule_ids}
+            for future in as_completed(futures):
+                yield futures[future], future.result()
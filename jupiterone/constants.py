@@ -1,6 +1,9 @@
 J1QL_SKIP_COUNT = 250
 J1QL_LIMIT_COUNT = 250
 
+PERSISTED_QUERY_NOT_FOUND = 'PERSISTED_QUERY_NOT_FOUND'
+PERSISTED_QUERY_NOT_SUPPORTED = 'PERSISTED_QUERY_NOT_SUPPORTED'
+
 QUERY_V1 = """
   query J1QL($query: String!, $variables: JSON, $dryRun: Boolean, $includeDeleted: Boolean) {
     queryV1(query: $query, variables: $variables, dryRun: $dryRun, includeDeleted: $includeDeleted) {
@@ -28,6 +31,23 @@ CURSOR_QUERY_V1 = """
   }
 """
 
+DEFERRED_QUERY_V1 = """
+  query J1QL_deferred($query: String!, $variables: JSON, $flags: QueryV1Flags, $includeDeleted: Boolean, $cursor: String) {
+    queryV1(
+      query: $query
+      variables: $variables
+      deferredResponse: FORCE
+      flags: $flags
+      includeDeleted: $includeDeleted
+      cursor: $cursor
+    ) {
+      type
+      url
+      __typename
+    }
+  }
+"""
+
 CREATE_ENTITY = """
   mutation CreateEntity(
     $entityKey: String!
@@ -134,4 +154,136 @@ DELETE_RELATIONSHIP = """
       }
     }
   }
-"""
\ No newline at end of file
+"""
+
+LIST_RULE_INSTANCES = """
+  query listRuleInstances($limit: Int, $cursor: String, $filters: ListRuleInstancesFilters) {
+    listRuleInstances(limit: $limit, cursor: $cursor, filters: $filters) {
+      questionInstances {
+        id
+        name
+        description
+        version
+        specVersion
+        pollingInterval
+        lastEvaluationStartOn
+        lastEvaluationEndOn
+        evaluationStep
+        latestAlertId
+        latestAlertIsActive
+        question {
+          queries {
+            query
+            version
+            name
+          }
+        }
+        operations {
+          when
+          actions
+        }
+        outputs
+        tags
+      }
+      pageInfo {
+        hasNextPage
+        endCursor
+      }
+    }
+  }
+"""
+
+LIST_RULE_EVALUATIONS = """
+  query ListCollectionResults(
+    $collectionType: CollectionType!
+    $collectionOwnerId: String!
+    $beginTimestamp: Long!
+    $endTimestamp: Long!
+    $limit: Int
+    $cursor: String
+  ) {
+    listCollectionResults(
+      collectionType: $collectionType
+      collectionOwnerId: $collectionOwnerId
+      beginTimestamp: $beginTimestamp
+      endTimestamp: $endTimestamp
+      limit: $limit
+      cursor: $cursor
+    ) {
+      results {
+        accountId
+        collectionOwnerId
+        collectionOwnerVersion
+        collectionType
+        outputs {
+          name
+          value
+        }
+        rawDataDescriptors {
+          name
+          persistedResultType
+          rawDataKey
+          recordCount
+        }
+        tag
+        timestamp
+      }
+      pageInfo {
+        endCursor
+      }
+    }
+  }
+"""
+
+# Arguments and default selection sets of the mutations used to build
+# batched mutation documents, keyed by mutation field
+MUTATION_ARGUMENTS = {
+    'createEntity': {
+        'entityKey': 'String!',
+        'entityType': 'String!',
+        'entityClass': '[String!]!',
+        'timestamp': 'Long',
+        'properties': 'JSON'
+    },
+    'updateEntity': {
+        'entityId': 'String!',
+        'properties': 'JSON'
+    },
+    'deleteEntity': {
+        'entityId': 'String!',
+        'timestamp': 'Long'
+    },
+    'createRelationship': {
+        'relationshipKey': 'String!',
+        'relationshipType': 'String!',
+        'relationshipClass': 'String!',
+        'fromEntityId': 'String!',
+        'toEntityId': 'String!',
+        'properties': 'JSON'
+    },
+    'deleteRelationship': {
+        'relationshipId': 'String!',
+        'timestamp': 'Long'
+    }
+}
+
+MUTATION_SELECTIONS = {
+    'createEntity': 'entity { _id } vertex { id entity { _id } }',
+    'updateEntity': 'entity { _id } vertex { id }',
+    'deleteEntity': 'entity { _id } vertex { id entity { _id } properties }',
+    'createRelationship': 'relationship { _id } edge { id toVertexId fromVertexId relationship { _id } properties }',
+    'deleteRelationship': 'relationship { _id } edge { id toVertexId fromVertexId relationship { _id } properties }'
+}
+
+# Smallest selections that still identify what each mutation wrote
+MUTATION_MINIMAL_SELECTIONS = {
+    'createEntity': 'entity { _id }',
+    'updateEntity': 'entity { _id }',
+    'deleteEntity': 'entity { _id }',
+    'createRelationship': 'relationship { _id }',
+    'deleteRelationship': 'relationship { _id }'
+}
+
+BULK_BATCH_SIZE = 50
+
+SYNC_BATCH_SIZE = 1000
@@ -0,0 +1,41 @@
+""" End-to-end deadlines spanning every request, retry and sleep of a call """
+
+import time
+from typing import Tuple, Union
+
+from jupiterone.errors import JupiterOneTimeoutError
+
+
+class Deadline:
+    """ Point in time a call must complete by """
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires = time.monotonic() + seconds
+
+    @classmethod
+    def after(cls, seconds: float = None) -> 'Deadline':
+        """ Returns a deadline seconds from now, or None when seconds is None """
+        return None if seconds is None else cls(seconds)
+
+    def remaining(self) -> float:
+        """ Seconds left before the deadline, never negative """
+        return max(0.0, self.expires - time.monotonic())
+
+    def expired(self) -> bool:
+        """ Whether the deadline has passed """
+        return self.remaining() <= 0
+
+    def check(self) -> None:
+        """ Raises JupiterOneTimeoutError once the deadline has passed """
+        if self.expired():
+            raise JupiterOneTimeoutError('JupiterOne API call exceeded its {}s deadline'.format(self.seconds))
+
+    def cap(self, timeout: Union[float, Tuple[float, float], None]) -> Union[float, Tuple[float, float]]:
+        """ Limits a request timeout, or (connect, read) timeouts, to the time remaining """
+        remaining = max(self.remaining(), 0.001)
+        if timeout is None:
+            return remaining
+        if isinstance(timeout, tuple):
+            return tuple(min(value, remaining) for value in timeout)
+        return min(timeout, remaining)
@@ -0,0 +1,134 @@
+""" Change detection between two sets of query results """
+
+import hashlib
+import json
+from typing import Callable, Dict, Iterable, Iterator, Set, Tuple, Union
+
+# Metadata that changes on every write without the entity itself changing
+VOLATILE_FIELDS = ('_beginOn', '_endOn', '_version', '_createdOn', '_rawDataHashes')
+
+
+def _row(item) -> Dict:
+    """ Returns a result row dict for a row or an Entity record """
+    return item.to_dict() if hasattr(item, 'to_dict') else item
+
+
+def _content(row: Dict, ignore: Tuple[str, ...]) -> Tuple[Dict, Dict]:
+    entity = {key: value for key, value in (row.get('entity') or {}).items() if key not in ignore}
+    return entity, row.get('properties') or {}
+
+
+def entity_digest(row: Dict, ignore: Tuple[str, ...] = VOLATILE_FIELDS) -> bytes:
+    """ Digest of the metadata and properties of an entity, ignoring the given
+        metadata fields.  Equal entities have equal digests regardless of key order.
+    """
+    entity, properties = _content(row, ignore)
+    encoded = json.dumps([entity, properties], sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.blake2b(encoded.encode('utf-8'), digest_size=16).digest()
+
+
+def _changes(old: Dict, new: Dict) -> Dict:
+    return {
+        name: {'old': old.get(name), 'new': new.get(name)}
+        for name in old.keys() | new.keys()
+        if old.get(name) != new.get(name)
+    }
+
+
+def _rows(source: Union[Iterable, Callable[[], Iterable]]) -> Iterator[Dict]:
+    items = source() if callable(source) else source
+    for item in items:
+        yield _row(item)
+
+
+def diff_results(old: Union[Iterable, Callable[[], Iterable]], new: Iterable, **kwargs) -> Iterator[Dict]:
+    """ Compares two sets of entities, yielding a change for every entity added,
+        removed or changed.
+
+    Entities are joined on _id, with a hash of the old entities holding only
+    a digest of each.  The new entities are streamed against it once, and
+    the old entities are read a second time to report what was removed and
+    the field level changes of what changed.  Besides the digests only the
+    IDs of the new entities and the new rows of changed entities are held in
+    memory.  old must therefore be
+    iterable twice, e.g. a list or a callable returning a fresh iterator
+    such as Snapshot.entities; a one time iterator is materialized first.
+
+    Changes are dicts with change ('added', 'removed', 'changed' or
+    'duplicate'), id, and old and/or new rows.  A new entity whose _id was
+    already seen in new, or which matches an old entity already matched, is
+    reported as a duplicate with only its new row.  Changed entities also have entity and properties,
+    each mapping a changed field to its old and new value.  An entity matched
+    by _key is changed, with at least its _id in entity.
+
+    args:
+        old: Result of query_v1, rows or Entity records of the earlier result, or a callable returning them
+        new: Result of query_v1, rows or Entity records of the later result
+        key_fallback (bool): Match entities whose _id changed by their _key
+        ignore (tuple): Metadata fields ignored when comparing entities
+    """
+    key_fallback: bool = kwargs.pop('key_fallback', False)
+    ignore: Tuple[str, ...] = tuple(kwargs.pop('ignore', VOLATILE_FIELDS))
+
+    if isinstance(old, dict):
+        old = old['data']
+    if isinstance(new, dict):
+        new = new['data']
+    if not callable(old) and iter(old) is old:
+        old = list(old)
+
+    digests: Dict[str, bytes] = {}
+    keys: Dict[str, str] = {}
+    for row in _rows(old):
+        entity = row.get('entity') or {}
+        entity_id = entity.get('_id') or row.get('id')
+        digests[entity_id] = entity_digest(row, ignore)
+        if key_fallback and entity.get('_key') is not None:
+            keys[entity['_key']] = entity_id
+
+    changed: Dict[str, Dict] = {}
+    seen: Set[str] = set()
+    matched: Set[str] = set()
+    for row in _rows(new):
+        entity = row.get('entity') or {}
+        entity_id = entity.get('_id') or row.get('id')
+        if entity_id in seen:
+            yield {'change': 'duplicate', 'id': entity_id, 'new': row}
+            continue
+        seen.add(entity_id)
+
+        old_id = entity_id if entity_id in digests or entity_id in matched else None
+        if old_id is None and key_fallback:
+            old_id = keys.get(entity.get('_key'))
+            if old_id not in digests and old_id not in matched:
+                old_id = None
+
+        if old_id is None:
+            yield {'change': 'added', 'id': entity_id, 'new': row}
+            continue
+        if old_id in matched:
+            yield {'change': 'duplicate', 'id': entity_id, 'new': row}
+            continue
+        matched.add(old_id)
+
+        if digests.pop(old_id) != entity_digest(row, ignore):
+            changed[old_id] = row
+
+    # Whatever is left in digests was not matched by a new entity
+    for row in _rows(old):
+        entity = row.get('entity') or {}
+        entity_id = entity.get('_id') or row.get('id')
+        if entity_id in changed:
+            new_row = changed.pop(entity_id)
+            old_entity, old_properties = _content(row, ignore)
+            new_entity, new_properties = _content(new_row, ignore)
+            yield {
+                'change': 'changed',
+                'id': entity_id,
+                'old': row,
+                'new': new_row,
+                'entity': _changes(old_entity, new_entity),
+                'properties': _changes(old_properties, new_properties)
+            }
+        elif digests.pop(entity_id, None) is not None:
+            yield {'change': 'removed', 'id': entity_id, 'old': row}
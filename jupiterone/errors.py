@@ -6,4 +6,44 @@ class JupiterOneApiRetryError(Exception):
     """ Used to trigger retry on rate limit """
 
 class JupiterOneApiError(Exception):
-    """ Raised when API returns error response """
\ No newline at end of file
+    """ Raised when API returns error response.  status_code is the HTTP
+        status of the response, or None when the API answered with errors.
+    """
+
+    def __init__(self, *args, status_code: int = None):
+        super().__init__(*args)
+        self.status_code = status_code
+
+class JupiterOnePartialDataError(JupiterOneApiError):
+    """ Raised when a GraphQL response has errors alongside the data of the
+        fields that succeeded, which is kept in data.
+    """
+
+    def __init__(self, *args, data=None, errors=None):
+        super().__init__(*args)
+        self.data = data or {}
+        self.errors = errors or []
+
+class JupiterOnePersistedQueryError(JupiterOneApiError):
+    """ Raised when the API does not know or support a persisted query hash """
+
+class JupiterOneCircuitOpenError(JupiterOneApiError):
+    """ Raised without calling the API while the client circuit breaker is open """
+
+class JupiterOneTimeoutError(JupiterOneApiError):
+    """ Raised when a call does not complete before its deadline.  Results
+        fetched before the deadline are kept in partial when available.
+    """
+
+    def __init__(self, *args, partial=None):
+        super().__init__(*args)
+        self.partial = partial
+
+class JupiterOneSyncJobError(JupiterOneApiError):
+    """ Raised when a synchronization job ends without finishing.  The last
+        status of the job is kept in job.
+    """
+
+    def __init__(self, *args, job=None):
+        super().__init__(*args)
+        self.job = job
@@ -0,0 +1,230 @@
+""" Streaming bulk import of entities and relationships from CSV, NDJSON and JSON files """
+# pylint: disable=W0212
+
+import csv
+import json
+import mmap
+import os
+import time
+from typing import Callable, Dict, Iterator, List, Tuple
+
+from jupiterone.client import JupiterOneClient, entity_variables, relationship_variables
+from jupiterone.constants import BULK_BATCH_SIZE, MUTATION_MINIMAL_SELECTIONS
+from jupiterone.errors import JupiterOneClientError
+
+ENTITY_FIELDS = ('entity_key', 'entity_type', 'entity_class', 'timestamp')
+RELATIONSHIP_FIELDS = ('relationship_key', 'relationship_type', 'relationship_class', 'from_entity_id', 'to_entity_id')
+
+
+def iter_lines(path: str) -> Iterator[bytes]:
+    """ Reads the lines of a file, memory mapping it when possible """
+    with open(path, 'rb') as fileobj:
+        if os.fstat(fileobj.fileno()).st_size == 0:
+            return
+        try:
+            mapped = mmap.mmap(fileobj.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            yield from fileobj
+            return
+        with mapped:
+            yield from iter(mapped.readline, b'')
+
+
+def iter_json_array(path: str) -> Iterator[Tuple[int, object]]:
+    """ Yields (item number, row) for every item of a JSON file holding an
+        array.  Unlike NDJSON the file is decoded as a whole.
+    """
+    with open(path, 'rb') as fileobj:
+        rows = json.load(fileobj)
+    if not isinstance(rows, list):
+        raise JupiterOneClientError('JSON import file {} does not hold an array'.format(path))
+    yield from enumerate(rows, start=1)
+
+
+def iter_csv(path: str, **kwargs) -> Iterator[Tuple[int, Dict]]:
+    """ Yields (line number, row) for every row of a CSV file with a header row.
+        Keyword arguments are passed to csv.DictReader.
+    """
+    reader = csv.DictReader((line.decode('utf-8') for line in iter_lines(path)), **kwargs)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def iter_import_rows(path: str, file_format: str = None) -> Iterator[Tuple[int, object]]:
+    """ Yields (line number, row) from a CSV, NDJSON or JSON array file,
+        detecting the format from its extension.  NDJSON rows are yielded as
+        undecoded lines so they are decoded by the import workers, where
+        invalid lines become error rows.
+    """
+    file_format = file_format or os.path.splitext(path)[1].lstrip('.').lower()
+    if file_format == 'csv':
+        return iter_csv(path)
+    if file_format == 'json':
+        return iter_json_array(path)
+    if file_format in ('ndjson', 'jsonl'):
+        return (
+            (number, line)
+            for number, line in enumerate(iter_lines(path), start=1)
+            if line.strip()
+        )
+    raise JupiterOneClientError('Unsupported import format: {}'.format(file_format))
+
+
+class RowMapper:
+    """ Maps a file row to the arguments of create_entity or create_relationship.
+
+    args:
+        fields (tuple): Argument names that are mapped from columns
+        mapping (dict): Argument name to column name, columns default to the argument name
+        defaults (dict): Argument values used for every row, e.g. a fixed entity_type
+        properties (list): Columns copied into properties, defaults to every unmapped column
+        converters (dict): Column name to a callable converting its value
+    """
+
+    def __init__(self, fields: Tuple[str, ...], mapping: Dict = None, defaults: Dict = None,
+                 properties: List[str] = None, converters: Dict[str, Callable] = None):
+        self.defaults = defaults or {}
+        self.columns = {
+            field: (mapping or {}).get(field, field)
+            for field in fields
+            if field not in self.defaults
+        }
+        self.properties = properties
+        self.converters = converters or {}
+
+    def __call__(self, row) -> Dict:
+        if isinstance(row, bytes):
+            row = json.loads(row)
+        if not isinstance(row, dict):
+            raise ValueError('row is not an object')
+
+        mapped = dict(self.defaults)
+        for field, column in self.columns.items():
+            if row.get(column) not in (None, ''):
+                mapped[field] = self._convert(column, row[column])
+
+        columns = self.properties
+        if columns is None:
+            mapped_columns = set(self.columns.values())
+            columns = [column for column in row if column not in mapped_columns]
+
+        properties = {
+            column: self._convert(column, row[column])
+            for column in columns
+            if row.get(column) not in (None, '')
+        }
+        if properties:
+            mapped['properties'] = properties
+        return mapped
+
+    def _convert(self, column: str, value):
+        converter = self.converters.get(column)
+        return converter(value) if converter else value
+
+
+class Importer:
+    """ Imports entities and relationships from CSV, NDJSON or JSON array files.
+
+    Files are read incrementally and fed into the client's batched, concurrent
+    bulk mutations, so memory stays bounded regardless of the file size.
+
+    args:
+        client (JupiterOneClient): Client the mutations are sent with
+        batch_size (int): Number of mutations sent per request
+        max_workers (int): Number of requests sent concurrently
+        progress (callable): Called with the import stats every progress_interval rows
+        progress_interval (int): Number of rows between progress callbacks
+        max_errors (int): Number of failed rows kept in the result
+        error_path (str): NDJSON file every failed row is written to
+    """
+
+    def __init__(self, client: JupiterOneClient, **kwargs):
+        self.client = client
+        self.batch_size: int = kwargs.pop('batch_size', BULK_BATCH_SIZE)
+        self.max_workers: int = kwargs.pop('max_workers', 4)
+        self.progress: Callable[[Dict], None] = kwargs.pop('progress', None)
+        self.progress_interval: int = kwargs.pop('progress_interval', 1000)
+        self.max_errors: int = kwargs.pop('max_errors', 1000)
+        self.error_path: str = kwargs.pop('error_path', None)
+
+    def import_entities(self, path: str, **kwargs) -> Dict:
+        """ Creates or updates an entity for every row of a file
+
+        args:
+            path (str): CSV, NDJSON or JSON array file
+            file_format (str): csv, ndjson or json, detected from the extension by default
+            mapping, defaults, properties, converters: See RowMapper
+        """
+        file_format = kwargs.pop('file_format', None)
+        mapper = RowMapper(ENTITY_FIELDS, **kwargs)
+        return self._import(path, file_format, 'createEntity', lambda row: entity_variables(mapper(row)))
+
+    def import_relationships(self, path: str, **kwargs) -> Dict:
+        """ Creates a relationship for every row of a file
+
+        args:
+            path (str): CSV, NDJSON or JSON array file
+            file_format (str): csv, ndjson or json, detected from the extension by default
+            mapping, defaults, properties, converters: See RowMapper
+        """
+        file_format = kwargs.pop('file_format', None)
+        mapper = RowMapper(RELATIONSHIP_FIELDS, **kwargs)
+        return self._import(path, file_format, 'createRelationship', lambda row: relationship_variables(mapper(row)))
+
+    def _import(self, path: str, file_format: str, field: str, to_variables: Callable[[Dict], Dict]) -> Dict:
+        stats = {
+            'rows': 0,
+            'succeeded': 0,
+            'failed': 0,
+            'errors': [],
+            'started': time.monotonic()
+        }
+
+        error_file = open(self.error_path, 'w') if self.error_path else None
+        try:
+            results = self.client._bulk_mutation(
+                field,
+                iter_import_rows(path, file_format),
+                lambda numbered_row: to_variables(numbered_row[1]),
+                batch_size=self.batch_size,
+                max_workers=self.max_workers,
+                # Only success or failure is reported, so select as little as possible
+                fields=MUTATION_MINIMAL_SELECTIONS[field]
+            )
+            for result in results:
+                stats['rows'] += 1
+                if 'error' in result:
+                    stats['failed'] += 1
+                    line, row = result['input']
+                    if isinstance(row, bytes):
+                        row = row.decode('utf-8', 'replace').rstrip('\n')
+                    error = {'line': line, 'row': row, 'error': result['error']}
+                    if len(stats['errors']) < self.max_errors:
+                        stats['errors'].append(error)
+                    if error_file:
+                        error_file.write(json.dumps(error) + '\n')
+                else:
+                    stats['succeeded'] += 1
+
+                if self.progress and stats['rows'] % self.progress_interval == 0:
+                    self.progress(self._report(stats))
+        finally:
+            if error_file:
+                error_file.close()
+
+        report = self._report(stats)
+        if self.progress:
+            self.progress(report)
+        return report
+
+    @staticmethod
+    def _report(stats: Dict) -> Dict:
+        elapsed = time.monotonic() - stats['started']
+        return {
+            'rows': stats['rows'],
+            'succeeded': stats['succeeded'],
+            'failed': stats['failed'],
+            'errors': stats['errors'],
+            'elapsed': elapsed,
+            'rate': stats['rows'] / elapsed if elapsed else 0.0
+        }
@@ -0,0 +1,104 @@
+""" Adaptive page sizing for limit and skip pagination """
+
+import threading
+from typing import Dict, List
+
+from jupiterone.constants import J1QL_LIMIT_COUNT
+
+
+class PageSizer:
+    """ Chooses the LIMIT of each page from how the previous pages performed.
+
+    The size grows while rows per second keep improving and steps back to
+    the previous size once they fall.  Pages slower than target_latency or
+    larger than max_bytes shrink the size in proportion, and a failed page
+    halves it.  Every page is recorded in metrics.
+
+    args:
+        initial (int): Size of the first page
+        minimum (int): Smallest size used
+        maximum (int): Largest size used
+        target_latency (float): Seconds a single page should take at most
+        max_bytes (int): Largest response a single page should return
+        growth (float): Factor the size grows by while throughput improves
+    """
+
+    def __init__(self, initial: int = J1QL_LIMIT_COUNT, minimum: int = 25, maximum: int = 5000,
+                 target_latency: float = 10.0, max_bytes: int = 16 * 1024 * 1024, growth: float = 2.0):
+        if not 0 < minimum <= maximum:
+            raise ValueError('minimum must be positive and no larger than maximum')
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_latency = target_latency
+        self.max_bytes = max_bytes
+        self.growth = growth
+        self.size = self._clamp(initial)
+        self.pages: List[Dict] = []
+        self._best_rate = 0.0
+        self._best_size = self.size
+        self._settled = False
+        self._lock = threading.Lock()
+
+    def _clamp(self, size: float) -> int:
+        return max(self.minimum, min(self.maximum, int(size)))
+
+    def record(self, rows: int, seconds: float, nbytes: int = None) -> int:
+        """ Records a completed page and returns the size of the next one
+
+        args:
+            rows (int): Rows returned by the page
+            seconds (float): Time the page took
+            nbytes (int): Size of the response
+        """
+        with self._lock:
+            size = self.size
+            rate = rows / seconds if seconds > 0 else float('inf')
+            self.pages.append({'size': size, 'rows': rows, 'seconds': seconds, 'bytes': nbytes, 'rate': rate})
+
+            if seconds > self.target_latency:
+                self._resize(size * self.target_latency / seconds)
+            elif nbytes and nbytes > self.max_bytes:
+                self._resize(size * self.max_bytes / nbytes)
+            elif rate >= self._best_rate:
+                self._best_rate = rate
+                self._best_size = size
+                if not self._settled:
+                    self._resize(size * self.growth)
+            elif not self._settled:
+                # Throughput fell after growing, keep the size that performed best
+                self._settled = True
+                self._resize(self._best_size)
+            return self.size
+
+    def record_error(self) -> bool:
+        """ Halves the size after a failed page, returning False when it is
+            already at the minimum and retrying smaller would not help
+        """
+        with self._lock:
+            self.pages.append({'size': self.size, 'error': True})
+            if self.size <= self.minimum:
+                return False
+            self._settled = True
+            self._resize(self.size / 2)
+            return True
+
+    def _resize(self, size: float) -> None:
+        self.size = self._clamp(size)
+
+    @property
+    def metrics(self) -> Dict:
+        """ Totals over the recorded pages along with the sizes chosen """
+        with self._lock:
+            completed = [page for page in self.pages if not page.get('error')]
+            rows = sum(page['rows'] for page in completed)
+            seconds = sum(page['seconds'] for page in completed)
+            return {
+                'size': self.size,
+                'pages': len(completed),
+                'errors': len(self.pages) - len(completed),
+                'rows': rows,
+                'seconds': seconds,
+                'bytes': sum(page['bytes'] or 0 for page in completed),
+                'rows_per_second': rows / seconds if seconds else 0.0,
+                'sizes': [page['size'] for page in self.pages]
+            }
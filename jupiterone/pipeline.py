@@ -0,0 +1,151 @@
+""" Dependency aware loading of entities and the relationships between them """
+# pylint: disable=W0212
+
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Iterable, List
+
+from jupiterone.client import JupiterOneClient, batched, entity_variables, relationship_variables
+from jupiterone.constants import BULK_BATCH_SIZE, MUTATION_MINIMAL_SELECTIONS
+
+ENTITY = 'entity'
+RELATIONSHIP = 'relationship'
+REPORT_KEYS = {ENTITY: 'entities', RELATIONSHIP: 'relationships'}
+
+
+class GraphLoader:
+    """ Loads entities and relationships whose endpoints are given by entity key.
+
+    Entities are created in concurrent batches, and each relationship is
+    queued as soon as the _id of both of its endpoints is known, so
+    relationship batches run alongside the remaining entity batches
+    instead of after all of them.
+
+    args:
+        client (JupiterOneClient): Client the mutations are sent with
+        batch_size (int): Number of mutations sent per request
+        max_workers (int): Number of requests sent concurrently
+    """
+
+    def __init__(self, client: JupiterOneClient, **kwargs):
+        self.client = client
+        self.batch_size: int = kwargs.pop('batch_size', BULK_BATCH_SIZE)
+        self.max_workers: int = kwargs.pop('max_workers', 4)
+
+    def load(self, entities: Iterable[Dict], relationships: Iterable[Dict]) -> Dict:
+        """ Creates the entities and relationships, returning a report with the
+            _id of every entity created by key, the number of entities and
+            relationships that succeeded and failed, and the failed results.
+
+        args:
+            entities (iterable): Dicts with the arguments of create_entity, may be a generator
+            relationships (iterable): Dicts with the arguments of create_relationship, where
+                from_entity_key and to_entity_key may be given instead of the entity IDs
+        """
+        started = time.monotonic()
+        ids: Dict[str, str] = {}
+        waiting: Dict[str, List[Dict]] = {}
+        ready: List[Dict] = []
+        report = {
+            'entities': {'succeeded': 0, 'failed': 0},
+            'relationships': {'succeeded': 0, 'failed': 0},
+            'errors': []
+        }
+
+        def fail(kind: str, result: Dict) -> None:
+            report[REPORT_KEYS[kind]]['failed'] += 1
+            report['errors'].append(dict(result, type=kind))
+
+        for relationship in relationships:
+            state = {'input': relationship, 'remaining': set()}
+            for end in ('from', 'to'):
+                if not relationship.get(end + '_entity_id') and relationship.get(end + '_entity_key'):
+                    state['remaining'].add(relationship[end + '_entity_key'])
+            for key in state['remaining']:
+                waiting.setdefault(key, []).append(state)
+            if not state['remaining']:
+                ready.append(state)
+
+        def entity_created(key: str, entity_id: str) -> None:
+            ids[key] = entity_id
+            for state in waiting.pop(key, ()):
+                state['remaining'].discard(key)
+                if not state['remaining'] and not state.get('failed'):
+                    ready.append(state)
+
+        def entity_failed(key: str) -> None:
+            for state in waiting.pop(key, ()):
+                if not state.get('failed'):
+                    state['failed'] = True
+                    fail(RELATIONSHIP, {'input': state['input'], 'error': 'Entity {} was not created'.format(key)})
+
+        def to_variables(state: Dict) -> Dict:
+            relationship = dict(state['input'])
+            for end in ('from', 'to'):
+                key = relationship.pop(end + '_entity_key', None)
+                if not relationship.get(end + '_entity_id'):
+                    relationship[end + '_entity_id'] = ids[key]
+            return relationship_variables(relationship)
+
+        entity_batches = batched(entities, self.batch_size)
+        exhausted = False
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending: Dict = {}
+
+            def submit(kind: str, batch: List) -> None:
+                if kind == ENTITY:
+                    future = executor.submit(
+                        self.client._mutation_batch, 'createEntity', batch, entity_variables,
+                        selection=MUTATION_MINIMAL_SELECTIONS['createEntity']
+                    )
+                else:
+                    future = executor.submit(
+                        self.client._mutation_batch, 'createRelationship', batch, to_variables,
+                        selection=MUTATION_MINIMAL_SELECTIONS['createRelationship']
+                    )
+                pending[future] = kind
+
+            while True:
+                # Full relationship batches go first, partial ones once every entity was sent
+                while len(pending) < self.max_workers * 2:
+                    if len(ready) >= self.batch_size or (exhausted and ready):
+                        submit(RELATIONSHIP, ready[:self.batch_size])
+                        del ready[:self.batch_size]
+                    elif not exhausted:
+                        batch = next(entity_batches, None)
+                        if batch is None:
+                            exhausted = True
+                        else:
+                            submit(ENTITY, batch)
+                    else:
+                        break
+
+                if not pending:
+                    break
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    kind = pending.pop(future)
+                    for result in future.result():
+                        if kind == ENTITY:
+                            entity = result['input']
+                            key = entity.get('entity_key') if isinstance(entity, dict) else None
+                            if 'error' in result:
+                                fail(ENTITY, result)
+                                entity_failed(key)
+                            else:
+                                report['entities']['succeeded'] += 1
+                                entity_created(key, result['response']['entity']['_id'])
+                        elif 'error' in result:
+                            fail(RELATIONSHIP, dict(result, input=result['input']['input']))
+                        else:
+                            report['relationships']['succeeded'] += 1
+
+        unresolved = {id(state): state for states in waiting.values() for state in states if not state.get('failed')}
+        for state in unresolved.values():
+            missing = ', '.join(sorted(state['remaining']))
+            fail(RELATIONSHIP, {'input': state['input'], 'error': 'Entity {} was not loaded'.format(missing)})
+
+        report['ids'] = ids
+        report['elapsed'] = time.monotonic() - started
+        return report
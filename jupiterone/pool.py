@@ -0,0 +1,131 @@
+""" Runs queries and mutations across many JupiterOne accounts concurrently """
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Mapping, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from jupiterone.client import JupiterOneClient
+from jupiterone.errors import JupiterOneClientError
+from jupiterone.transport import RequestsTransport, Transport
+
+
+class ClientPool:
+    """ Pool of clients, one per account, sharing a single transport.
+
+    Each account gets its own client, and so its own rate limiter and
+    circuit breaker, while requests to every account reuse the same
+    pooled connections.  Fan-out methods run a call against each account
+    in parallel and return the results keyed by account ID.
+
+    args:
+        accounts (dict): Account ID to API token
+        url (str): JupiterOne API url shared by every account
+        transport (Transport): Shared transport, a pooled requests session by default
+        rate_limit (float): Maximum requests per second sent to each account
+        max_workers (int): Number of accounts called concurrently
+        pool_maxsize (int): Connections kept by the default transport, enough by default
+            for every account called concurrently to run 4 requests at a time, the
+            default concurrency of the bulk and sharded calls
+        Other keyword arguments are passed to every JupiterOneClient
+    """
+
+    def __init__(self, accounts: Mapping[str, str], **kwargs):
+        if not accounts:
+            raise JupiterOneClientError('accounts are required')
+
+        self.max_workers: int = kwargs.pop('max_workers', 8)
+        pool_maxsize: int = kwargs.pop('pool_maxsize', self.max_workers * 4)
+        self.transport: Transport = kwargs.pop('transport', None) or self._default_transport(pool_maxsize)
+        self.clients: Dict[str, JupiterOneClient] = {
+            account: JupiterOneClient(account=account, token=token, transport=self.transport, **kwargs)
+            for account, token in accounts.items()
+        }
+
+    @staticmethod
+    def _default_transport(pool_maxsize: int) -> Transport:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return RequestsTransport(session)
+
+    @property
+    def accounts(self) -> List[str]:
+        """ IDs of the accounts in the pool """
+        return list(self.clients)
+
+    def client(self, account: str) -> JupiterOneClient:
+        """ Returns the client of an account """
+        try:
+            return self.clients[account]
+        except KeyError:
+            raise JupiterOneClientError('Unknown account: {}'.format(account)) from None
+
+    def map(self, func: Callable[[JupiterOneClient], object], accounts: Iterable[str] = None,
+            return_exceptions: bool = False) -> Dict[str, object]:
+        """ Calls func with the client of each account concurrently
+
+        args:
+            func (callable): Called with a JupiterOneClient, its return value is the account's result
+            accounts (list): Accounts to call, every account by default
+            return_exceptions (bool): Return the exception of a failed account as its
+                result instead of raising it once every account has completed
+        """
+        clients = [self.client(account) for account in (self.accounts if accounts is None else accounts)]
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {client.account: executor.submit(func, client) for client in clients}
+
+        results: Dict[str, object] = {}
+        for account, future in futures.items():
+            exc = future.exception()
+            if exc is not None and not return_exceptions:
+                raise exc
+            results[account] = exc if exc is not None else future.result()
+        return results
+
+    def query_v1(self, query: str, accounts: Iterable[str] = None, return_exceptions: bool = False,
+                 **kwargs) -> Dict[str, Dict]:
+        """ Runs a query in each account, see JupiterOneClient.query_v1 for the options """
+        return self.map(lambda client: client.query_v1(query, **kwargs), accounts, return_exceptions)
+
+    def _bulk(self, method: str, items: Union[List, Callable[[str], Iterable]], accounts: Iterable[str],
+              return_exceptions: bool, kwargs: Dict) -> Dict[str, List[Dict]]:
+        def run(client: JupiterOneClient) -> List[Dict]:
+            account_items = items(client.account) if callable(items) else items
+            return list(getattr(client, method)(account_items, **kwargs))
+
+        return self.map(run, accounts, return_exceptions)
+
+    def bulk_create_entities(self, entities, accounts: Iterable[str] = None, return_exceptions: bool = False,
+                             **kwargs) -> Dict[str, List[Dict]]:
+        """ Creates entities in each account, returning the result list of each account
+
+        args:
+            entities (list): Entities created in every account, or a callable
+                returning the entities of the account ID it is called with
+            Other keyword arguments are passed to JupiterOneClient.bulk_create_entities
+        """
+        return self._bulk('bulk_create_entities', entities, accounts, return_exceptions, kwargs)
+
+    def bulk_create_relationships(self, relationships, accounts: Iterable[str] = None, return_exceptions: bool = False,
+                                  **kwargs) -> Dict[str, List[Dict]]:
+        """ Creates relationships in each account, the same way as bulk_create_entities """
+        return self._bulk('bulk_create_relationships', relationships, accounts, return_exceptions, kwargs)
+
+    def bulk_delete_entities(self, entity_ids, accounts: Iterable[str] = None, return_exceptions: bool = False,
+                             **kwargs) -> Dict[str, List[Dict]]:
+        """ Deletes entities in each account, the same way as bulk_create_entities """
+        return self._bulk('bulk_delete_entities', entity_ids, accounts, return_exceptions, kwargs)
+
+    def close(self) -> None:
+        """ Releases the shared connections """
+        self.transport.close()
+
+    def __enter__(self) -> 'ClientPool':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,34 @@
+""" Client side rate limiting """
+
+import threading
+import time
+
+
+class RateLimiter:
+    """ Token bucket limiting how many requests per second are sent.
+
+    Safe to share between threads.  Callers reserve a token under the lock
+    and sleep outside of it, so waiting threads do not block each other.
+    """
+
+    def __init__(self, rate: float, burst: int = None):
+        if rate <= 0:
+            raise ValueError('rate must be positive')
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """ Waits until a request may be sent, returning the time waited in seconds """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+        if wait:
+            time.sleep(wait)
+        return wait
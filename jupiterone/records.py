@@ -0,0 +1,230 @@
+""" Compact typed records for query results """
+
+import json
+import sys
+from typing import Dict, Tuple
+
+
+def _intern(value):
+    """ Interns a string, or each string of a list, so repeated values share memory """
+    if isinstance(value, str):
+        return sys.intern(value)
+    if isinstance(value, list):
+        return tuple(_intern(item) for item in value)
+    return value
+
+
+def _pack(values: Dict) -> bytes:
+    """ Encodes a dict as compact JSON, or None when empty """
+    if not values:
+        return None
+    return json.dumps(values, separators=(',', ':')).encode('utf-8')
+
+
+def _unintern(pairs: Tuple) -> Dict:
+    return {key: list(value) if isinstance(value, tuple) else value for key, value in pairs}
+
+
+def _unpack(packed: bytes) -> Dict:
+    return json.loads(packed) if packed else {}
+
+
+def _same(first, second) -> bool:
+    """ Compares two records slot by slot, decoding properties only when
+        their JSON differs, so key order alone does not make them unequal
+    """
+    for slot in first.__slots__:
+        mine, theirs = getattr(first, slot), getattr(second, slot)
+        if mine == theirs:
+            continue
+        if slot == '_metadata':
+            if dict(mine) != dict(theirs):
+                return False
+        elif slot != '_properties' or _unpack(mine) != _unpack(theirs):
+            return False
+    return True
+
+
+def _remaining(values: Dict, known: Tuple[str, ...]) -> Tuple:
+    """ Collects the values not stored in a dedicated slot as (key, value) pairs """
+    return tuple(
+        (sys.intern(key), _intern(value))
+        for key, value in values.items()
+        if key not in known
+    )
+
+
+class Entity:
+    """ Entity (vertex) returned by a query.
+
+    Common metadata is stored in slots, with the _type, _class and
+    _integrationType strings interned.  Properties are kept as compact
+    JSON and decoded each time they are accessed.
+    """
+
+    __slots__ = (
+        'id',
+        'entity_id',
+        'entity_key',
+        'entity_type',
+        'entity_class',
+        'integration_type',
+        'display_name',
+        'created_on',
+        'begin_on',
+        'deleted',
+        '_metadata',
+        '_properties'
+    )
+
+    FIELDS = {
+        '_id': 'entity_id',
+        '_key': 'entity_key',
+        '_type': 'entity_type',
+        '_class': 'entity_class',
+        '_integrationType': 'integration_type',
+        'displayName': 'display_name',
+        '_createdOn': 'created_on',
+        '_beginOn': 'begin_on',
+        '_deleted': 'deleted'
+    }
+
+    INTERNED = ('_type', '_class', '_integrationType')
+
+    def __init__(self, row: Dict):
+        entity = row.get('entity') or {}
+        self.id = row.get('id')
+        for key, slot in self.FIELDS.items():
+            value = entity.get(key)
+            setattr(self, slot, _intern(value) if key in self.INTERNED else value)
+        self._metadata = _remaining(entity, self.FIELDS)
+        self._properties = _pack(row.get('properties'))
+
+    @classmethod
+    def from_row(cls, row: Dict) -> 'Entity':
+        """ Builds an entity from a query result row or tree vertex """
+        return cls(row)
+
+    @property
+    def metadata(self) -> Dict:
+        """ Underscore metadata not stored in a dedicated attribute """
+        return _unintern(self._metadata)
+
+    @property
+    def properties(self) -> Dict:
+        """ Entity properties, decoded on every access """
+        return _unpack(self._properties)
+
+    def to_dict(self) -> Dict:
+        """ Converts back to the row format returned by query_v1 """
+        entity = _unintern(self._metadata)
+        for key, slot in self.FIELDS.items():
+            value = getattr(self, slot)
+            if value is not None:
+                entity[key] = list(value) if isinstance(value, tuple) else value
+        return {
+            'id': self.id,
+            'entity': entity,
+            'properties': self.properties
+        }
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Entity) and _same(self, other)
+
+    def __hash__(self) -> int:
+        return hash((self.id, self.entity_id))
+
+    def __repr__(self) -> str:
+        return 'Entity(entity_id={!r}, entity_type={!r}, entity_key={!r})'.format(
+            self.entity_id, self.entity_type, self.entity_key
+        )
+
+
+class Relationship:
+    """ Relationship (edge) returned by a tree query.
+
+    Stored the same way as Entity, with properties decoded on access.
+    """
+
+    __slots__ = (
+        'id',
+        'relationship_id',
+        'relationship_key',
+        'relationship_type',
+        'relationship_class',
+        'from_entity_id',
+        'to_entity_id',
+        '_metadata',
+        '_properties'
+    )
+
+    FIELDS = {
+        '_id': 'relationship_id',
+        '_key': 'relationship_key',
+        '_type': 'relationship_type',
+        '_class': 'relationship_class'
+    }
+
+    INTERNED = ('_type', '_class')
+
+    def __init__(self, edge: Dict):
+        relationship = edge.get('relationship') or {}
+        self.id = edge.get('id')
+        self.from_entity_id = edge.get('fromVertexId')
+        self.to_entity_id = edge.get('toVertexId')
+        for key, slot in self.FIELDS.items():
+            value = relationship.get(key)
+            setattr(self, slot, _intern(value) if key in self.INTERNED else value)
+        self._metadata = _remaining(relationship, self.FIELDS)
+        self._properties = _pack(edge.get('properties'))
+
+    @classmethod
+    def from_edge(cls, edge: Dict) -> 'Relationship':
+        """ Builds a relationship from a tree edge """
+        return cls(edge)
+
+    @property
+    def metadata(self) -> Dict:
+        """ Underscore metadata not stored in a dedicated attribute """
+        return _unintern(self._metadata)
+
+    @property
+    def properties(self) -> Dict:
+        """ Relationship properties, decoded on every access """
+        return _unpack(self._properties)
+
+    def to_dict(self) -> Dict:
+        """ Converts back to the edge format returned by query_v1 """
+        relationship = _unintern(self._metadata)
+        for key, slot in self.FIELDS.items():
+            value = getattr(self, slot)
+            if value is not None:
+                relationship[key] = list(value) if isinstance(value, tuple) else value
+        return {
+            'id': self.id,
+            'fromVertexId': self.from_entity_id,
+            'toVertexId': self.to_entity_id,
+            'relationship': relationship,
+            'properties': self.properties
+        }
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Relationship) and _same(self, other)
+
+    def __hash__(self) -> int:
+        return hash((self.id, self.relationship_id))
+
+    def __repr__(self) -> str:
+        return 'Relationship(relationship_id={!r}, relationship_type={!r}, from_entity_id={!r}, to_entity_id={!r})'.format(
+            self.relationship_id, self.relationship_type, self.from_entity_id, self.to_entity_id
+        )
+
+
+def to_records(data):
+    """ Converts a page of query results, a list of rows or a tree, to records """
+    if isinstance(data, dict) and 'vertices' in data and 'edges' in data:
+        return {
+            'vertices': [Entity(vertex) for vertex in data['vertices']],
+            'edges': [Relationship(edge) for edge in data['edges']]
+        }
+    return [Entity(row) for row in data]
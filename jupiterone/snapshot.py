@@ -0,0 +1,269 @@
+""" Indexed on-disk snapshots of query results """
+# pylint: disable=W0212
+
+import json
+import sqlite3
+import time
+from typing import Dict, Iterator, List
+
+from jupiterone.client import JupiterOneClient, add_with_condition, is_tree
+from jupiterone.errors import JupiterOneClientError
+from jupiterone.records import Entity, Relationship
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entities (
+    id TEXT PRIMARY KEY,
+    key TEXT,
+    begin_on INTEGER,
+    row TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entities_key ON entities (key);
+CREATE INDEX IF NOT EXISTS entities_begin_on ON entities (begin_on);
+CREATE TABLE IF NOT EXISTS entity_labels (
+    field TEXT NOT NULL,
+    value TEXT NOT NULL,
+    entity_id TEXT NOT NULL,
+    PRIMARY KEY (field, value, entity_id)
+);
+CREATE INDEX IF NOT EXISTS entity_labels_entity ON entity_labels (entity_id);
+CREATE TABLE IF NOT EXISTS relationships (
+    id TEXT PRIMARY KEY,
+    key TEXT,
+    type TEXT,
+    from_id TEXT,
+    to_id TEXT,
+    row TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS relationships_key ON relationships (key);
+CREATE INDEX IF NOT EXISTS relationships_type ON relationships (type);
+CREATE INDEX IF NOT EXISTS relationships_from ON relationships (from_id);
+CREATE INDEX IF NOT EXISTS relationships_to ON relationships (to_id);
+'''
+
+
+LABELS = ('_type', '_class')
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, separators=(',', ':'))
+
+
+def _values(value) -> List[str]:
+    """ Values of a field that may hold a single value or a list """
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return list(set(value))
+    return [value]
+
+
+class Snapshot:
+    """ Query results stored in an SQLite database, indexed on _id, _key,
+    _type and _class, with every value of a list indexed.  Relationships of
+    tree queries are indexed on _key, _type and their endpoints.
+
+    Opening a snapshot only opens the database file.  Rows are decoded as
+    they are read, so large snapshots can be scanned with little memory.
+    A snapshot records the query it was pulled with and can be refreshed
+    by fetching only the entities that changed since.
+
+    args:
+        path (str): Database file, created when it does not exist
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.executescript(SCHEMA)
+
+    def close(self) -> None:
+        """ Closes the database """
+        self.connection.close()
+
+    def __enter__(self) -> 'Snapshot':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @property
+    def meta(self) -> Dict:
+        """ Query the snapshot was pulled with and the time of its last refresh """
+        return {name: json.loads(value) for name, value in self.connection.execute('SELECT name, value FROM meta')}
+
+    def _set_meta(self, **values) -> None:
+        self.connection.executemany(
+            'INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)',
+            [(name, _dumps(value)) for name, value in values.items()]
+        )
+
+    def pull(self, client: JupiterOneClient, query: str, include_deleted: bool = False) -> int:
+        """ Replaces the snapshot with the results of a query, returning the
+            number of entities stored
+
+        args:
+            client (JupiterOneClient): Client the query is run with
+            query (str): Query text, row or tree queries
+            include_deleted (bool): Include recently deleted entities in query/search
+        """
+        started = int(time.time() * 1000)
+        with self.connection:
+            for table in ('meta', 'entities', 'entity_labels', 'relationships'):
+                self.connection.execute('DELETE FROM {}'.format(table))
+            self._set_meta(query=query, includeDeleted=include_deleted, refreshedOn=started)
+
+        self._store_pages(client, query, include_deleted, keep_deleted=True)
+        return len(self)
+
+    def refresh(self, client: JupiterOneClient) -> int:
+        """ Updates the snapshot with the entities whose _beginOn is at or after
+            the newest one stored, returning the number of entities written.
+            Entities deleted since are removed unless the snapshot includes them.
+
+        args:
+            client (JupiterOneClient): Client the query is run with
+        """
+        meta = self.meta
+        if 'query' not in meta:
+            raise JupiterOneClientError('Snapshot {} has not been pulled'.format(self.path))
+
+        begin_on = self.connection.execute('SELECT MAX(begin_on) FROM entities').fetchone()[0]
+        query = meta['query']
+        if begin_on is not None:
+            query = add_with_condition(query, '_beginOn >= {}'.format(begin_on))
+
+        started = int(time.time() * 1000)
+        written = self._store_pages(client, query, True, keep_deleted=meta['includeDeleted'])
+        with self.connection:
+            self._set_meta(refreshedOn=started)
+        return written
+
+    def _store_pages(self, client: JupiterOneClient, query: str, include_deleted: bool, keep_deleted: bool) -> int:
+        """ Writes each result page in its own transaction """
+        written = 0
+        for data, _ in client._iter_cursor_pages(query, None, include_deleted):
+            vertices, edges = (data['vertices'], data['edges']) if is_tree(data) else (data, [])
+            with self.connection:
+                written += self._store_entities(vertices, keep_deleted)
+                self._store_relationships(edges)
+        return written
+
+    def _store_entities(self, rows: List[Dict], keep_deleted: bool) -> int:
+        stored = []
+        removed = []
+        for row in rows:
+            entity = row.get('entity') or {}
+            entity_id = entity.get('_id') or row.get('id')
+            if entity.get('_deleted') and not keep_deleted:
+                removed.append((entity_id,))
+            else:
+                stored.append((entity_id, entity, row))
+
+        ids = [(entity_id,) for entity_id, _, _ in stored] + removed
+        self.connection.executemany('DELETE FROM entity_labels WHERE entity_id = ?', ids)
+        self.connection.executemany('DELETE FROM entities WHERE id = ?', removed)
+        self.connection.executemany(
+            'INSERT OR REPLACE INTO entities (id, key, begin_on, row) VALUES (?, ?, ?, ?)',
+            [
+                (entity_id, entity.get('_key'), entity.get('_beginOn'), _dumps(row))
+                for entity_id, entity, row in stored
+            ]
+        )
+        self.connection.executemany(
+            'INSERT OR IGNORE INTO entity_labels (field, value, entity_id) VALUES (?, ?, ?)',
+            [
+                (field, value, entity_id)
+                for entity_id, entity, _ in stored
+                for field in LABELS
+                for value in _values(entity.get(field))
+            ]
+        )
+        return len(stored)
+
+    def _store_relationships(self, edges: List[Dict]) -> None:
+        rows = []
+        for edge in edges:
+            relationship = edge.get('relationship') or {}
+            rows.append((
+                relationship.get('_id') or edge.get('id'),
+                relationship.get('_key'),
+                relationship.get('_type'),
+                edge.get('fromVertexId'),
+                edge.get('toVertexId'),
+                _dumps(edge)
+            ))
+        self.connection.executemany(
+            'INSERT OR REPLACE INTO relationships (id, key, type, from_id, to_id, row) VALUES (?, ?, ?, ?, ?, ?)',
+            rows
+        )
+
+    def __len__(self) -> int:
+        return self.connection.execute('SELECT COUNT(*) FROM entities').fetchone()[0]
+
+    def get(self, entity_id: str, records: bool = False):
+        """ Returns the row of an entity by _id, or None when it is not stored """
+        found = self.connection.execute('SELECT row FROM entities WHERE id = ?', (entity_id,)).fetchone()
+        if found is None:
+            return None
+        row = json.loads(found[0])
+        return Entity(row) if records else row
+
+    def entities(self, entity_key: str = None, entity_type: str = None, entity_class: str = None,
+                 records: bool = False) -> Iterator:
+        """ Yields the stored entities matching every given field, decoding
+            each row as it is read
+
+        args:
+            entity_key (str): _key of the entities
+            entity_type (str): One of the _type values of the entities
+            entity_class (str): One of the _class values of the entities
+            records (bool): Yield Entity records instead of dicts
+        """
+        sql = 'SELECT entities.row FROM entities'
+        conditions = []
+        parameters = []
+        for field, value in (('_type', entity_type), ('_class', entity_class)):
+            if value is not None:
+                conditions.append(
+                    'entities.id IN (SELECT entity_id FROM entity_labels WHERE field = ? AND value = ?)'
+                )
+                parameters.extend((field, value))
+        if entity_key is not None:
+            conditions.append('entities.key = ?')
+            parameters.append(entity_key)
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+
+        for (row,) in self.connection.execute(sql, parameters):
+            row = json.loads(row)
+            yield Entity(row) if records else row
+
+    def relationships(self, from_entity_id: str = None, to_entity_id: str = None, relationship_type: str = None,
+                      records: bool = False) -> Iterator:
+        """ Yields the stored relationships of tree queries matching every given field
+
+        args:
+            from_entity_id (str): _id of the source entity
+            to_entity_id (str): _id of the destination entity
+            relationship_type (str): _type of the relationships
+            records (bool): Yield Relationship records instead of dicts
+        """
+        conditions = []
+        parameters = []
+        for column, value in (('from_id', from_entity_id), ('to_id', to_entity_id), ('type', relationship_type)):
+            if value is not None:
+                conditions.append('{} = ?'.format(column))
+                parameters.append(value)
+
+        sql = 'SELECT row FROM relationships'
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+
+        for (row,) in self.connection.execute(sql, parameters):
+            row = json.loads(row)
+            yield Relationship(row) if records else row
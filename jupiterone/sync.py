@@ -0,0 +1,269 @@
+""" Bulk uploads through the JupiterOne synchronization job API """
+# pylint: disable=W0212
+
+import gzip
+import json
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from jupiterone.client import JupiterOneClient, batched
+from jupiterone.constants import SYNC_BATCH_SIZE
+from jupiterone.deadline import Deadline
+from jupiterone.errors import (
+    JupiterOneClientError,
+    JupiterOneApiError,
+    JupiterOneApiRetryError,
+    JupiterOneSyncJobError,
+    JupiterOneTimeoutError
+)
+
+ENTITIES = 'entities'
+RELATIONSHIPS = 'relationships'
+
+FINISHED = 'FINISHED'
+ABORTED = 'ABORTED'
+
+
+def sync_entity(entity: Dict) -> Dict:
+    """ Converts the arguments of create_entity into a synchronization job
+        entity.  Entities already given with _key, _type and _class are returned as is.
+    """
+    if 'entity_key' not in entity:
+        return entity
+    return dict(
+        entity.get('properties') or {},
+        _key=entity['entity_key'],
+        _type=entity['entity_type'],
+        _class=entity['entity_class']
+    )
+
+
+def sync_relationship(relationship: Dict) -> Dict:
+    """ Converts the arguments of create_relationship into a synchronization
+        job relationship, where from_entity_key and to_entity_key may be given
+        instead of the entity IDs.  Relationships already given with _key are returned as is.
+    """
+    if 'relationship_key' not in relationship:
+        return relationship
+    converted = dict(
+        relationship.get('properties') or {},
+        _key=relationship['relationship_key'],
+        _type=relationship['relationship_type'],
+        _class=relationship['relationship_class']
+    )
+    for end in ('from', 'to'):
+        if relationship.get(end + '_entity_key'):
+            converted['_{}EntityKey'.format(end)] = relationship[end + '_entity_key']
+        else:
+            converted['_{}EntityId'.format(end)] = relationship[end + '_entity_id']
+    return converted
+
+
+def _is_terminal(status: str) -> bool:
+    return status in (FINISHED, ABORTED) or status.startswith('ERROR')
+
+
+class SyncJob:
+    """ A synchronization job, which uploads entities and relationships in
+        large batches and applies them to the graph once finalized.
+
+    Batches are encoded as JSON once, compressed with gzip and uploaded
+    concurrently, holding at most two batches per worker in memory.  Every
+    request, including each batch on its own, is retried with backoff on
+    timeouts, 429 and 5xx responses, and goes through the client's rate
+    limiter and circuit breaker.
+
+    args:
+        client (JupiterOneClient): Client the job requests are sent with
+        job_id (str): ID of a started job, see SyncJob.start
+        batch_size (int): Number of entities or relationships uploaded per request
+        max_workers (int): Number of uploads sent concurrently
+        compress (bool): Compress uploads with gzip
+        compresslevel (int): gzip compression level
+    """
+
+    POLL_OPTS = {
+        'wait_initial': 1000,
+        'wait_max': 10000,
+        'stop_max_delay': 3600000
+    }
+
+    def __init__(self, client: JupiterOneClient, job_id: str, **kwargs):
+        self.client = client
+        self.id = job_id
+        self.batch_size: int = kwargs.pop('batch_size', SYNC_BATCH_SIZE)
+        self.max_workers: int = kwargs.pop('max_workers', 4)
+        self.compress: bool = kwargs.pop('compress', True)
+        self.compresslevel: int = kwargs.pop('compresslevel', 6)
+        self.url = '{}/{}'.format(client.sync_endpoint, job_id)
+
+    @classmethod
+    def start(cls, client: JupiterOneClient, scope: str = None, **kwargs) -> 'SyncJob':
+        """ Starts a synchronization job and returns it
+
+        args:
+            client (JupiterOneClient): Client the job requests are sent with
+            scope (str): Scope of the data uploaded, required for the 'api' source
+            source (str): Source of the data, 'api' by default
+            sync_mode (str): 'DIFF' deletes what a scope no longer contains, 'CREATE_OR_UPDATE' only upserts
+            integration_instance_id (str): Integration instance the data belongs to
+            Any other keyword arguments are passed to SyncJob
+        """
+        source: str = kwargs.pop('source', 'api')
+        sync_mode: str = kwargs.pop('sync_mode', 'DIFF')
+        integration_instance_id: str = kwargs.pop('integration_instance_id', None)
+
+        if source == 'api' and not scope:
+            raise JupiterOneClientError('scope is required for synchronization jobs with the api source')
+
+        body = {'source': source, 'syncMode': sync_mode}
+        if scope:
+            body['scope'] = scope
+        if integration_instance_id:
+            body['integrationInstanceId'] = integration_instance_id
+
+        response = client._rest_request(client.sync_endpoint, body=body)
+        return cls(client, response['job']['id'], **kwargs)
+
+    def _encode(self, kind: str, batch: List[Dict]) -> Tuple[bytes, int]:
+        data = json.dumps({kind: batch}, separators=(',', ':'), default=str).encode('utf-8')
+        size = len(data)
+        if self.compress:
+            data = gzip.compress(data, compresslevel=self.compresslevel)
+        return data, size
+
+    def _upload_batch(self, kind: str, batch: List[Dict]) -> Dict:
+        data, size = self._encode(kind, batch)
+        headers = {'Content-Type': 'application/json'}
+        if self.compress:
+            headers['Content-Encoding'] = 'gzip'
+        self.client._rest_request('{}/{}'.format(self.url, kind), data=data, headers=headers)
+        return {'kind': kind, 'items': len(batch), 'bytes': size, 'sent_bytes': len(data)}
+
+    def _batches(self, entities: Iterable[Dict], relationships: Iterable[Dict]) -> Iterator[Tuple[str, List[Dict]]]:
+        for batch in batched(map(sync_entity, entities or ()), self.batch_size):
+            yield ENTITIES, batch
+        for batch in batched(map(sync_relationship, relationships or ()), self.batch_size):
+            yield RELATIONSHIPS, batch
+
+    def upload(self, entities: Iterable[Dict] = None, relationships: Iterable[Dict] = None) -> Dict:
+        """ Uploads entities and relationships in concurrent batches, returning
+            the number of items, batches, bytes encoded and bytes sent of each.
+            Raises the error of the first batch that fails after its retries.
+
+        args:
+            entities (iterable): Synchronization job entities or the arguments of create_entity, may be a generator
+            relationships (iterable): Synchronization job relationships or the arguments of create_relationship
+        """
+        report = {kind: {'items': 0, 'batches': 0, 'bytes': 0, 'sent_bytes': 0} for kind in (ENTITIES, RELATIONSHIPS)}
+
+        def record(result: Dict) -> None:
+            totals = report[result['kind']]
+            totals['items'] += result['items']
+            totals['batches'] += 1
+            totals['bytes'] += result['bytes']
+            totals['sent_bytes'] += result['sent_bytes']
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending = set()
+            for kind, batch in self._batches(entities, relationships):
+                if len(pending) >= self.max_workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        record(future.result())
+                pending.add(executor.submit(self._upload_batch, kind, batch))
+
+            for future in as_completed(pending):
+                record(future.result())
+
+        return report
+
+    def upload_entities(self, entities: Iterable[Dict]) -> Dict:
+        """ Uploads entities in concurrent batches, see upload """
+        return self.upload(entities=entities)[ENTITIES]
+
+    def upload_relationships(self, relationships: Iterable[Dict]) -> Dict:
+        """ Uploads relationships in concurrent batches, see upload """
+        return self.upload(relationships=relationships)[RELATIONSHIPS]
+
+    def finalize(self) -> Dict:
+        """ Ends uploads to the job so that its data is applied to the graph """
+        return self.client._rest_request(self.url + '/finalize', body={})['job']
+
+    def abort(self, reason: str = None) -> Dict:
+        """ Aborts the job without applying its data
+
+        args:
+            reason (str): Reason recorded with the job
+        """
+        return self.client._rest_request(self.url + '/abort', body={'reason': reason} if reason else {})['job']
+
+    def status(self) -> Dict:
+        """ Returns the job, with its status and counts of the data uploaded and applied """
+        return self.client._rest_request(self.url)['job']
+
+    def wait(self, deadline: float = None) -> Dict:
+        """ Polls the job with backoff until it finishes and returns it.  Raises
+            JupiterOneSyncJobError when the job is aborted or fails.
+
+        args:
+            deadline (float): Seconds after which JupiterOneTimeoutError is raised with the last status in partial
+        """
+        deadline = Deadline.after(deadline)
+        opts = self.POLL_OPTS
+        delay = opts['wait_initial'] / 1000
+        poll_deadline = time.monotonic() + opts['stop_max_delay'] / 1000
+
+        while True:
+            job = self.status()
+            status = job['status']
+            if status == FINISHED:
+                return job
+            if _is_terminal(status):
+                raise JupiterOneSyncJobError('JupiterOne synchronization job {} ended with {}'.format(self.id, status), job=job)
+
+            if deadline is not None and deadline.remaining() < delay:
+                raise JupiterOneTimeoutError(
+                    'JupiterOne synchronization job exceeded its {}s deadline'.format(deadline.seconds), partial=job
+                )
+            if time.monotonic() + delay > poll_deadline:
+                raise JupiterOneApiError('JupiterOne synchronization job {} did not finish in time'.format(self.id))
+            time.sleep(delay)
+            delay = min(delay * 2, opts['wait_max'] / 1000)
+
+
+def sync_graph(client: JupiterOneClient, entities: Iterable[Dict] = None, relationships: Iterable[Dict] = None,
+               **kwargs) -> Dict:
+    """ Starts a synchronization job, uploads the entities and relationships,
+        finalizes the job and waits for it to finish.  The job is aborted when
+        an upload fails.  Returns a report with the finished job, the upload
+        totals of entities and relationships and the seconds elapsed.
+
+    args:
+        client (JupiterOneClient): Client the job requests are sent with
+        entities (iterable): Synchronization job entities or the arguments of create_entity, may be a generator
+        relationships (iterable): Synchronization job relationships or the arguments of create_relationship
+        scope (str): Scope of the data uploaded
+        deadline (float): Seconds to wait for the job to finish once finalized
+        Any other keyword arguments are passed to SyncJob.start
+    """
+    started = time.monotonic()
+    scope: str = kwargs.pop('scope', None)
+    deadline: float = kwargs.pop('deadline', None)
+
+    job = SyncJob.start(client, scope, **kwargs)
+    try:
+        report = job.upload(entities, relationships)
+        job.finalize()
+    except Exception as exc:
+        try:
+            job.abort('Upload failed: {}'.format(exc))
+        except (JupiterOneApiError, JupiterOneApiRetryError):
+            pass
+        raise
+
+    report['job'] = job.wait(deadline)
+    report['elapsed'] = time.monotonic() - started
+    return report
+
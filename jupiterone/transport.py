@@ -0,0 +1,206 @@
+""" HTTP transports used by the JupiterOne client """
+# pylint: disable=import-outside-toplevel
+
+import json
+import threading
+from typing import Callable, Dict, Tuple, Union
+
+import requests
+
+from jupiterone.errors import JupiterOneClientError, JupiterOneApiError, JupiterOneApiRetryError
+
+Timeout = Union[float, Tuple[float, float]]
+
+
+class Transport:
+    """ Base class for the HTTP client the JupiterOne client sends requests with.
+
+    Responses must expose status_code, headers, content, text and json().
+    Timeouts are seconds, or a (connect, read) tuple, and a request that
+    times out raises JupiterOneApiRetryError so that it is retried.
+    """
+
+    def post(self, url: str, headers: Dict = None, body: Dict = None, timeout: Timeout = None, data: bytes = None):
+        """ Sends a POST request with body encoded as JSON, or data sent as is """
+        raise NotImplementedError
+
+    def get(self, url: str, headers: Dict = None, timeout: Timeout = None):
+        """ Sends a GET request """
+        raise NotImplementedError
+
+    def download(self, url: str, fileobj, chunk_size: int, timeout: Timeout = None) -> None:
+        """ Streams the body of a GET request into a binary file object """
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """ Releases any pooled connections """
+
+
+class RequestsTransport(Transport):
+    """ Default transport using a pooled requests session """
+
+    def __init__(self, session: requests.Session = None):
+        self.session = session or requests.Session()
+
+    def post(self, url: str, headers: Dict = None, body: Dict = None, timeout: Timeout = None, data: bytes = None):
+        try:
+            if data is not None:
+                return self.session.post(url, headers=headers, data=data, timeout=timeout)
+            return self.session.post(url, headers=headers, json=body, timeout=timeout)
+        except requests.exceptions.Timeout as exc:
+            raise JupiterOneApiRetryError('JupiterOne API request timed out') from exc
+
+    def get(self, url: str, headers: Dict = None, timeout: Timeout = None):
+        try:
+            return self.session.get(url, headers=headers, timeout=timeout)
+        except requests.exceptions.Timeout as exc:
+            raise JupiterOneApiRetryError('JupiterOne API request timed out') from exc
+
+    def download(self, url: str, fileobj, chunk_size: int, timeout: Timeout = None) -> None:
+        try:
+            with self.session.get(url, stream=True, timeout=timeout) as response:
+                _raise_for_download(response)
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    fileobj.write(chunk)
+        except requests.exceptions.Timeout as exc:
+            raise JupiterOneApiRetryError('JupiterOne API download timed out') from exc
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class HTTP2Transport(Transport):
+    """ Transport multiplexing concurrent requests over a single HTTP/2
+        connection.  Requires the optional httpx[http2] dependency.
+    """
+
+    def __init__(self, max_connections: int = 1, **kwargs):
+        try:
+            import httpx
+        except ImportError as exc:
+            raise JupiterOneClientError(
+                'HTTP2Transport requires httpx, install with: pip install jupiterone[http2]'
+            ) from exc
+
+        self.httpx = httpx
+        self.client = httpx.Client(
+            http2=True,
+            limits=httpx.Limits(max_connections=max_connections),
+            **kwargs
+        )
+
+    def _timeout(self, timeout: Timeout):
+        if isinstance(timeout, tuple):
+            connect, read = timeout
+            return self.httpx.Timeout(read, connect=connect)
+        return self.httpx.Timeout(timeout)
+
+    def post(self, url: str, headers: Dict = None, body: Dict = None, timeout: Timeout = None, data: bytes = None):
+        try:
+            if data is not None:
+                return self.client.post(url, headers=headers, content=data, timeout=self._timeout(timeout))
+            return self.client.post(url, headers=headers, json=body, timeout=self._timeout(timeout))
+        except self.httpx.TimeoutException as exc:
+            raise JupiterOneApiRetryError('JupiterOne API request timed out') from exc
+
+    def get(self, url: str, headers: Dict = None, timeout: Timeout = None):
+        try:
+            return self.client.get(url, headers=headers, timeout=self._timeout(timeout))
+        except self.httpx.TimeoutException as exc:
+            raise JupiterOneApiRetryError('JupiterOne API request timed out') from exc
+
+    def download(self, url: str, fileobj, chunk_size: int, timeout: Timeout = None) -> None:
+        try:
+            with self.client.stream('GET', url, timeout=self._timeout(timeout)) as response:
+                if response.status_code != 200:
+                    response.read()
+                _raise_for_download(response)
+                for chunk in response.iter_bytes(chunk_size=chunk_size):
+                    fileobj.write(chunk)
+        except self.httpx.TimeoutException as exc:
+            raise JupiterOneApiRetryError('JupiterOne API download timed out') from exc
+
+    def close(self) -> None:
+        self.client.close()
+
+
+class FakeRequest:
+    """ Request received by a FakeTransport handler """
+
+    def __init__(self, method: str, url: str, headers: Dict, body: bytes, timeout: Timeout = None):
+        self.method = method
+        self.url = url
+        self.headers = headers or {}
+        self.body = body
+        self.timeout = timeout
+
+    def json(self):
+        """ Decodes the request body """
+        return json.loads(self.body)
+
+
+class FakeResponse:
+    """ Response returned by a FakeTransport """
+
+    def __init__(self, status_code: int, headers: Dict, content: bytes):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    @property
+    def text(self) -> str:
+        """ Body decoded as text """
+        return self.content.decode('utf-8')
+
+    def json(self):
+        """ Decodes the response body """
+        return json.loads(self.content)
+
+
+class FakeTransport(Transport):
+    """ In-process transport for tests and benchmarks.
+
+    The handler receives a FakeRequest and returns a tuple of
+    (status_code, headers, body) where body is bytes, str or a dict
+    to be encoded as JSON.
+    """
+
+    def __init__(self, handler: Callable[[FakeRequest], Tuple[int, Dict, object]]):
+        self.handler = handler
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def _send(self, method: str, url: str, headers: Dict = None, body: bytes = b'', timeout: Timeout = None) -> FakeResponse:
+        with self._lock:
+            self.requests += 1
+
+        status_code, response_headers, content = self.handler(FakeRequest(method, url, headers, body, timeout))
+        if isinstance(content, dict):
+            content = json.dumps(content)
+            response_headers = dict(response_headers or {}, **{'Content-Type': 'application/json'})
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        return FakeResponse(status_code, response_headers or {}, content)
+
+    def post(self, url: str, headers: Dict = None, body: Dict = None, timeout: Timeout = None, data: bytes = None):
+        return self._send('POST', url, headers, _encode(body) if data is None else data, timeout)
+
+    def get(self, url: str, headers: Dict = None, timeout: Timeout = None):
+        return self._send('GET', url, headers, timeout=timeout)
+
+    def download(self, url: str, fileobj, chunk_size: int, timeout: Timeout = None) -> None:
+        response = self._send('GET', url, timeout=timeout)
+        _raise_for_download(response)
+        for start in range(0, len(response.content), chunk_size):
+            fileobj.write(response.content[start:start + chunk_size])
+
+
+def _encode(body: Dict) -> bytes:
+    return json.dumps(body).encode('utf-8')
+
+
+def _raise_for_download(response) -> None:
+    if response.status_code == 429 or response.status_code >= 500:
+        raise JupiterOneApiRetryError('JupiterOne result download unavailable ({})'.format(response.status_code))
+    if response.status_code != 200:
+        raise JupiterOneApiError('{}:{}'.format(response.status_code, response.text), status_code=response.status_code)
@@ -16,6 +16,14 @@ setup(name='jupiterone',
       maintainer='Okta',
       url='https://github.com/auth0/jupiterone-python-sdk',
       install_requires=install_reqs,
+      entry_points={
+          'console_scripts': [
+              'j1=jupiterone.cli:main'
+          ]
+      },
+      extras_require={
+          'http2': ['httpx[http2]']
+      },
       classifiers=[
           'Development Status :: 4 - Beta',
           'Intended Audience :: Developers',
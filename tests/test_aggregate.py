@@ -0,0 +1,81 @@
+from jupiterone.aggregate import ResultSet, field_getter
+from jupiterone.records import Entity
+
+
+def build_rows():
+    rows = []
+    for index in range(10):
+        rows.append({
+            'id': str(index),
+            'entity': {
+                '_id': str(index),
+                '_type': 'aws_instance' if index % 2 else 'aws_s3_bucket',
+                '_integrationType': 'aws',
+                'displayName': 'resource-{}'.format(index)
+            },
+            'properties': {
+                'region': 'us-east-1' if index < 6 else 'us-west-2',
+                'tag.Env': ['prod'] if index % 3 == 0 else ['dev'],
+                'size': index
+            }
+        })
+    return rows
+
+
+def test_field_getter_reads_rows_and_records():
+    row = build_rows()[1]
+
+    for item in (row, Entity(row)):
+        assert field_getter('id')(item) == '1'
+        assert field_getter('_type')(item) == 'aws_instance'
+        assert field_getter('_integrationType')(item) == 'aws'
+        assert field_getter('displayName')(item) == 'resource-1'
+        assert field_getter('region')(item) == 'us-east-1'
+        assert field_getter('tag.Env')(item) == ('dev',)
+        assert field_getter('missing')(item) is None
+
+
+def test_count_by_and_distinct():
+    results = ResultSet.from_result({'data': build_rows()})
+
+    assert results.count() == 10
+    assert results.count_by('_type') == {'aws_instance': 5, 'aws_s3_bucket': 5}
+    assert results.count_by('region') == {'us-east-1': 6, 'us-west-2': 4}
+    assert results.distinct('tag.Env') == [('prod',), ('dev',)]
+
+
+def test_where_uses_indexes_and_predicates():
+    results = ResultSet(build_rows())
+
+    instances = results.where({'_type': 'aws_instance'})
+    assert instances.column('id') == ['1', '3', '5', '7', '9']
+    assert '_type' in results._indexes
+
+    west = instances.where(region={'us-west-2', 'eu-west-1'})
+    assert west.column('id') == ['7', '9']
+
+    large = instances.where(size=lambda size: size > 4)
+    assert [row['id'] for row in large] == ['5', '7', '9']
+
+    assert results.where({'tag.Env': lambda tags: 'prod' in tags, '_type': 'aws_s3_bucket'}).column('id') == ['0', '6']
+    assert results.filter(lambda row: row['id'] == '2').count() == 1
+
+
+def test_group_by_views():
+    results = ResultSet(build_rows())
+
+    groups = results.group_by('region')
+    assert {region: group.count_by('_type') for region, group in groups.items()} == {
+        'us-east-1': {'aws_s3_bucket': 3, 'aws_instance': 3},
+        'us-west-2': {'aws_s3_bucket': 2, 'aws_instance': 2}
+    }
+
+    buckets = results.where({'_type': 'aws_s3_bucket'})
+    assert buckets.group_by('region')['us-west-2'].column('id') == ['6', '8']
+    assert buckets.distinct('region') == ['us-east-1', 'us-west-2']
+
+
+def test_tree_results_use_vertices():
+    tree = {'vertices': build_rows()[:3], 'edges': []}
+
+    assert ResultSet.from_result(tree).count_by('_type') == {'aws_s3_bucket': 2, 'aws_instance': 1}
@@ -0,0 +1,136 @@
+from jupiterone.client import JupiterOneClient, build_batch_mutation
+from jupiterone.transport import FakeTransport
+
+
+def build_handler(fail_keys=(), missing_ids=()):
+    documents = []
+
+    def handler(request):
+        body = request.json()
+        documents.append(body['query'])
+        variables = body['variables']
+        data = {}
+        errors = []
+        for name, value in variables.items():
+            alias, argument = name.split('_', 1)
+            if argument == 'entityKey':
+                if value in fail_keys:
+                    errors.append({'message': 'Invalid entity {}'.format(value), 'path': [alias]})
+                    data[alias] = None
+                else:
+                    data[alias] = {'entity': {'_id': 'id-' + value}, 'vertex': {'id': 'id-' + value, 'entity': {'_id': 'id-' + value}}}
+            elif value in missing_ids:
+                errors.append({'message': 'Entity {} not found'.format(value), 'path': [alias]})
+                data[alias] = None
+            elif argument == 'entityId':
+                data[alias] = {'entity': {'_id': value}, 'vertex': {'id': value, 'entity': {'_id': value}, 'properties': {}}}
+        response = {'data': data}
+        if errors:
+            response['errors'] = errors
+        return 200, {}, response
+
+    return handler, documents
+
+
+def test_build_batch_mutation():
+    document, variables = build_batch_mutation('deleteEntity', [{'entityId': '1'}, {'entityId': '2'}])
+
+    assert document == (
+        'mutation Batch($m0_entityId: String!, $m1_entityId: String!) {\n'
+        '  m0: deleteEntity(entityId: $m0_entityId) { entity { _id } vertex { id entity { _id } properties } }\n'
+        '  m1: deleteEntity(entityId: $m1_entityId) { entity { _id } vertex { id entity { _id } properties } }\n'
+        '}'
+    )
+    assert variables == {'m0_entityId': '1', 'm1_entityId': '2'}
+
+
+def test_bulk_create_entities():
+    handler, documents = build_handler()
+    j1 = JupiterOneClient(account='testAccount', token='testToken', transport=FakeTransport(handler))
+    entities = (
+        {'entity_key': str(i), 'entity_type': 'test_host', 'entity_class': 'Host', 'properties': {'i': i}}
+        for i in range(10)
+    )
+
+    results = list(j1.bulk_create_entities(entities, batch_size=4, max_workers=2))
+
+    assert len(documents) == 3
+    assert sorted(r['response']['entity']['_id'] for r in results) == sorted('id-{}'.format(i) for i in range(10))
+    assert all(r['input']['entity_key'] == r['response']['entity']['_id'][3:] for r in results)
+
+
+def test_bulk_create_entities_reports_failed_items():
+    handler, documents = build_handler(fail_keys=('2',))
+    j1 = JupiterOneClient(account='testAccount', token='testToken', transport=FakeTransport(handler))
+    entities = [{'entity_key': str(i), 'entity_type': 'test_host', 'entity_class': 'Host'} for i in range(4)]
+    entities.append({'entity_key': 'missing-type'})
+
+    results = list(j1.bulk_create_entities(entities, batch_size=10))
+    errors = [r for r in results if 'error' in r]
+
+    # Errors are attributed by alias, so the items that succeeded are not sent again
+    assert len(documents) == 1
+    assert len(results) == 5
+    assert sorted(r['input']['entity_key'] for r in errors) == ['2', 'missing-type']
+    assert next(r for r in errors if r['input']['entity_key'] == '2')['error'] == 'Invalid entity 2'
+
+
+def test_bulk_delete_entities_partial_failure():
+    handler, documents = build_handler(missing_ids=('missing',))
+    j1 = JupiterOneClient(account='testAccount', token='testToken', transport=FakeTransport(handler))
+
+    results = list(j1.bulk_delete_entities(['e1', 'e2', 'e3', 'missing'], batch_size=10))
+
+    assert len(documents) == 1
+    assert sorted(r['response']['entity']['_id'] for r in results if 'response' in r) == ['e1', 'e2', 'e3']
+    assert [r['error'] for r in results if 'error' in r] == ['Entity missing not found']
+
+
+def test_bulk_failure_without_data_is_retried_per_item():
+    documents = []
+
+    def handler(request):
+        variables = request.json()['variables']
+        documents.append(variables)
+        if len(variables) > 1 or 'bad' in variables.values():
+            return 200, {}, {'errors': [{'message': 'Batch failed'}]}
+        alias = next(iter(variables)).split('_')[0]
+        return 200, {}, {'data': {alias: {'entity': {'_id': next(iter(variables.values()))}}}}
+
+    j1 = JupiterOneClient(account='testAccount', token='testToken', transport=FakeTransport(handler))
+
+    results = list(j1.bulk_delete_entities(['1', 'bad', '3'], batch_size=10))
+
+    assert len(documents) == 4
+    assert [r['input'] for r in results if 'error' in r] == ['bad']
+
+
+def test_bulk_delete_entities():
+    handler, documents = build_handler()
+    j1 = JupiterOneClient(account='testAccount', token='testToken', transport=FakeTransport(handler))
+
+    results = list(j1.bulk_delete_entities(['1', {'entity_id': '2'}, '3'], batch_size=2))
+
+    assert len(documents) == 2
+    assert sorted(r['response']['entity']['_id'] for r in results) == ['1', '2', '3']
+
+
+def test_rate_limit():
+    handler, documents = build_handler()
+    j1 = JupiterOneClient(account='testAccount', token='testToken', transport=FakeTransport(handler), rate_limit=1000)
+
+    list(j1.bulk_delete_entities([str(i) for i in range(5)], batch_size=1))
+
+    assert len(documents) == 5
+    assert j1.rate_limiter.rate == 1000
+
+
+def test_bulk_failure_not_caused_by_items_is_not_split():
+    transport = FakeTransport(lambda request: (401, {}, 'Unauthorized'))
+    j1 = JupiterOneClient(account='testAccount', token='testToken', transport=transport)
+
+    results = list(j1.bulk_delete_entities([str(i) for i in range(50)], batch_size=50))
+
+    assert transport.requests == 1
+    assert len(results) == 50
+    assert all('unauthorized' in r['error'] for r in results)
@@ -0,0 +1,96 @@
+import json
+import os
+import pytest
+
+from jupiterone.checkpoint import QueryCheckpoint
+from jupiterone.client import JupiterOneClient
+from jupiterone.errors import JupiterOneApiError, JupiterOneClientError
+from jupiterone.transport import FakeTransport
+
+PAGES = {
+    None: ('1', 'c1'),
+    'c1': ('2', 'c2'),
+    'c2': ('3', None)
+}
+
+
+def build_handler(fail_on: str = None):
+    cursors = []
+
+    def handler(request):
+        cursor = request.json()['variables'].get('cursor')
+        cursors.append(cursor)
+        if cursor == fail_on:
+            return 404, {'Content-Type': 'text/plain'}, 'Not Found'
+
+        entity_id, next_cursor = PAGES[cursor]
+        query_v1 = {
+            'type': 'list',
+            'data': [{'id': entity_id, 'entity': {'_id': entity_id}, 'properties': {}}],
+            'cursor': next_cursor
+        }
+        return 200, {}, {'data': {'queryV1': query_v1}}
+
+    return handler, cursors
+
+
+def test_checkpoint_resumes_after_failure(tmpdir):
+    path = os.path.join(str(tmpdir), 'state.json')
+    handler, _ = build_handler(fail_on='c2')
+    j1 = JupiterOneClient(account='testAccount', token='testToken', transport=FakeTransport(handler))
+
+    with pytest.raises(JupiterOneApiError):
+        j1.query_v1('FIND Host', checkpoint=path)
+
+    with open(path) as fileobj:
+        state = json.load(fileobj)
+    assert state['cursor'] == 'c2'
+    assert state['rows'] == 2
+
+    handler, cursors = build_handler()
+    j1 = JupiterOneClient(account='testAccount', token='testToken', transport=FakeTransport(handler))
+    response = j1.query_v1('FIND Host', checkpoint=path)
+
+    assert cursors == ['c2']
+    assert [row['id'] for row in response['data']] == ['1', '2', '3']
+
+    # A complete checkpoint is read back without querying again
+    response = j1.query_v1('FIND Host', checkpoint=path)
+    assert cursors == ['c2']
+    assert len(response['data']) == 3
+
+
+def test_checkpoint_discards_unsaved_rows(tmpdir):
+    path = os.path.join(str(tmpdir), 'state.json')
+    checkpoint = QueryCheckpoint(path)
+    checkpoint.load('FIND Host')
+    checkpoint.append([{'id': '1'}], 'c1')
+
+    with open(checkpoint.rows_path, 'ab') as fileobj:
+        fileobj.write(b'{"id": "partial"')
+
+    state = QueryCheckpoint(path).load('FIND Host')
+    assert state['cursor'] == 'c1'
+    assert list(checkpoint.rows()) == [{'id': '1'}]
+
+
+def test_checkpoint_rejects_different_query(tmpdir):
+    path = os.path.join(str(tmpdir), 'state.json')
+    checkpoint = QueryCheckpoint(path)
+    checkpoint.load('FIND Host')
+    checkpoint.append([], 'c1')
+
+    with pytest.raises(JupiterOneClientError):
+        QueryCheckpoint(path).load('FIND User')
+
+
+def test_checkpoint_rejects_different_rows_path(tmpdir):
+    path = os.path.join(str(tmpdir), 'state.json')
+    checkpoint = QueryCheckpoint(path, rows_path=os.path.join(str(tmpdir), 'out1.ndjson'))
+    checkpoint.load('FIND Host')
+    checkpoint.append([{'id': '1'}], 'c1')
+
+    other = os.path.join(str(tmpdir), 'out2.ndjson')
+    with pytest.raises(JupiterOneClientError):
+        QueryCheckpoint(path, rows_path=other).load('FIND Host')
+    assert not os.path.exists(other)
@@ -0,0 +1,74 @@
+import pytest
+
+from jupiterone.circuit import CircuitBreaker
+from jupiterone.client import JupiterOneClient
+from jupiterone.errors import JupiterOneCircuitOpenError
+from jupiterone.transport import FakeTransport
+
+
+def test_circuit_opens_after_failures():
+    breaker = CircuitBreaker(failure_threshold=2, window=60, recovery_timeout=60)
+
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    with pytest.raises(JupiterOneCircuitOpenError):
+        breaker.before_call()
+
+
+def test_half_open_trial_closes_circuit():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+    breaker.before_call()
+    # Only one trial request at a time while half-open
+    with pytest.raises(JupiterOneCircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.before_call()
+
+
+def test_half_open_trial_failure_reopens_circuit():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0)
+    breaker.record_failure()
+    breaker.before_call()
+    breaker.recovery_timeout = 60
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_client_fails_fast_while_open():
+    transport = FakeTransport(lambda request: (503, {}, 'Service Unavailable'))
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=60)
+    j1 = JupiterOneClient(account='testAccount', token='testToken', transport=transport, circuit_breaker=breaker)
+
+    # The first attempt opens the circuit so the retry fails fast
+    with pytest.raises(JupiterOneCircuitOpenError):
+        j1.query_v1('FIND Host')
+    assert transport.requests == 1
+
+    with pytest.raises(JupiterOneCircuitOpenError):
+        j1.create_entity(entity_key='1', entity_type='test_host', entity_class='Host')
+    assert transport.requests == 1
+
+
+def test_client_records_success():
+    def handler(request):
+        return 200, {}, {'data': {'queryV1': {'type': 'list', 'data': []}}}
+
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0)
+    breaker.record_failure()
+    j1 = JupiterOneClient(account='testAccount', token='testToken', transport=FakeTransport(handler), circuit_breaker=breaker)
+
+    j1.query_v1('FIND Host')
+
+    assert breaker.state == CircuitBreaker.CLOSED
@@ -0,0 +1,99 @@
+import io
+import json
+import os
+import responses
+
+from jupiterone.cli import main
+from jupiterone.client import JupiterOneClient
+
+ARGS = ['--account', 'testAccount', '--token', 'testToken']
+
+
+def add_query_pages():
+    pages = {
+        None: ('1', 'c1'),
+        'c1': ('2', None)
+    }
+
+    def request_callback(request):
+        cursor = json.loads(request.body)['variables'].get('cursor')
+        entity_id, next_cursor = pages[cursor]
+        query_v1 = {
+            'type': 'list',
+            'data': [{'id': entity_id, 'entity': {'_id': entity_id}, 'properties': {}}],
+            'cursor': next_cursor
+        }
+        return (200, {'Content-Type': 'application/json'}, json.dumps({'data': {'queryV1': query_v1}}))
+
+    responses.add_callback(
+        responses.POST, 'https://api.us.jupiterone.io/graphql',
+        callback=request_callback,
+        content_type='application/json',
+    )
+
+
+@responses.activate
+def test_query_command():
+    add_query_pages()
+    stdout = io.StringIO()
+
+    assert main(ARGS + ['query', 'FIND Host'], stdout=stdout) == 0
+    assert [json.loads(line)['id'] for line in stdout.getvalue().splitlines()] == ['1', '2']
+
+
+@responses.activate
+def test_export_command(tmpdir):
+    add_query_pages()
+    output = os.path.join(str(tmpdir), 'hosts.ndjson')
+    checkpoint = os.path.join(str(tmpdir), 'hosts.state')
+    stderr = io.StringIO()
+
+    assert main(ARGS + ['export', 'FIND Host', '-o', output, '--checkpoint', checkpoint], stderr=stderr) == 0
+
+    with open(output) as fileobj:
+        assert [json.loads(line)['id'] for line in fileobj] == ['1', '2']
+    assert 'Exported 2 rows' in stderr.getvalue()
+
+
+@responses.activate
+def test_upsert_command():
+    def request_callback(request):
+        variables = json.loads(request.body)['variables']
+        data = {
+            name.split('_')[0]: {'entity': {'_id': value}, 'vertex': {'id': value, 'entity': {'_id': value}}}
+            for name, value in variables.items() if name.endswith('_entityKey')
+        }
+        return (200, {'Content-Type': 'application/json'}, json.dumps({'data': data}))
+
+    responses.add_callback(
+        responses.POST, 'https://api.us.jupiterone.io/graphql',
+        callback=request_callback,
+        content_type='application/json',
+    )
+
+    stdin = io.StringIO(''.join(
+        json.dumps({'entity_key': str(i), 'entity_type': 'test_host', 'entity_class': 'Host'}) + '\n'
+        for i in range(5)
+    ))
+    stdout = io.StringIO()
+
+    assert main(ARGS + ['--batch-size', '2', 'upsert'], stdin=stdin, stdout=stdout) == 0
+    assert len(responses.calls) == 3
+    assert len(stdout.getvalue().splitlines()) == 5
+
+
+def test_missing_credentials(monkeypatch):
+    monkeypatch.delenv('JUPITERONE_TOKEN', raising=False)
+    stderr = io.StringIO()
+    assert main(['--account', 'testAccount', 'query', 'FIND Host'], stderr=stderr) == 2
+    assert 'token is required' in stderr.getvalue()
+
+
+@responses.activate
+def test_exhausted_retries_exit_with_error(monkeypatch):
+    monkeypatch.setattr(JupiterOneClient, 'RETRY_OPTS', dict(JupiterOneClient.RETRY_OPTS, stop_max_delay=0))
+    responses.add(responses.POST, 'https://api.us.jupiterone.io/graphql', status=503)
+    stderr = io.StringIO()
+
+    assert main(ARGS + ['query', 'FIND Host'], stderr=stderr) == 2
+    assert 'rate limit exceeded' in stderr.getvalue()
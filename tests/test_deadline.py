@@ -0,0 +1,80 @@
+import time
+import pytest
+
+from jupiterone.client import JupiterOneClient
+from jupiterone.deadline import Deadline
+from jupiterone.errors import JupiterOneTimeoutError
+from jupiterone.transport import FakeTransport
+
+
+def cursor_handler(timeouts):
+    """ Returns the first page, then rate limits every following request """
+
+    def handler(request):
+        timeouts.append(request.timeout)
+        if request.json()['variables'].get('cursor') is None:
+            return 200, {}, {'data': {'queryV1': {'data': [{'id': '1'}, {'id': '2'}], 'cursor': 'page-2'}}}
+        return 429, {}, 'Too Many Requests'
+
+    return handler
+
+
+def test_deadline_cap():
+    deadline = Deadline(5)
+
+    assert deadline.cap(1) == 1
+    assert deadline.cap((1, 60)) == (1, pytest.approx(5, abs=0.1))
+    assert deadline.cap(None) == pytest.approx(5, abs=0.1)
+    assert Deadline.after(None) is None
+
+
+def test_default_timeout_is_sent():
+    timeouts = []
+    j1 = JupiterOneClient(account='testAccount', token='testToken', transport=FakeTransport(cursor_handler(timeouts)), timeout=3)
+
+    with pytest.raises(JupiterOneTimeoutError):
+        j1.query_v1('FIND Host', deadline=0.5)
+
+    assert timeouts[0] <= 0.5
+
+
+def test_deadline_stops_retries_with_partial_results():
+    timeouts = []
+    j1 = JupiterOneClient(account='testAccount', token='testToken', transport=FakeTransport(cursor_handler(timeouts)))
+
+    started = time.monotonic()
+    with pytest.raises(JupiterOneTimeoutError) as excinfo:
+        j1.query_v1('FIND Host', deadline=0.5)
+
+    assert time.monotonic() - started < 2
+    assert excinfo.value.partial == {'data': [{'id': '1'}, {'id': '2'}]}
+    assert all(isinstance(timeout, tuple) for timeout in timeouts)
+
+
+def test_partial_results_are_returned():
+    j1 = JupiterOneClient(account='testAccount', token='testToken', transport=FakeTransport(cursor_handler([])))
+
+    result = j1.query_v1('FIND Host', deadline=0.5, partial_results=True)
+
+    assert result == {'data': [{'id': '1'}, {'id': '2'}]}
+
+
+def test_bulk_mutation_stops_at_deadline():
+    def handler(request):
+        time.sleep(0.2)
+        variables = request.json()['variables']
+        return 200, {}, {'data': {name.split('_')[0]: {'entity': {'_id': value}} for name, value in variables.items()}}
+
+    j1 = JupiterOneClient(account='testAccount', token='testToken', transport=FakeTransport(handler))
+    entities = ({'entity_id': str(index)} for index in range(1000))
+
+    results = []
+    with pytest.raises(JupiterOneTimeoutError):
+        for result in j1.bulk_delete_entities(entities, batch_size=10, max_workers=1, deadline=0.5):
+            results.append(result)
+
+    assert 0 < len(results) < 1000
+
+    entities = ({'entity_id': str(index)} for index in range(1000))
+    results = list(j1.bulk_delete_entities(entities, batch_size=10, max_workers=1, deadline=0.5, partial_results=True))
+    assert 0 < len(results) < 1000
@@ -0,0 +1,138 @@
+import json
+import os
+import pytest
+import responses
+
+from jupiterone.circuit import CircuitBreaker
+from jupiterone.client import JupiterOneClient, read_page_cursor
+from jupiterone.errors import JupiterOneApiError, JupiterOneCircuitOpenError, JupiterOneClientError
+
+STATUS_URL = 'https://results.jupiterone.io/status/1.json'
+DOWNLOAD_URL = 'https://results.jupiterone.io/results/1.json'
+
+
+def add_deferred_responses(statuses, result):
+    responses.add(
+        responses.POST, 'https://api.us.jupiterone.io/graphql',
+        json={'data': {'queryV1': {'type': 'deferred', 'url': STATUS_URL}}}
+    )
+    for status in statuses:
+        responses.add(responses.GET, STATUS_URL, json=status)
+    responses.add(responses.GET, DOWNLOAD_URL, body=json.dumps(result))
+
+
+@pytest.fixture
+def fast_polling(monkeypatch):
+    monkeypatch.setattr(JupiterOneClient, 'DEFERRED_POLL_OPTS', {
+        'wait_initial': 1,
+        'wait_max': 2,
+        'stop_max_delay': 1000
+    })
+    monkeypatch.setattr(JupiterOneClient, 'RETRY_OPTS', dict(JupiterOneClient.RETRY_OPTS, wait_exponential_multiplier=1))
+
+
+@responses.activate
+def test_deferred_query_v1(fast_polling):
+    add_deferred_responses(
+        [{'status': 'IN_PROGRESS'}, {'status': 'COMPLETED', 'url': DOWNLOAD_URL}],
+        {'type': 'list', 'data': [{'id': '1', 'entity': {'_id': '1'}, 'properties': {}}]}
+    )
+
+    j1 = JupiterOneClient(account='testAccount', token='testToken')
+    response = j1.query_v1('FIND Host', deferred=True)
+
+    body = json.loads(responses.calls[0].request.body)
+    assert body['variables']['flags'] == {'variableResultSize': True}
+    assert len(response['data']) == 1
+    assert response['data'][0]['entity']['_id'] == '1'
+
+
+@responses.activate
+def test_deferred_query_v1_to_disk(fast_polling, tmpdir):
+    result = {'type': 'list', 'data': [{'id': '1', 'entity': {'_id': '1'}, 'properties': {}}]}
+    add_deferred_responses([{'status': 'COMPLETED', 'url': DOWNLOAD_URL}], result)
+
+    j1 = JupiterOneClient(account='testAccount', token='testToken')
+    response = j1.query_v1('FIND Host', deferred=True, output_dir=str(tmpdir))
+
+    assert response == {'files': [os.path.join(str(tmpdir), 'page-00000.json')]}
+    with open(response['files'][0]) as fileobj:
+        assert json.load(fileobj) == result
+
+
+@pytest.mark.parametrize('page, cursor', [
+    ({'cursor': 'c"1', 'data': [{'cursor': 'nested'}]}, 'c"1'),
+    ({'type': 'list', 'data': [{'cursor': 'nested'}], 'cursor': None}, None),
+    ({'type': 'list', 'cursor': 'middle', 'data': [{'cursor': 'nested', 'name': 'cursor'}]}, 'middle'),
+    ({'type': 'list', 'data': [{'cursor': 'nested'}]}, None)
+])
+def test_read_page_cursor(tmpdir, page, cursor):
+    path = os.path.join(str(tmpdir), 'page.json')
+    with open(path, 'w') as fileobj:
+        json.dump(page, fileobj, indent=2)
+
+    assert read_page_cursor(path) == cursor
+
+
+@responses.activate
+def test_deferred_query_v1_to_disk_does_not_decode_pages(fast_polling, tmpdir, monkeypatch):
+    add_deferred_responses([{'status': 'COMPLETED', 'url': DOWNLOAD_URL}], {'type': 'list', 'data': [], 'cursor': None})
+
+    def fail(*args, **kwargs):
+        raise AssertionError('page decoded')
+
+    monkeypatch.setattr(json, 'load', fail)
+    j1 = JupiterOneClient(account='testAccount', token='testToken')
+
+    assert len(j1.query_v1('FIND Host', deferred=True, output_dir=str(tmpdir))['files']) == 1
+
+    with pytest.raises(JupiterOneClientError):
+        j1.query_v1('FIND Host', deferred=True, output_dir=str(tmpdir), records=True)
+
+
+@responses.activate
+def test_deferred_query_v1_failed(fast_polling):
+    add_deferred_responses([{'status': 'FAILED', 'error': 'Query failed'}], {})
+
+    j1 = JupiterOneClient(account='testAccount', token='testToken')
+    with pytest.raises(JupiterOneApiError) as exc_info:
+        j1.query_v1('FIND Host', deferred=True)
+
+    assert exc_info.value.args[0] == 'Query failed'
+
+
+@responses.activate
+def test_deferred_query_v1_poll_timeout(fast_polling):
+    add_deferred_responses([{'status': 'IN_PROGRESS'}], {})
+
+    j1 = JupiterOneClient(account='testAccount', token='testToken')
+    with pytest.raises(JupiterOneApiError):
+        j1.query_v1('FIND Host', deferred=True)
+
+
+@responses.activate
+def test_deferred_query_v1_retries_status_and_download(fast_polling, tmpdir):
+    result = {'type': 'list', 'data': [{'id': '1', 'entity': {'_id': '1'}, 'properties': {}}]}
+    responses.add(responses.GET, STATUS_URL, body='Service Unavailable', status=503)
+    responses.add(responses.GET, DOWNLOAD_URL, body='Service Unavailable', status=503)
+    add_deferred_responses([{'status': 'COMPLETED', 'url': DOWNLOAD_URL}], result)
+
+    j1 = JupiterOneClient(account='testAccount', token='testToken', rate_limit=1000)
+    response = j1.query_v1('FIND Host', deferred=True, output_dir=str(tmpdir))
+
+    with open(response['files'][0]) as fileobj:
+        assert json.load(fileobj) == result
+    assert [call.response.status_code for call in responses.calls] == [200, 503, 200, 503, 200]
+    assert 'Authorization' not in responses.calls[-1].request.headers
+
+
+@responses.activate
+def test_deferred_query_v1_polls_through_circuit_breaker(fast_polling):
+    add_deferred_responses([], {})
+    responses.add(responses.GET, STATUS_URL, body='Service Unavailable', status=503)
+
+    j1 = JupiterOneClient(account='testAccount', token='testToken', circuit_breaker=CircuitBreaker(failure_threshold=2))
+    with pytest.raises(JupiterOneCircuitOpenError):
+        j1.query_v1('FIND Host', deferred=True)
+
+    assert len(responses.calls) == 3
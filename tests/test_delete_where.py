@@ -0,0 +1,84 @@
+import io
+import json
+
+from jupiterone.cli import main
+from jupiterone.client import JupiterOneClient
+from jupiterone.transport import FakeTransport
+
+
+def build_client(total=25, fail_ids=()):
+    deleted = []
+    batches = []
+
+    def handler(request):
+        body = request.json()
+        variables = body['variables']
+        if 'cursor' in body['query'] or 'queryV1' in body['query']:
+            start = int(variables.get('cursor') or 0)
+            rows = [{'id': str(index), 'entity': {'_id': str(index)}} for index in range(start, min(start + 10, total))]
+            cursor = str(start + 10) if start + 10 < total else None
+            return 200, {}, {'data': {'queryV1': {'data': rows, 'cursor': cursor}}}
+
+        # Each alias succeeds or fails on its own, like the API
+        batches.append(list(variables.values()))
+        data = {}
+        errors = []
+        for name, value in variables.items():
+            alias = name.split('_')[0]
+            if value in fail_ids:
+                data[alias] = None
+                errors.append({'message': 'Delete failed', 'path': [alias]})
+            else:
+                deleted.append(value)
+                data[alias] = {'entity': {'_id': value}}
+        response = {'data': data}
+        if errors:
+            response['errors'] = errors
+        return 200, {}, response
+
+    client = JupiterOneClient(account='testAccount', token='testToken', transport=FakeTransport(handler))
+    client.batches = batches
+    return client, deleted
+
+
+def test_dry_run_only_counts():
+    client, deleted = build_client()
+
+    report = client.delete_where('FIND aws_instance', dry_run=True)
+
+    assert report['matched'] == 25
+    assert report['deleted'] == 0
+    assert report['dry_run'] is True
+    assert deleted == []
+
+
+def test_delete_where_streams_into_batched_deletes():
+    client, deleted = build_client(fail_ids={'7'})
+    reports = []
+
+    report = client.delete_where('FIND aws_instance', batch_size=4, max_workers=2, rate_limit=1000,
+                                 progress=reports.append, progress_interval=10)
+
+    assert report['matched'] == 25
+    assert report['deleted'] == 24
+    assert report['failed'] == 1
+    assert report['errors'][0]['input'] == '7'
+    assert report['errors'][0]['error'] == 'Delete failed'
+    assert sorted(deleted, key=int) == [str(index) for index in range(25) if index != 7]
+    # The other IDs in the batch of 7 count as deleted and are not sent again
+    assert len(client.batches) == 7
+    assert [batch for batch in client.batches if '7' in batch] == [['4', '5', '6', '7']]
+    assert [progress['deleted'] + progress['failed'] for progress in reports] == [10, 20, 25]
+
+
+def test_delete_where_command(monkeypatch):
+    client, deleted = build_client(total=3)
+    monkeypatch.setattr('jupiterone.client.RequestsTransport', lambda: client.transport)
+    stdout = io.StringIO()
+    stderr = io.StringIO()
+
+    code = main(['--account', 'a', '--token', 't', 'delete-where', 'FIND aws_instance'], stdout=stdout, stderr=stderr)
+
+    assert code == 0
+    assert json.loads(stdout.getvalue())['deleted'] == 3
+    assert sorted(deleted) == ['0', '1', '2']
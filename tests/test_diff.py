@@ -0,0 +1,61 @@
+from collections import Counter
+
+from jupiterone.diff import diff_results, entity_digest
+from jupiterone.records import Entity
+
+
+def row(entity_id, key=None, version=1, **properties):
+    return {
+        'id': entity_id,
+        'entity': {'_id': entity_id, '_key': key or 'key-' + entity_id, '_type': 'test', '_version': version},
+        'properties': properties
+    }
+
+
+def test_entity_digest_ignores_order_and_volatile_fields():
+    first = row('1', version=1, a=1, b=[1, 2])
+    second = {'properties': {'b': [1, 2], 'a': 1}, 'entity': dict(first['entity'], _version=5), 'id': '1'}
+
+    assert entity_digest(first) == entity_digest(second)
+    assert entity_digest(first) != entity_digest(row('1', a=2, b=[1, 2]))
+
+
+def test_diff_results():
+    old = [row('1', a=1), row('2', a=1), row('3', a=1, b='x')]
+    new = iter([row('1', version=2, a=1), row('3', a=2), row('4')])
+
+    changes = {change['id']: change for change in diff_results({'data': old}, new)}
+
+    assert Counter(change['change'] for change in changes.values()) == {'added': 1, 'removed': 1, 'changed': 1}
+    assert changes['4']['change'] == 'added'
+    assert changes['2']['change'] == 'removed'
+    assert changes['3']['properties'] == {'a': {'old': 1, 'new': 2}, 'b': {'old': 'x', 'new': None}}
+    assert changes['3']['entity'] == {}
+
+
+def test_key_fallback_and_streams():
+    def old():
+        return (Entity(item) for item in [row('1', key='host-1', a=1), row('2', key='host-2')])
+
+    new = [row('9', key='host-1', a=1), row('2', key='host-2', a=3)]
+
+    assert sorted(change['change'] for change in diff_results(old, new)) == ['added', 'changed', 'removed']
+
+    changes = {change['id']: change for change in diff_results(old, new, key_fallback=True)}
+    assert [change['change'] for change in changes.values()] == ['changed', 'changed']
+    assert changes['1']['entity'] == {'_id': {'old': '1', 'new': '9'}}
+    assert changes['1']['properties'] == {}
+    assert changes['2']['properties'] == {'a': {'old': None, 'new': 3}}
+
+    # A one time iterator is materialized so it can be read twice
+    one_time = iter([row('1')])
+    assert [change['change'] for change in diff_results(one_time, [])] == ['removed']
+
+
+def test_duplicate_ids_in_new():
+    old = [row('1', key='host-1', a=1)]
+    new = [row('1', key='host-1', a=2), row('1', key='host-1', a=3), row('9', key='host-1'), row('5'), row('5')]
+
+    changes = [(change['change'], change['id']) for change in diff_results(old, new, key_fallback=True)]
+
+    assert changes == [('duplicate', '1'), ('duplicate', '9'), ('added', '5'), ('duplicate', '5'), ('changed', '1')]
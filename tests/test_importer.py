@@ -0,0 +1,115 @@
+import os
+import pytest
+
+from jupiterone.client import JupiterOneClient
+from jupiterone.errors import JupiterOneClientError
+from jupiterone.importer import Importer, RowMapper, iter_csv, iter_import_rows, ENTITY_FIELDS
+from jupiterone.transport import FakeTransport
+
+
+def build_handler(requests):
+    def handler(request):
+        variables = request.json()['variables']
+        requests.append(variables)
+        data = {}
+        for name, value in variables.items():
+            alias, argument = name.split('_', 1)
+            if argument in ('entityKey', 'relationshipKey'):
+                data[alias] = {'entity': {'_id': value}, 'relationship': {'_id': value}}
+        return 200, {}, {'data': data}
+
+    return handler
+
+
+def write(tmpdir, name, content):
+    path = os.path.join(str(tmpdir), name)
+    with open(path, 'w') as fileobj:
+        fileobj.write(content)
+    return path
+
+
+def test_iter_import_rows(tmpdir):
+    csv_path = write(tmpdir, 'hosts.csv', 'key,name\n1,"multi\nline"\n2,b\n')
+    ndjson_path = write(tmpdir, 'hosts.ndjson', '{"key": "1"}\n\n{"key": "2"}\n')
+    jsonl_path = write(tmpdir, 'hosts.jsonl', '{"key": "1"}\n')
+    json_path = write(tmpdir, 'hosts.json', '[\n  {"key": "1"},\n  {"key": "2"}\n]\n')
+    empty_path = write(tmpdir, 'empty.ndjson', '')
+
+    assert [row for _, row in iter_csv(csv_path)] == [{'key': '1', 'name': 'multi\nline'}, {'key': '2', 'name': 'b'}]
+    assert list(iter_import_rows(ndjson_path)) == [(1, b'{"key": "1"}\n'), (3, b'{"key": "2"}\n')]
+    assert list(iter_import_rows(jsonl_path)) == [(1, b'{"key": "1"}\n')]
+    assert list(iter_import_rows(json_path)) == [(1, {'key': '1'}), (2, {'key': '2'})]
+    assert list(iter_import_rows(empty_path)) == []
+
+    with pytest.raises(JupiterOneClientError):
+        list(iter_import_rows(write(tmpdir, 'host.json', '{"key": "1"}')))
+    with pytest.raises(JupiterOneClientError):
+        iter_import_rows(write(tmpdir, 'hosts.txt', ''))
+
+
+def test_row_mapper():
+    mapper = RowMapper(
+        ENTITY_FIELDS,
+        mapping={'entity_key': 'id'},
+        defaults={'entity_type': 'test_host', 'entity_class': 'Host'},
+        converters={'cpus': int}
+    )
+
+    assert mapper({'id': 'h1', 'cpus': '4', 'name': 'host1', 'empty': ''}) == {
+        'entity_key': 'h1',
+        'entity_type': 'test_host',
+        'entity_class': 'Host',
+        'properties': {'cpus': 4, 'name': 'host1'}
+    }
+
+
+def test_import_entities_from_csv(tmpdir):
+    path = write(tmpdir, 'hosts.csv', 'id,name\n' + ''.join('h{0},host{0}\n'.format(i) for i in range(7)))
+    requests = []
+    progress = []
+    j1 = JupiterOneClient(account='testAccount', token='testToken', transport=FakeTransport(build_handler(requests)))
+    importer = Importer(j1, batch_size=3, progress=progress.append, progress_interval=5)
+
+    report = importer.import_entities(
+        path,
+        mapping={'entity_key': 'id'},
+        defaults={'entity_type': 'test_host', 'entity_class': 'Host'}
+    )
+
+    assert len(requests) == 3
+    assert report['rows'] == 7
+    assert report['succeeded'] == 7
+    assert report['failed'] == 0
+    assert [p['rows'] for p in progress] == [5, 7]
+    assert requests[0]['m0_properties'] == {'name': 'host0'}
+
+
+def test_import_entities_reports_error_rows(tmpdir):
+    path = write(tmpdir, 'hosts.ndjson', '{"entity_key": "h1"}\nnot json\n{"entity_type": "missing_key"}\n')
+    error_path = os.path.join(str(tmpdir), 'errors.ndjson')
+    requests = []
+    j1 = JupiterOneClient(account='testAccount', token='testToken', transport=FakeTransport(build_handler(requests)))
+    importer = Importer(j1, error_path=error_path)
+
+    report = importer.import_entities(path, defaults={'entity_type': 'test_host', 'entity_class': 'Host'})
+
+    assert report['succeeded'] == 1
+    assert report['failed'] == 2
+    assert sorted(error['line'] for error in report['errors']) == [2, 3]
+    with open(error_path) as fileobj:
+        assert len(fileobj.readlines()) == 2
+
+
+def test_import_relationships(tmpdir):
+    path = write(tmpdir, 'relationships.csv', 'key,from,to\nr1,a,b\nr2,b,c\n')
+    requests = []
+    j1 = JupiterOneClient(account='testAccount', token='testToken', transport=FakeTransport(build_handler(requests)))
+
+    report = Importer(j1).import_relationships(
+        path,
+        mapping={'relationship_key': 'key', 'from_entity_id': 'from', 'to_entity_id': 'to'},
+        defaults={'relationship_type': 'host_has_host', 'relationship_class': 'HAS'}
+    )
+
+    assert report['succeeded'] == 2
+    assert requests[0]['m1_fromEntityId'] == 'b'
@@ -0,0 +1,172 @@
+""" Memory and decoding budgets for the query paths, measured with tracemalloc
+    against synthetic multi-page payloads served by a FakeTransport.
+"""
+import gc
+import json
+import os
+import re
+import subprocess
+import sys
+import tracemalloc
+import warnings
+
+import pytest
+
+from jupiterone.client import JupiterOneClient
+from jupiterone.transport import FakeTransport
+
+PAGES = 10
+ROWS_PER_PAGE = 500
+
+# Bytes allocated per row at the peak of a query, including the page in flight
+PEAK_BYTES_PER_ROW = {'rows': 2500, 'records': 1200}
+# The peak may exceed what is retained by the page in flight, not by a second copy of the results
+IN_FLIGHT_BYTES_PER_PAGE_ROW = 3000
+# Memory blocks still allocated per row once a query returns
+RETAINED_BLOCKS_PER_ROW = {'rows': 25, 'records': 10}
+MAX_RSS_GROWTH_BYTES = 16 * 1024 * 1024
+
+json_loads = json.loads
+
+
+def build_row(index):
+    return {
+        'id': str(index),
+        'entity': {
+            '_id': str(index),
+            '_key': 'key-{}'.format(index),
+            '_type': 'aws_instance',
+            '_class': ['Host'],
+            '_integrationType': 'aws',
+            'displayName': 'instance-{}'.format(index)
+        },
+        'properties': {
+            'region': 'us-east-1',
+            'state': 'running',
+            'instanceType': 't3.micro',
+            'tag.Name': 'instance-{}'.format(index)
+        }
+    }
+
+
+def build_page(page):
+    return [build_row(page * ROWS_PER_PAGE + index) for index in range(ROWS_PER_PAGE)] if page < PAGES else []
+
+
+# Payloads are encoded up front so the fake endpoint allocates little while measuring
+CURSOR_PAGES = [
+    json.dumps({
+        'data': {'queryV1': {'data': build_page(page), 'cursor': str(page + 1) if page + 1 < PAGES else None}}
+    }).encode('utf-8')
+    for page in range(PAGES)
+]
+LIMIT_PAGES = [
+    json.dumps({'data': {'queryV1': {'data': build_page(page)}}}).encode('utf-8')
+    for page in range(PAGES + 1)
+]
+
+
+def handler(request):
+    variables = json_loads(request.body)['variables']
+    match = re.search(r'SKIP (\d+)', variables['query'])
+    if match:
+        return 200, {}, LIMIT_PAGES[int(match.group(1)) // ROWS_PER_PAGE]
+    return 200, {}, CURSOR_PAGES[int(variables.get('cursor') or 0)]
+
+
+# ru_maxrss is the high-water mark of the whole process, so the query runs in
+# a fresh interpreter where nothing before it has raised the mark.  It is in
+# kilobytes on Linux.
+RSS_SCRIPT = """
+import json, resource, sys, warnings
+import test_memory
+from jupiterone.client import JupiterOneClient
+from jupiterone.transport import FakeTransport
+
+j1 = JupiterOneClient(account='testAccount', token='testToken', transport=FakeTransport(test_memory.handler))
+before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+with warnings.catch_warnings():
+    warnings.simplefilter('ignore', DeprecationWarning)
+    j1.query_v1('FIND aws_instance', **json.loads(sys.argv[1]))
+print((resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before) * 1024)
+"""
+
+
+def rss_growth(**kwargs):
+    """ Returns how much a query raises the peak RSS of a fresh interpreter """
+    pytest.importorskip('resource')
+    tests = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([tests, os.path.dirname(tests), os.environ.get('PYTHONPATH', '')]))
+    output = subprocess.run(
+        [sys.executable, '-c', RSS_SCRIPT, json.dumps(kwargs)], env=env, check=True, capture_output=True, text=True
+    ).stdout
+    return int(output)
+
+
+def measure(monkeypatch, **kwargs):
+    """ Runs query_v1 returning the result, the JSON decode passes, the
+        traced (current, peak) bytes and the number of blocks still allocated
+    """
+    decodes = []
+
+    def counting_loads(*args, **loads_kwargs):
+        decodes.append(1)
+        return json_loads(*args, **loads_kwargs)
+
+    j1 = JupiterOneClient(account='testAccount', token='testToken', transport=FakeTransport(handler))
+    monkeypatch.setattr(json, 'loads', counting_loads)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', DeprecationWarning)
+            result = j1.query_v1('FIND aws_instance', **kwargs)
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__)
+        ])
+    finally:
+        tracemalloc.stop()
+        monkeypatch.setattr(json, 'loads', json_loads)
+    blocks = sum(stat.count for stat in snapshot.statistics('filename'))
+    return result, len(decodes), current, peak, blocks
+
+
+@pytest.mark.parametrize('kwargs, pages', [
+    ({}, PAGES),
+    ({'records': True}, PAGES),
+    ({'limit': ROWS_PER_PAGE, 'skip': ROWS_PER_PAGE}, PAGES + 1)
+])
+def test_each_page_is_decoded_once(monkeypatch, kwargs, pages):
+    result, decodes, _, _, _ = measure(monkeypatch, **kwargs)
+
+    assert len(result['data']) == PAGES * ROWS_PER_PAGE
+    assert decodes == pages
+
+
+@pytest.mark.parametrize('kwargs, kind', [
+    ({}, 'rows'),
+    ({'limit': ROWS_PER_PAGE, 'skip': ROWS_PER_PAGE}, 'rows'),
+    ({'records': True}, 'records')
+])
+def test_allocations_per_row(monkeypatch, kwargs, kind):
+    result, _, current, peak, blocks = measure(monkeypatch, **kwargs)
+    rows = len(result['data'])
+
+    assert peak / rows <= PEAK_BYTES_PER_ROW[kind]
+    assert peak - current <= ROWS_PER_PAGE * IN_FLIGHT_BYTES_PER_PAGE_ROW
+    assert blocks / rows <= RETAINED_BLOCKS_PER_ROW[kind]
+
+
+@pytest.mark.parametrize('kwargs', [{}, {'records': True}])
+def test_rss_growth(kwargs):
+    assert rss_growth(**kwargs) <= MAX_RSS_GROWTH_BYTES
+
+
+def test_records_retain_less_than_rows(monkeypatch):
+    _, _, rows_retained, _, rows_blocks = measure(monkeypatch)
+    _, _, records_retained, _, records_blocks = measure(monkeypatch, records=True)
+
+    assert records_retained <= rows_retained * 0.6
+    assert records_blocks < rows_blocks
@@ -0,0 +1,103 @@
+import re
+import time
+import warnings
+import pytest
+
+from jupiterone.client import JupiterOneClient
+from jupiterone.errors import JupiterOneApiError
+from jupiterone.paging import PageSizer
+from jupiterone.transport import FakeTransport
+
+
+def test_sizer_grows_until_throughput_falls():
+    sizer = PageSizer(initial=100, maximum=1000)
+
+    assert sizer.record(100, 1.0) == 200
+    assert sizer.record(200, 1.0) == 400
+    # Twice the rows in more than twice the time, go back to 200
+    assert sizer.record(400, 4.0) == 200
+    assert sizer.record(200, 1.0) == 200
+
+
+def test_sizer_settles_on_best_size_after_slow_page():
+    sizer = PageSizer(initial=250, maximum=5000, target_latency=10.0)
+
+    assert sizer.record(250, 1.0) == 500
+    assert sizer.record(500, 1.0) == 1000
+    # Too slow, shrink in proportion to the latency
+    assert sizer.record(1000, 20.0) == 500
+    # Throughput fell, settle on 500 rather than the size that was too slow
+    assert sizer.record(500, 2.0) == 500
+    assert sizer.metrics['sizes'] == [250, 500, 1000, 500]
+
+
+def test_sizer_shrinks_on_latency_bytes_and_errors():
+    sizer = PageSizer(initial=1000, minimum=100, target_latency=2.0, max_bytes=1000)
+
+    assert sizer.record(1000, 4.0) == 500
+    assert sizer.record(500, 1.0, nbytes=2000) == 250
+    assert sizer.record_error() is True
+    assert sizer.size == 125
+    assert sizer.record_error() is True
+    assert sizer.size == 100
+    assert sizer.record_error() is False
+
+    metrics = sizer.metrics
+    assert metrics['pages'] == 2
+    assert metrics['errors'] == 3
+    assert metrics['rows'] == 1500
+    assert metrics['bytes'] == 2000
+    assert metrics['sizes'] == [1000, 500, 250, 125, 100]
+
+    with pytest.raises(ValueError):
+        PageSizer(minimum=0)
+
+
+def test_adaptive_limit_and_skip_query():
+    total = 1000
+    queries = []
+
+    def handler(request):
+        query = request.json()['variables']['query']
+        queries.append(query)
+        # A fixed round trip latency, so larger pages return more rows per second
+        time.sleep(0.02)
+        skip, limit = map(int, re.search(r'SKIP (\d+) LIMIT (\d+)', query).groups())
+        if limit > 400:
+            return 200, {}, {'errors': [{'message': 'Query timed out'}]}
+        rows = [{'id': str(index)} for index in range(skip, min(skip + limit, total))]
+        return 200, {}, {'data': {'queryV1': {'data': rows}}}
+
+    j1 = JupiterOneClient(account='testAccount', token='testToken', transport=FakeTransport(handler))
+    sizer = PageSizer(initial=100, minimum=50)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', DeprecationWarning)
+        result = j1.query_v1('FIND Host', page_sizer=sizer)
+
+    assert [row['id'] for row in result['data']] == [str(index) for index in range(total)]
+    assert queries[:3] == [
+        'FIND Host SKIP 0 LIMIT 100',
+        'FIND Host SKIP 100 LIMIT 200',
+        'FIND Host SKIP 300 LIMIT 400'
+    ]
+    assert 'FIND Host SKIP 700 LIMIT 800' in queries
+    assert sizer.metrics['errors'] == 1
+    assert sizer.metrics['rows'] == total
+    assert sizer.metrics['bytes'] > 0
+
+
+@pytest.mark.parametrize('response', [
+    (401, {}, 'Unauthorized'),
+    (200, {}, {'errors': [{'message': 'Unexpected token FIN'}]})
+])
+def test_client_errors_are_not_retried_smaller(response):
+    transport = FakeTransport(lambda request: response)
+    j1 = JupiterOneClient(account='testAccount', token='testToken', transport=transport)
+    sizer = PageSizer(initial=250, minimum=25)
+
+    with pytest.raises(JupiterOneApiError):
+        j1.query_v1('FIN Host', page_sizer=sizer)
+
+    assert transport.requests == 1
+    assert sizer.metrics['errors'] == 0
@@ -0,0 +1,83 @@
+import hashlib
+import json
+import responses
+
+from jupiterone.client import JupiterOneClient
+from jupiterone.constants import CURSOR_QUERY_V1
+
+
+def build_persisting_server(supported: bool = True):
+    """ Stand-in for a GraphQL server implementing automatic persisted queries """
+    store = {}
+    bodies = []
+
+    def request_callback(request):
+        body = json.loads(request.body)
+        bodies.append(body)
+        headers = {'Content-Type': 'application/json'}
+        persisted = body.get('extensions', {}).get('persistedQuery')
+
+        if persisted and not supported:
+            errors = [{'message': 'PersistedQueryNotSupported', 'extensions': {'code': 'PERSISTED_QUERY_NOT_SUPPORTED'}}]
+            return (200, headers, json.dumps({'errors': errors}))
+
+        if persisted and 'query' not in body:
+            if persisted['sha256Hash'] not in store:
+                errors = [{'message': 'PersistedQueryNotFound', 'extensions': {'code': 'PERSISTED_QUERY_NOT_FOUND'}}]
+                return (200, headers, json.dumps({'errors': errors}))
+        elif persisted:
+            assert hashlib.sha256(body['query'].encode('utf-8')).hexdigest() == persisted['sha256Hash']
+            store[persisted['sha256Hash']] = body['query']
+
+        response = {
+            'data': {
+                'queryV1': {
+                    'type': 'list',
+                    'data': [{'id': '1', 'entity': {'_id': '1'}, 'properties': {}}]
+                }
+            }
+        }
+        return (200, headers, json.dumps(response))
+
+    return request_callback, bodies
+
+
+@responses.activate
+def test_persisted_query_negotiation():
+    callback, bodies = build_persisting_server()
+    responses.add_callback(
+        responses.POST, 'https://api.us.jupiterone.io/graphql',
+        callback=callback,
+        content_type='application/json',
+    )
+
+    j1 = JupiterOneClient(account='testAccount', token='testToken', persisted_queries=True)
+    j1.query_v1('FIND Host')
+    response = j1.query_v1('FIND Host')
+
+    assert response['data'][0]['entity']['_id'] == '1'
+    assert len(bodies) == 3
+    # Unknown hash, then full document to register it, then hash only
+    assert 'query' not in bodies[0]
+    assert bodies[1]['query'] == CURSOR_QUERY_V1
+    assert 'query' not in bodies[2]
+    assert j1.persisted_queries
+
+
+@responses.activate
+def test_persisted_query_not_supported():
+    callback, bodies = build_persisting_server(supported=False)
+    responses.add_callback(
+        responses.POST, 'https://api.us.jupiterone.io/graphql',
+        callback=callback,
+        content_type='application/json',
+    )
+
+    j1 = JupiterOneClient(account='testAccount', token='testToken', persisted_queries=True)
+    j1.query_v1('FIND Host')
+    j1.query_v1('FIND Host')
+
+    assert not j1.persisted_queries
+    assert len(bodies) == 3
+    assert 'extensions' not in bodies[1]
+    assert 'extensions' not in bodies[2]
@@ -0,0 +1,96 @@
+from jupiterone.client import JupiterOneClient
+from jupiterone.pipeline import GraphLoader
+from jupiterone.transport import FakeTransport
+
+
+def build_client(documents, partial=False):
+    def handler(request):
+        body = request.json()
+        variables = body['variables']
+        documents.append(body['query'])
+        data = {}
+        errors = []
+        for name, value in variables.items():
+            alias, argument = name.split('_', 1)
+            if argument == 'entityKey':
+                if value == 'bad':
+                    if not partial:
+                        return 200, {}, {'errors': [{'message': 'Invalid entity'}]}
+                    data[alias] = None
+                    errors.append({'message': 'Invalid entity', 'path': [alias]})
+                else:
+                    data[alias] = {'entity': {'_id': 'id-' + value}}
+            elif argument == 'relationshipKey':
+                data[alias] = {'relationship': {'_id': value}}
+        response = {'data': data}
+        if errors:
+            response['errors'] = errors
+        return 200, {}, response
+
+    return JupiterOneClient(account='testAccount', token='testToken', transport=FakeTransport(handler))
+
+
+def entity(key):
+    return {'entity_key': key, 'entity_type': 'test_entity', 'entity_class': 'Test'}
+
+
+def relationship(key, from_key, to_key):
+    return {
+        'relationship_key': key,
+        'relationship_type': 'test_has_test',
+        'relationship_class': 'HAS',
+        'from_entity_key': from_key,
+        'to_entity_key': to_key
+    }
+
+
+def test_relationships_start_before_all_entities_are_created():
+    documents = []
+    loader = GraphLoader(build_client(documents), batch_size=2, max_workers=1)
+
+    report = loader.load(
+        (entity(key) for key in 'abcdef'),
+        [relationship('a-b', 'a', 'b'), relationship('b-a', 'b', 'a'), relationship('e-f', 'e', 'f')]
+    )
+
+    assert report['entities'] == {'succeeded': 6, 'failed': 0}
+    assert report['relationships'] == {'succeeded': 3, 'failed': 0}
+    assert report['ids']['f'] == 'id-f'
+    kinds = ['relationship' if 'createRelationship' in document else 'entity' for document in documents]
+    assert kinds == ['entity', 'entity', 'relationship', 'entity', 'relationship']
+    assert 'm0_fromEntityId' in documents[2]
+
+
+def test_failed_and_missing_endpoints():
+    documents = []
+    loader = GraphLoader(build_client(documents), batch_size=10)
+    existing = dict(relationship('a-x', 'a', None), to_entity_id='existing-id')
+
+    report = loader.load(
+        [entity('a'), entity('bad')],
+        [relationship('a-bad', 'a', 'bad'), relationship('a-missing', 'a', 'missing'), existing]
+    )
+
+    assert report['entities'] == {'succeeded': 1, 'failed': 1}
+    assert report['relationships'] == {'succeeded': 1, 'failed': 2}
+    errors = {error['input'].get('relationship_key', error['input'].get('entity_key')): error['error'] for error in report['errors']}
+    assert errors['a-bad'] == 'Entity bad was not created'
+    assert errors['a-missing'] == 'Entity missing was not loaded'
+    assert 'bad' in errors
+
+
+def test_failed_entity_does_not_resend_its_batch():
+    documents = []
+    loader = GraphLoader(build_client(documents, partial=True), batch_size=10)
+
+    report = loader.load(
+        [entity('a'), entity('bad'), entity('c')],
+        [relationship('a-c', 'a', 'c'), relationship('a-bad', 'a', 'bad')]
+    )
+
+    assert report['entities'] == {'succeeded': 2, 'failed': 1}
+    assert report['relationships'] == {'succeeded': 1, 'failed': 1}
+    assert report['ids'] == {'a': 'id-a', 'c': 'id-c'}
+    assert [error['error'] for error in report['errors'] if error['type'] == 'entity'] == ['Invalid entity']
+    # One entity batch and one relationship batch, the siblings of bad are not created twice
+    assert len(documents) == 2
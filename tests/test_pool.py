@@ -0,0 +1,68 @@
+import pytest
+
+from jupiterone.errors import JupiterOneApiError, JupiterOneClientError
+from jupiterone.pool import ClientPool
+from jupiterone.transport import FakeTransport
+
+
+def account_handler(request):
+    account = request.headers['LifeOmic-Account']
+    if account == 'broken':
+        return 400, {}, 'Bad Request'
+
+    body = request.json()
+    if 'variables' in body and 'm0_entityId' in body['variables']:
+        return 200, {}, {'data': {'m0': {'entity': {'_id': body['variables']['m0_entityId']}}}}
+    return 200, {}, {'data': {'queryV1': {'data': [{'id': account}]}}}
+
+
+def test_query_fans_out_to_every_account():
+    transport = FakeTransport(account_handler)
+    pool = ClientPool({'one': 'token-1', 'two': 'token-2'}, transport=transport, rate_limit=10)
+
+    results = pool.query_v1('FIND Host')
+
+    assert results == {
+        'one': {'data': [{'id': 'one'}]},
+        'two': {'data': [{'id': 'two'}]}
+    }
+    assert transport.requests == 2
+    assert pool.client('one').transport is pool.client('two').transport
+    assert pool.client('one').rate_limiter is not pool.client('two').rate_limiter
+    assert pool.client('two').headers['Authorization'] == 'Bearer token-2'
+
+
+def test_selected_accounts_and_exceptions():
+    pool = ClientPool({'one': 'token-1', 'broken': 'token-2'}, transport=FakeTransport(account_handler))
+
+    results = pool.query_v1('FIND Host', accounts=['one'])
+    assert list(results) == ['one']
+
+    with pytest.raises(JupiterOneApiError):
+        pool.query_v1('FIND Host')
+
+    results = pool.query_v1('FIND Host', return_exceptions=True)
+    assert results['one'] == {'data': [{'id': 'one'}]}
+    assert isinstance(results['broken'], JupiterOneApiError)
+
+    with pytest.raises(JupiterOneClientError):
+        pool.client('unknown')
+
+
+def test_bulk_mutation_per_account():
+    pool = ClientPool({'one': 'token-1', 'two': 'token-2'}, transport=FakeTransport(account_handler))
+
+    results = pool.bulk_delete_entities(lambda account: ['{}-1'.format(account)], batch_size=1)
+
+    assert results == {
+        'one': [{'input': 'one-1', 'response': {'entity': {'_id': 'one-1'}}}],
+        'two': [{'input': 'two-1', 'response': {'entity': {'_id': 'two-1'}}}]
+    }
+
+
+def test_default_connection_pool_covers_per_account_concurrency():
+    with ClientPool({'a': 't', 'b': 't'}, max_workers=8) as pool:
+        assert pool.transport.session.get_adapter('https://api.us.jupiterone.io')._pool_maxsize == 32
+
+    with ClientPool({'a': 't'}, max_workers=2, pool_maxsize=5) as pool:
+        assert pool.transport.session.get_adapter('https://api.us.jupiterone.io')._pool_maxsize == 5
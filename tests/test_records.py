@@ -0,0 +1,116 @@
+import json
+import responses
+
+from jupiterone.client import JupiterOneClient
+from jupiterone.records import Entity, Relationship
+
+ROW = {
+    'id': '1',
+    'entity': {
+        '_rawDataHashes': '1',
+        '_integrationName': 'aws',
+        '_beginOn': 1580482083079,
+        'displayName': 'host1',
+        '_class': ['Host'],
+        '_version': 1,
+        '_id': '1',
+        '_key': 'key1',
+        '_type': ['aws_instance'],
+        '_deleted': False,
+        '_integrationType': 'aws',
+        '_createdOn': 1578093840019
+    },
+    'properties': {
+        'id': 'host1',
+        'active': True
+    }
+}
+
+EDGE = {
+    'id': 'r1',
+    'fromVertexId': '1',
+    'toVertexId': '2',
+    'relationship': {
+        '_id': 'r1',
+        '_key': 'key1|has|key2',
+        '_type': 'host_has_disk',
+        '_class': 'HAS',
+        '_version': 2
+    },
+    'properties': {
+        'weight': 1
+    }
+}
+
+
+def test_entity_record():
+    entity = Entity.from_row(ROW)
+
+    assert entity.entity_id == '1'
+    assert entity.entity_key == 'key1'
+    assert entity.entity_type == ('aws_instance',)
+    assert entity.entity_class == ('Host',)
+    assert entity.integration_type == 'aws'
+    assert entity.display_name == 'host1'
+    assert entity.metadata == {'_rawDataHashes': '1', '_integrationName': 'aws', '_version': 1}
+    assert entity.properties == {'id': 'host1', 'active': True}
+    assert entity.to_dict() == ROW
+    assert not hasattr(entity, '__dict__')
+
+
+def test_entity_record_interns_strings():
+    first = Entity.from_row(json.loads(json.dumps(ROW)))
+    second = Entity.from_row(json.loads(json.dumps(ROW)))
+
+    assert first.integration_type is second.integration_type
+    assert first.entity_class[0] is second.entity_class[0]
+
+
+def test_relationship_record():
+    relationship = Relationship.from_edge(EDGE)
+
+    assert relationship.relationship_id == 'r1'
+    assert relationship.relationship_class == 'HAS'
+    assert relationship.from_entity_id == '1'
+    assert relationship.to_entity_id == '2'
+    assert relationship.properties == {'weight': 1}
+    assert relationship.to_dict() == EDGE
+
+
+def test_records_compare_and_hash():
+    reordered = dict(ROW, properties={'active': True, 'id': 'host1'})
+    changed = dict(ROW, properties={'id': 'host1', 'active': False})
+
+    assert Entity.from_row(ROW) == Entity.from_row(reordered)
+    assert Entity.from_row(ROW) != Entity.from_row(changed)
+    assert len({Entity.from_row(ROW), Entity.from_row(reordered)}) == 1
+    assert Relationship.from_edge(EDGE) == Relationship.from_edge(json.loads(json.dumps(EDGE)))
+    assert Relationship.from_edge(EDGE) != Entity.from_row(ROW)
+    assert len({Relationship.from_edge(EDGE), Relationship.from_edge(dict(EDGE, id='r2'))}) == 2
+
+
+@responses.activate
+def test_query_v1_records():
+    responses.add(
+        responses.POST, 'https://api.us.jupiterone.io/graphql',
+        json={'data': {'queryV1': {'type': 'list', 'data': [ROW]}}}
+    )
+
+    j1 = JupiterOneClient(account='testAccount', token='testToken')
+    response = j1.query_v1('FIND Host', records=True)
+
+    assert response['data'] == [Entity.from_row(ROW)]
+
+
+@responses.activate
+def test_tree_query_v1_records():
+    responses.add(
+        responses.POST, 'https://api.us.jupiterone.io/graphql',
+        json={'data': {'queryV1': {'type': 'tree', 'data': {'vertices': [ROW], 'edges': [EDGE]}}}}
+    )
+
+    j1 = JupiterOneClient(account='testAccount', token='testToken')
+    response = j1.query_v1('FIND Host RETURN TREE', records=True)
+
+    assert response['vertices'][0].entity_id == '1'
+    assert response['edges'][0].relationship_id == 'r1'
@@ -0,0 +1,100 @@
+import json
+import responses
+
+from jupiterone.client import JupiterOneClient
+
+RULES_URL = 'https://api.us.jupiterone.io/rules/graphql'
+
+
+def build_rules_results():
+    pages = {
+        None: {'questionInstances': [{'id': 'rule1'}, {'id': 'rule2'}], 'pageInfo': {'hasNextPage': True, 'endCursor': 'c1'}},
+        'c1': {'questionInstances': [{'id': 'rule3'}], 'pageInfo': {'hasNextPage': False, 'endCursor': None}}
+    }
+
+    def request_callback(request):
+        variables = json.loads(request.body)['variables']
+        response = {'data': {'listRuleInstances': pages[variables.get('cursor')]}}
+        return (200, {'Content-Type': 'application/json'}, json.dumps(response))
+
+    return request_callback
+
+
+def build_evaluation_results(request):
+    variables = json.loads(request.body)['variables']
+    rule_id = variables['collectionOwnerId']
+    cursor = variables.get('cursor')
+    response = {
+        'data': {
+            'listCollectionResults': {
+                'results': [{'collectionOwnerId': rule_id, 'timestamp': 2 if cursor else 1}],
+                'pageInfo': {'endCursor': None if cursor else 'next'}
+            }
+        }
+    }
+    return (200, {'Content-Type': 'application/json'}, json.dumps(response))
+
+
+@responses.activate
+def test_list_alert_rules():
+    responses.add_callback(
+        responses.POST, RULES_URL,
+        callback=build_rules_results(),
+        content_type='application/json',
+    )
+
+    j1 = JupiterOneClient(account='testAccount', token='testToken')
+    rules = j1.list_alert_rules(limit=2)
+
+    assert [rule['id'] for rule in rules] == ['rule1', 'rule2', 'rule3']
+    assert len(responses.calls) == 2
+    assert json.loads(responses.calls[0].request.body)['variables'] == {'limit': 2}
+
+
+@responses.activate
+def test_iter_rule_evaluations():
+    responses.add_callback(
+        responses.POST, RULES_URL,
+        callback=build_evaluation_results,
+        content_type='application/json',
+    )
+
+    j1 = JupiterOneClient(account='testAccount', token='testToken')
+    evaluations = list(j1.iter_rule_evaluations('rule1', begin_timestamp=0, end_timestamp=10))
+
+    assert [e['timestamp'] for e in evaluations] == [1, 2]
+    body = json.loads(responses.calls[0].request.body)
+    assert body['variables']['collectionType'] == 'RULE_EVALUATION'
+    assert body['variables']['endTimestamp'] == 10
+
+
+@responses.activate
+def test_iter_rule_evaluations_fixes_default_end_timestamp():
+    responses.add_callback(
+        responses.POST, RULES_URL,
+        callback=build_evaluation_results,
+        content_type='application/json',
+    )
+
+    j1 = JupiterOneClient(account='testAccount', token='testToken')
+    list(j1.iter_rule_evaluations('rule1', begin_timestamp=0))
+
+    end_timestamps = {json.loads(call.request.body)['variables']['endTimestamp'] for call in responses.calls}
+    assert len(responses.calls) == 2
+    assert len(end_timestamps) == 1
+
+
+@responses.activate
+def test_bulk_rule_evaluations():
+    responses.add_callback(
+        responses.POST, RULES_URL,
+        callback=build_evaluation_results,
+        content_type='application/json',
+    )
+
+    j1 = JupiterOneClient(account='testAccount', token='testToken')
+    results = dict(j1.bulk_rule_evaluations(['rule1', 'rule2', 'rule3'], begin_timestamp=0, max_workers=3))
+
+    assert sorted(results.keys()) == ['rule1', 'rule2', 'rule3']
+    assert all(len(evaluations) == 2 for evaluations in results.values())
+    assert results['rule2'][0]['collectionOwnerId'] == 'rule2'
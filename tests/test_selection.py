@@ -0,0 +1,50 @@
+from jupiterone.client import JupiterOneClient, selection_set
+from jupiterone.constants import MUTATION_MINIMAL_SELECTIONS
+from jupiterone.transport import FakeTransport
+
+
+def test_selection_set():
+    assert selection_set(None) is None
+    assert selection_set(' entity { _id } ') == 'entity { _id }'
+    assert selection_set(['_id', '_key']) == '_id _key'
+    assert selection_set({'entity': ['_id']}) == 'entity { _id }'
+    assert selection_set({'edge': ['id', {'relationship': ['_id', '_key']}], 'relationship': None}) == (
+        'edge { id relationship { _id _key } } relationship'
+    )
+
+
+def build_client(documents):
+    def handler(request):
+        body = request.json()
+        documents.append(body['query'])
+        data = {name.split('_')[0]: {'entity': {'_id': 'id-1'}} for name in body['variables']}
+        return 200, {}, {'data': data}
+
+    return JupiterOneClient(account='testAccount', token='testToken', transport=FakeTransport(handler))
+
+
+def test_mutation_fields():
+    documents = []
+    j1 = build_client(documents)
+
+    response = j1.delete_entity(entity_id='id-1', fields={'entity': ['_id']})
+
+    assert response == {'entity': {'_id': 'id-1'}}
+    assert documents[0] == (
+        'mutation Batch($m0_entityId: String!) {\n'
+        '  m0: deleteEntity(entityId: $m0_entityId) { entity { _id } }\n'
+        '}'
+    )
+    assert 'properties' not in documents[0]
+
+
+def test_bulk_mutation_fields():
+    documents = []
+    j1 = build_client(documents)
+    entities = [{'entity_key': str(index), 'entity_type': 'test', 'entity_class': 'Test'} for index in range(3)]
+
+    results = list(j1.bulk_create_entities(entities, fields=MUTATION_MINIMAL_SELECTIONS['createEntity']))
+
+    assert len(results) == 3
+    assert 'vertex' not in documents[0]
+    assert documents[0].count('{ entity { _id } }') == 3
@@ -0,0 +1,102 @@
+import json
+import pytest
+import responses
+
+from jupiterone.client import (
+    JupiterOneClient,
+    add_with_condition,
+    shard_condition,
+    time_range_shards
+)
+from jupiterone.errors import JupiterOneClientError
+
+
+def build_row(entity_id: str, entity_type: str):
+    return {
+        'id': entity_id,
+        'entity': {
+            '_id': entity_id,
+            '_type': [entity_type],
+            '_class': ['Host']
+        },
+        'properties': {}
+    }
+
+
+def test_add_with_condition():
+    assert add_with_condition('FIND Host', "_type = 'a'") == "FIND Host WITH _type = 'a'"
+    assert add_with_condition("find Host with active=true that RELATES TO *", "_type = 'a'") == \
+        "find Host WITH _type = 'a' AND (active=true) that RELATES TO *"
+    assert add_with_condition('FIND (A|B) as x RETURN x', "_type = 'a'") == \
+        "FIND (A|B) as x WITH _type = 'a' RETURN x"
+    assert add_with_condition("FIND Host WITH a=1 OR b='x) that' RETURN Host", "_type = 'a'") == \
+        "FIND Host WITH _type = 'a' AND (a=1 OR b='x) that') RETURN Host"
+    assert add_with_condition('FIND Host WITH (a=1 OR b=2) AND limit = 3 LIMIT 5', "_type = 'a'") == \
+        "FIND Host WITH _type = 'a' AND ((a=1 OR b=2) AND limit = 3) LIMIT 5"
+    assert add_with_condition('FIND Host WITH active=true AS h THAT HAS Disk', "_type = 'a'") == \
+        "FIND Host WITH _type = 'a' AND (active=true) AS h THAT HAS Disk"
+    assert add_with_condition('FIND Host WITH a=1 OR b=2 AS h THAT HAS Disk AS d WHERE h.x = d.x RETURN h', "_type = 'a'") == \
+        "FIND Host WITH _type = 'a' AND (a=1 OR b=2) AS h THAT HAS Disk AS d WHERE h.x = d.x RETURN h"
+    assert add_with_condition("FIND Host WITH alias='as h' where_used=true", "_type = 'a'") == \
+        "FIND Host WITH _type = 'a' AND (alias='as h' where_used=true)"
+
+    with pytest.raises(JupiterOneClientError):
+        add_with_condition('SELECT 1', "_type = 'a'")
+
+
+def test_shard_condition():
+    assert shard_condition('_type', 'aws_instance') == "_type = 'aws_instance'"
+    assert shard_condition('_createdOn', (1, 5)) == '_createdOn >= 1 AND _createdOn < 5'
+    assert shard_condition('_createdOn', (None, 5)) == '_createdOn < 5'
+
+
+def test_time_range_shards():
+    assert time_range_shards(0, 10, 3) == [(0, 4), (4, 8), (8, 10)]
+
+    with pytest.raises(JupiterOneClientError):
+        time_range_shards(10, 0, 3)
+
+
+@responses.activate
+def test_sharded_query_v1():
+
+    pages = {
+        "FIND * WITH _type = 'aws_instance'": [build_row('1', 'aws_instance'), build_row('2', 'aws_instance')],
+        "FIND * WITH _type = 'aws_s3_bucket'": [build_row('3', 'aws_s3_bucket'), build_row('2', 'aws_instance')]
+    }
+
+    def request_callback(request):
+        query = json.loads(request.body)['variables']['query']
+        response = {
+            'data': {
+                'queryV1': {
+                    'type': 'list',
+                    'data': pages[query]
+                }
+            }
+        }
+        return (200, {'Content-Type': 'application/json'}, json.dumps(response))
+
+    responses.add_callback(
+        responses.POST, 'https://api.us.jupiterone.io/graphql',
+        callback=request_callback,
+        content_type='application/json',
+    )
+
+    j1 = JupiterOneClient(account='testAccount', token='testToken')
+    response = j1.query_v1(
+        'FIND *',
+        shard_by='_type',
+        shards=['aws_instance', 'aws_s3_bucket'],
+        max_workers=2
+    )
+
+    assert len(responses.calls) == 2
+    assert [row['entity']['_id'] for row in response['data']] == ['1', '2', '3']
+
+
+def test_sharded_query_requires_shards():
+    j1 = JupiterOneClient(account='testAccount', token='testToken')
+
+    with pytest.raises(JupiterOneClientError):
+        j1.query_v1('FIND *', shard_by='_type')
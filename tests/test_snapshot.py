@@ -0,0 +1,85 @@
+from jupiterone.client import JupiterOneClient
+from jupiterone.records import Entity
+from jupiterone.snapshot import Snapshot
+from jupiterone.transport import FakeTransport
+
+
+def entity_row(entity_id, entity_type='aws_instance', begin_on=1000, deleted=False):
+    return {
+        'id': entity_id,
+        'entity': {
+            '_id': entity_id,
+            '_key': 'key-' + entity_id,
+            '_type': entity_type,
+            '_class': ['Host', 'Resource'] if entity_type == 'aws_instance' else 'DataStore',
+            '_beginOn': begin_on,
+            '_deleted': deleted
+        },
+        'properties': {'name': entity_id}
+    }
+
+
+def build_client(pages, queries):
+    def handler(request):
+        variables = request.json()['variables']
+        queries.append((variables['query'], variables['includeDeleted']))
+        page = pages.pop(0)
+        return 200, {}, {'data': {'queryV1': {'data': page, 'cursor': 'next' if pages else None}}}
+
+    return JupiterOneClient(account='testAccount', token='testToken', transport=FakeTransport(handler))
+
+
+def test_pull_and_read(tmp_path):
+    queries = []
+    client = build_client([[entity_row('1'), entity_row('2')], [entity_row('3', 'aws_s3_bucket')]], queries)
+
+    with Snapshot(str(tmp_path / 'snapshot.db')) as snapshot:
+        assert snapshot.pull(client, 'FIND *') == 3
+
+    snapshot = Snapshot(str(tmp_path / 'snapshot.db'))
+    assert len(snapshot) == 3
+    assert snapshot.meta['query'] == 'FIND *'
+    assert snapshot.get('2') == entity_row('2')
+    assert snapshot.get('missing') is None
+    assert [row['id'] for row in snapshot.entities(entity_class='Host')] == ['1', '2']
+    assert [row['id'] for row in snapshot.entities(entity_type='aws_s3_bucket', entity_class='DataStore')] == ['3']
+    assert [entity.entity_id for entity in snapshot.entities(entity_key='key-1', records=True)] == ['1']
+    assert isinstance(snapshot.get('1', records=True), Entity)
+
+
+def test_refresh_fetches_changed_entities(tmp_path):
+    queries = []
+    pages = [[entity_row('1', begin_on=1000), entity_row('2', begin_on=2000)]]
+    client = build_client(pages, queries)
+
+    snapshot = Snapshot(str(tmp_path / 'snapshot.db'))
+    snapshot.pull(client, 'FIND * WITH _integrationType = "aws"')
+
+    pages.append([entity_row('2', 'aws_s3_bucket', begin_on=3000), entity_row('1', begin_on=3000, deleted=True)])
+    assert snapshot.refresh(client) == 1
+    assert queries[1] == ('FIND * WITH _beginOn >= 2000 AND (_integrationType = "aws")', True)
+    assert snapshot.get('1') is None
+    assert snapshot.get('2')['entity']['_type'] == 'aws_s3_bucket'
+    assert list(snapshot.entities(entity_class='Host')) == []
+
+
+def test_tree_snapshot_stores_relationships(tmp_path):
+    tree = {
+        'vertices': [entity_row('1'), entity_row('2')],
+        'edges': [{
+            'id': 'e1',
+            'fromVertexId': '1',
+            'toVertexId': '2',
+            'relationship': {'_id': 'e1', '_key': 'key-e1', '_type': 'host_uses_host', '_class': 'USES'},
+            'properties': {}
+        }]
+    }
+    client = build_client([tree], [])
+
+    snapshot = Snapshot(str(tmp_path / 'snapshot.db'))
+    snapshot.pull(client, 'FIND Host THAT USES Host RETURN TREE')
+
+    assert len(snapshot) == 2
+    assert [edge['id'] for edge in snapshot.relationships(from_entity_id='1')] == ['e1']
+    assert list(snapshot.relationships(to_entity_id='1')) == []
+    assert [edge.to_entity_id for edge in snapshot.relationships(relationship_type='host_uses_host', records=True)] == ['2']
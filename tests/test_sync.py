@@ -0,0 +1,209 @@
+import gzip
+import json
+import threading
+import pytest
+import responses
+
+from jupiterone.client import JupiterOneClient
+from jupiterone.errors import JupiterOneApiError, JupiterOneClientError, JupiterOneSyncJobError
+from jupiterone.sync import SyncJob, sync_entity, sync_graph, sync_relationship
+from jupiterone.transport import FakeTransport
+
+JOBS_URL = 'https://api.us.jupiterone.io/persister/synchronization/jobs'
+
+
+class SyncServer:
+    """ Local stand-in for the synchronization job API """
+
+    def __init__(self, fail_uploads=0, final_status='FINISHED'):
+        self.jobs = {}
+        self.uploads = []
+        self.fail_uploads = fail_uploads
+        self.final_status = final_status
+        self.lock = threading.Lock()
+
+    def __call__(self, request):
+        assert request.headers['Authorization'] == 'Bearer testToken'
+        path = request.url[len(JOBS_URL):].strip('/').split('/')
+
+        if request.method == 'POST' and path == ['']:
+            job = dict(request.json(), id='job-{}'.format(len(self.jobs) + 1), status='AWAITING_UPLOADS')
+            self.jobs[job['id']] = dict(job, entities=[], relationships=[])
+            return 200, {}, {'job': job}
+
+        job = self.jobs[path[0]]
+        if request.method == 'GET':
+            return 200, {}, {'job': {'id': job['id'], 'status': job['status']}}
+
+        action = path[1]
+        if action in ('entities', 'relationships'):
+            with self.lock:
+                if self.fail_uploads:
+                    self.fail_uploads -= 1
+                    return 503, {}, 'Service Unavailable'
+            body = request.body
+            if request.headers.get('Content-Encoding') == 'gzip':
+                body = gzip.decompress(body)
+            items = json.loads(body)[action]
+            with self.lock:
+                self.uploads.append((action, len(request.body)))
+                job[action].extend(items)
+        elif action == 'finalize':
+            job['status'] = self.final_status
+        elif action == 'abort':
+            job['status'] = 'ABORTED'
+            job['reason'] = request.json().get('reason')
+        return 200, {}, {'job': {'id': job['id'], 'status': job['status']}}
+
+
+def build_client(server):
+    j1 = JupiterOneClient(account='testAccount', token='testToken', transport=FakeTransport(server))
+    j1.RETRY_OPTS = dict(j1.RETRY_OPTS, wait_exponential_multiplier=1, stop_max_delay=200)
+    return j1
+
+
+def build_entities(count):
+    for index in range(count):
+        yield {
+            'entity_key': 'host-{}'.format(index),
+            'entity_type': 'custom_host',
+            'entity_class': 'Host',
+            'properties': {'displayName': 'host {}'.format(index), 'tag.Team': 'platform'}
+        }
+
+
+def test_sync_item_conversion():
+    assert sync_entity({'entity_key': 'a', 'entity_type': 't', 'entity_class': 'Host', 'properties': {'x': 1}}) == {
+        '_key': 'a', '_type': 't', '_class': 'Host', 'x': 1
+    }
+    assert sync_entity({'_key': 'a', '_type': 't', '_class': 'Host'}) == {'_key': 'a', '_type': 't', '_class': 'Host'}
+    assert sync_relationship({
+        'relationship_key': 'a|has|b',
+        'relationship_type': 't_has_u',
+        'relationship_class': 'HAS',
+        'from_entity_key': 'a',
+        'to_entity_id': 'id-b'
+    }) == {'_key': 'a|has|b', '_type': 't_has_u', '_class': 'HAS', '_fromEntityKey': 'a', '_toEntityId': 'id-b'}
+
+
+def test_sync_graph_uploads_compressed_batches():
+    server = SyncServer(fail_uploads=1)
+    j1 = build_client(server)
+    relationships = [
+        {
+            'relationship_key': 'host-{}|has|host-{}'.format(index, index + 1),
+            'relationship_type': 'custom_host_has_host',
+            'relationship_class': 'HAS',
+            'from_entity_key': 'host-{}'.format(index),
+            'to_entity_key': 'host-{}'.format(index + 1)
+        }
+        for index in range(10)
+    ]
+
+    report = sync_graph(j1, build_entities(2500), relationships, scope='inventory', batch_size=1000, max_workers=3)
+
+    job = server.jobs['job-1']
+    assert job['scope'] == 'inventory'
+    assert job['syncMode'] == 'DIFF'
+    assert len(job['entities']) == 2500
+    assert len({entity['_key'] for entity in job['entities']}) == 2500
+    assert job['relationships'][0]['_fromEntityKey'] == 'host-0'
+
+    assert report['job']['status'] == 'FINISHED'
+    assert report['entities']['items'] == 2500
+    assert report['entities']['batches'] == 3
+    assert report['relationships']['batches'] == 1
+    assert report['entities']['sent_bytes'] < report['entities']['bytes'] / 5
+
+    # start, 4 uploads plus the retried one, finalize and a status poll
+    assert j1.transport.requests == 8
+    assert sorted(kind for kind, _ in server.uploads) == ['entities'] * 3 + ['relationships']
+
+
+def test_upload_failure_aborts_job():
+    server = SyncServer()
+
+    def handler(request):
+        if request.url.endswith('/relationships'):
+            return 400, {}, 'Invalid relationship'
+        return server(request)
+
+    j1 = JupiterOneClient(account='testAccount', token='testToken', transport=FakeTransport(handler))
+
+    with pytest.raises(JupiterOneApiError, match='Invalid relationship'):
+        sync_graph(j1, build_entities(10), [{'_key': 'r', '_type': 't', '_class': 'HAS'}], scope='inventory')
+
+    assert server.jobs['job-1']['status'] == 'ABORTED'
+    assert 'Invalid relationship' in server.jobs['job-1']['reason']
+
+
+def test_abort_failure_keeps_upload_error():
+    server = SyncServer()
+
+    def handler(request):
+        if request.url.endswith('/entities'):
+            return 400, {}, 'Invalid entity'
+        if request.url.endswith('/abort'):
+            return 503, {}, 'Service Unavailable'
+        return server(request)
+
+    j1 = build_client(handler)
+
+    with pytest.raises(JupiterOneApiError, match='Invalid entity'):
+        sync_graph(j1, build_entities(10), scope='inventory')
+    assert server.jobs['job-1']['status'] == 'AWAITING_UPLOADS'
+
+
+def test_job_calls_retry_server_errors():
+    server = SyncServer()
+    failures = {'/entities': [502], '': [503, 500]}
+
+    def handler(request):
+        for suffix, statuses in failures.items():
+            if request.url.endswith('/job-1' + suffix) and statuses:
+                return statuses.pop(), {}, 'Unavailable'
+        return server(request)
+
+    j1 = build_client(handler)
+    job = SyncJob.start(j1, 'inventory')
+    job.upload_entities(build_entities(3))
+    job.finalize()
+
+    assert job.wait()['status'] == 'FINISHED'
+    assert failures == {'/entities': [], '': []}
+    assert len(server.jobs['job-1']['entities']) == 3
+
+
+def test_exhausted_retries_raise_api_error():
+    j1 = build_client(lambda request: (503, {}, 'Unavailable'))
+
+    with pytest.raises(JupiterOneApiError, match='after retries'):
+        SyncJob(j1, 'job-1').status()
+
+
+def test_job_errors():
+    j1 = build_client(SyncServer(final_status='ERROR_BAD_DATA'))
+
+    with pytest.raises(JupiterOneClientError):
+        SyncJob.start(j1)
+
+    job = SyncJob.start(j1, 'inventory', sync_mode='CREATE_OR_UPDATE', compress=False)
+    assert job.upload_entities(build_entities(5))['items'] == 5
+    assert job.finalize()['status'] == 'ERROR_BAD_DATA'
+
+    with pytest.raises(JupiterOneSyncJobError) as exc_info:
+        job.wait()
+    assert exc_info.value.job['status'] == 'ERROR_BAD_DATA'
+
+
+@responses.activate
+def test_requests_transport_sends_gzip_body():
+    responses.add(responses.POST, JOBS_URL + '/job-1/entities', json={'job': {'id': 'job-1'}}, status=200)
+    j1 = JupiterOneClient(account='testAccount', token='testToken')
+
+    job = SyncJob(j1, 'job-1')
+    assert job.upload_entities(build_entities(3))['batches'] == 1
+
+    request = responses.calls[0].request
+    assert request.headers['Content-Encoding'] == 'gzip'
+    assert len(json.loads(gzip.decompress(request.body))['entities']) == 3
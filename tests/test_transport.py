@@ -0,0 +1,62 @@
+import json
+import sys
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+
+from jupiterone.client import JupiterOneClient
+from jupiterone.errors import JupiterOneApiError, JupiterOneClientError
+from jupiterone.transport import FakeTransport, HTTP2Transport
+
+
+def query_handler(request):
+    assert request.method == 'POST'
+    assert request.headers['LifeOmic-Account'] == 'testAccount'
+    query = request.json()['variables']['query']
+    response = {
+        'data': {
+            'queryV1': {
+                'type': 'list',
+                'data': [{'id': query, 'entity': {'_id': query}, 'properties': {}}]
+            }
+        }
+    }
+    return 200, {'Content-Type': 'application/json'}, json.dumps(response)
+
+
+def test_fake_transport_query_v1():
+    transport = FakeTransport(query_handler)
+    j1 = JupiterOneClient(account='testAccount', token='testToken', transport=transport)
+
+    response = j1.query_v1('FIND Host')
+
+    assert transport.requests == 1
+    assert response['data'][0]['entity']['_id'] == 'FIND Host'
+
+
+def test_fake_transport_concurrent_queries():
+    transport = FakeTransport(query_handler)
+    j1 = JupiterOneClient(account='testAccount', token='testToken', transport=transport)
+    queries = ['FIND Host WITH id={}'.format(i) for i in range(20)]
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(j1.query_v1, queries))
+
+    assert transport.requests == 20
+    assert [r['data'][0]['id'] for r in results] == queries
+
+
+def test_fake_transport_error():
+    transport = FakeTransport(lambda request: (404, {'Content-Type': 'text/plain'}, 'Not Found'))
+    j1 = JupiterOneClient(account='testAccount', token='testToken', transport=transport)
+
+    with pytest.raises(JupiterOneApiError) as exc_info:
+        j1.query_v1('FIND Host')
+
+    assert exc_info.value.args[0] == '404:Not Found'
+
+
+def test_http2_transport_requires_httpx(monkeypatch):
+    monkeypatch.setitem(sys.modules, 'httpx', None)
+
+    with pytest.raises(JupiterOneClientError):
+        HTTP2Transport()
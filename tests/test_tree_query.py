@@ -0,0 +1,66 @@
+import pytest
+
+from jupiterone.client import JupiterOneClient
+from jupiterone.transport import FakeTransport
+
+
+def vertex(vertex_id: str):
+    return {'id': vertex_id, 'entity': {'_id': vertex_id}, 'properties': {}}
+
+
+def edge(edge_id: str, from_id: str, to_id: str):
+    return {'id': edge_id, 'fromVertexId': from_id, 'toVertexId': to_id, 'relationship': {'_id': edge_id}, 'properties': {}}
+
+
+def test_cursor_tree_query_merges_pages():
+    pages = {
+        None: ({'vertices': [vertex('1'), vertex('2')], 'edges': [edge('e1', '1', '2')]}, 'c1'),
+        'c1': ({'vertices': [vertex('2'), vertex('3')], 'edges': [edge('e1', '1', '2'), edge('e2', '2', '3')]}, None)
+    }
+
+    def handler(request):
+        data, cursor = pages[request.json()['variables'].get('cursor')]
+        return 200, {}, {'data': {'queryV1': {'type': 'tree', 'data': data, 'cursor': cursor}}}
+
+    j1 = JupiterOneClient(account='testAccount', token='testToken', transport=FakeTransport(handler))
+    response = j1.query_v1('FIND Host THAT HAS Disk RETURN TREE')
+
+    assert [v['id'] for v in response['vertices']] == ['1', '2', '3']
+    assert [e['id'] for e in response['edges']] == ['e1', 'e2']
+
+
+def test_limit_skip_tree_query_merges_pages():
+    pages = {
+        0: {'vertices': [vertex('1'), vertex('2')], 'edges': [edge('e1', '1', '2')]},
+        2: {'vertices': [vertex('3'), vertex('4')], 'edges': [edge('e2', '3', '4')]},
+        4: {'vertices': [vertex('5')], 'edges': []}
+    }
+
+    def handler(request):
+        skip = int(request.json()['variables']['query'].split(' SKIP ')[1].split(' ')[0])
+        return 200, {}, {'data': {'queryV1': {'type': 'tree', 'data': pages[skip]}}}
+
+    transport = FakeTransport(handler)
+    j1 = JupiterOneClient(account='testAccount', token='testToken', transport=transport)
+
+    with pytest.warns(DeprecationWarning):
+        response = j1.query_v1('FIND Host RETURN TREE', skip=2, limit=2)
+
+    assert transport.requests == 3
+    assert [v['id'] for v in response['vertices']] == ['1', '2', '3', '4', '5']
+    assert [e['id'] for e in response['edges']] == ['e1', 'e2']
+
+
+def test_limit_skip_tree_query_stops_without_new_vertices():
+    def handler(request):
+        data = {'vertices': [vertex('1'), vertex('2')], 'edges': []}
+        return 200, {}, {'data': {'queryV1': {'type': 'tree', 'data': data}}}
+
+    transport = FakeTransport(handler)
+    j1 = JupiterOneClient(account='testAccount', token='testToken', transport=transport)
+
+    with pytest.warns(DeprecationWarning):
+        response = j1.query_v1('FIND Host RETURN TREE', skip=2, limit=2)
+
+    assert transport.requests == 2
+    assert len(response['vertices']) == 2